@@ -1,14 +1,35 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, request, jsonify, send_from_directory, send_file, Response, g
 from flask_cors import CORS
 import os
 import sys
 import logging
 import uuid
 import shutil
+import io
+import hashlib
+import json
+import time
+import atexit
+from concurrent.futures import as_completed, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, send_file as send_file_from_proxy
+from werkzeug.exceptions import RequestEntityTooLarge, RequestedRangeNotSatisfiable
 from utils.docx_processor import DocxProcessor
 from utils.format_config import FormatConfig
+from utils.compiled_config import compile_config, compiled_config_stats
+from utils.document_cache import DocumentCache
+from utils.report_cache import ReportCache
+from utils.stream_checker import StreamChecker
+from utils.job_queue import JobQueue, run_check_job, run_format_job
+from utils.batch import extract_documents, remove_documents, summarize_reports
+from utils.upload_stream import StreamingUploadRequest
+from utils.blob_store import BlobStore
+from utils.file_registry import create_file_registry, KIND_UPLOAD, KIND_FORMATTED
+from utils.expiry import ExpiryScheduler
+from utils.docx_writer import COMPRESS_LEVELS
+from utils.template_registry import TemplateRegistry, TemplateNotFoundError, TemplateVersionError
+from utils.metrics import REGISTRY, start_timings, stop_timings, timings_block, record_timings
+from utils.admission import AdmissionController, AdmissionRejected, estimate_cost
 
 # 配置日志
 logging.basicConfig(
@@ -29,38 +50,348 @@ CORS(app)
 
 # 配置
 UPLOAD_FOLDER = 'temp_uploads'
+# 按内容哈希保存的文档目录
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+# 下载交由前端代理发送文件：''（由Flask发送）、'x-sendfile'（Apache/lighttpd）或'x-accel-redirect'（nginx）
+DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD', '')
+DOWNLOAD_OFFLOAD_MODES = ('', 'x-sendfile', 'x-accel-redirect')
+# x-accel-redirect模式下BLOB_FOLDER对应的nginx internal location
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '/protected-blobs/')
+# 文件登记表，多个worker进程共享同一个SQLite数据库；单进程调试可用memory://
+FILE_REGISTRY_URL = os.environ.get('FILE_REGISTRY_URL', f"sqlite:///{os.path.join(UPLOAD_FOLDER, 'registry.db')}")
 ALLOWED_EXTENSIONS = {'docx'}
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+# multipart请求中除文件内容外的边界与头部开销上限
+UPLOAD_OVERHEAD = 64 * 1024
+FILE_TTL = timedelta(hours=1)
+# 各类文件的保留时间，默认均为FILE_TTL
+FILE_TTLS = {
+    KIND_UPLOAD: timedelta(seconds=int(os.environ.get('UPLOAD_TTL_SECONDS', FILE_TTL.total_seconds()))),
+    KIND_FORMATTED: timedelta(seconds=int(os.environ.get('FORMATTED_TTL_SECONDS', FILE_TTL.total_seconds())))
+}
+# 后台过期清理的间隔与每批释放的文件数
+EXPIRY_INTERVAL_SECONDS = float(os.environ.get('EXPIRY_INTERVAL_SECONDS', 60))
+EXPIRY_BATCH_SIZE = int(os.environ.get('EXPIRY_BATCH_SIZE', 500))
+# 超过该大小的文档使用流式检查器，不构建python-docx对象图
+STREAM_CHECK_MIN_BYTES = int(os.environ.get('STREAM_CHECK_MIN_BYTES', 5 * 1024 * 1024))
+# 默认排版引擎，见DocxProcessor.ENGINES
+FORMAT_ENGINE = os.environ.get('FORMAT_ENGINE', 'xml')
+# 排版结果的zip压缩级别0-9，未设置时使用python-docx默认级别；级别越低越快、文件越大
+DOCX_COMPRESS_LEVEL = int(os.environ['DOCX_COMPRESS_LEVEL']) if os.environ.get('DOCX_COMPRESS_LEVEL') else None
+DOC_CACHE_MAX_BYTES = int(os.environ.get('DOC_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# 异步任务的工作进程数，默认为CPU核心数
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 0)) or None
+JOB_TYPES = ('check', 'format', 'format-check')
+# 批量检查一次最多处理的文档数
+BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', 500))
+# 用户模板目录
+TEMPLATE_FOLDER = os.environ.get('TEMPLATE_FOLDER', 'user_templates')
+# 准入控制：同时处理的文档按估算代价（word/document.xml解压后字节数加部件开销）限额，
+# 代价不超过ADMISSION_FAST_LANE_COST的小文档走独立的快速通道
+ADMISSION_CAPACITY = int(os.environ.get('ADMISSION_CAPACITY', 64 * 1024 * 1024))
+ADMISSION_FAST_LANE_COST = int(os.environ.get('ADMISSION_FAST_LANE_COST', 1024 * 1024))
+ADMISSION_FAST_LANE_SLOTS = int(os.environ.get('ADMISSION_FAST_LANE_SLOTS', 0)) or (os.cpu_count() or 1) * 2
+# 请求带有该头时，响应附带各阶段耗时（JSON响应的timings字段与Server-Timing头）
+TIMINGS_HEADER = os.environ.get('TIMINGS_HEADER', 'X-Debug-Timings')
+
+# 未知的下载代理方式会让所有下载都变成代理无法识别的空响应，启动时直接报错
+if DOWNLOAD_OFFLOAD not in DOWNLOAD_OFFLOAD_MODES:
+    raise ValueError(f"不支持的DOWNLOAD_OFFLOAD: {DOWNLOAD_OFFLOAD}（可选: {', '.join(DOWNLOAD_OFFLOAD_MODES[1:])}）")
 
 # 确保上传目录存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# 内存存储
-file_storage = {}
+# 上传文件边接收边写入上传目录，同时计算哈希并限制大小
+StreamingUploadRequest.upload_folder = UPLOAD_FOLDER
+StreamingUploadRequest.max_upload_size = MAX_FILE_SIZE
+StreamingUploadRequest.streaming_endpoints = {'upload_file', 'batch_check'}
+app.request_class = StreamingUploadRequest
+
+# 文件登记表，file_id -> 文件信息，文件本身按内容保存在blob_store中
+file_registry = create_file_registry(FILE_REGISTRY_URL)
+
+# 按内容寻址的文档存储
+blob_store = BlobStore(BLOB_FOLDER, file_registry)
+
+# 已解析文档缓存
+document_cache = DocumentCache(max_bytes=DOC_CACHE_MAX_BYTES)
+
+# 检查报告缓存
+report_cache = ReportCache()
+
+# 格式模板登记表
+template_registry = TemplateRegistry(TEMPLATE_FOLDER)
+
+# 异步任务队列，任务记录保存在文件登记表中，各worker共享
+job_queue = JobQueue(file_registry, max_workers=JOB_WORKERS,
+                     retention_seconds=max(FILE_TTLS.values()).total_seconds())
+atexit.register(job_queue.shutdown)
+
+# 同步检查与排版请求的准入控制
+admission = AdmissionController(ADMISSION_CAPACITY, ADMISSION_FAST_LANE_COST, ADMISSION_FAST_LANE_SLOTS)
 
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def cleanup_old_files():
-    """清理超过1小时的临时文件"""
+def compute_file_hash(file_path):
+    """计算文件内容的SHA-256"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def register_file(file_id, content_hash, original_name, kind=KIND_UPLOAD, created_at=None):
+    """
+    登记已保存在blob_store中的文件，返回文件信息
+    
+    确认内容存在与登记引用在同一个锁内完成，不会与过期清理删除内容交错；
+    内容已被删除时不登记并返回None。
+    """
+    file_path = blob_store.path(content_hash)
+    with file_registry.locked():
+        try:
+            size = os.path.getsize(file_path)
+        except FileNotFoundError:
+            logger.warning(f"文件内容已被删除，无法登记: {content_hash}")
+            return None
+        file_info = {
+            'file_id': file_id,
+            'path': file_path,
+            'original_name': original_name,
+            'size': size,
+            'content_hash': content_hash,
+            'kind': kind,
+            'created_at': created_at or datetime.now()
+        }
+        file_registry.add(file_info)
+    return file_info
+
+def store_file(src_path, file_id, content_hash, original_name, kind=KIND_UPLOAD, created_at=None):
+    """将文件移入blob_store并登记，返回文件信息"""
+    with file_registry.locked():
+        blob_store.add_file(src_path, content_hash)
+        return register_file(file_id, content_hash, original_name, kind, created_at)
+
+def release_file(file_id):
+    """删除文件登记，内容不再被引用时删除文件本身"""
+    with file_registry.locked():
+        file_info = file_registry.remove(file_id)
+        if file_info is None:
+            return None
+        
+        file_info['blob_removed'] = file_registry.references(file_info['content_hash']) == 0
+        if file_info['blob_removed']:
+            blob_store.remove(file_info['content_hash'])
+            file_registry.remove_derived(file_info['content_hash'])
+            document_cache.discard(file_info['content_hash'])
+    return file_info
+
+def resolve_format_config(data, custom_config=None):
+    """
+    获取请求对应的编译后格式配置
+    
+    请求可以给出template_id（及可选的template_version），format_config中的配置项
+    在模板之上覆盖；未给出模板时format_config为完整的自定义配置。
+    
+    Returns:
+        (编译后的配置, None)，出错时为(None, 错误响应)
+    """
+    if custom_config is None:
+        custom_config = data.get('format_config') or {}
+    template_id = data.get('template_id')
+    try:
+        if template_id:
+            return template_registry.resolve(template_id, data.get('template_version'), custom_config), None
+        return compile_config(custom_config), None
+    except TemplateNotFoundError as e:
+        return None, (jsonify({'error': str(e)}), 404)
+    except TemplateVersionError as e:
+        return None, (jsonify({'error': str(e), 'current_version': e.current_version}), 409)
+    except ValueError as e:
+        return None, (jsonify({'error': f'格式配置错误: {str(e)}'}), 400)
+
+def resolve_compress_level(data):
+    """
+    获取请求中的zip压缩级别，未给出时使用DOCX_COMPRESS_LEVEL
+    
+    Returns:
+        (压缩级别, None)，级别无效时为(None, 错误响应)；压缩级别None表示默认级别
+    """
+    compress_level = data.get('compress_level', DOCX_COMPRESS_LEVEL)
+    if compress_level is not None and (type(compress_level) is not int or compress_level not in COMPRESS_LEVELS):
+        return None, (jsonify({'error': f'不支持的压缩级别: {compress_level}'}), 400)
+    return compress_level, None
+
+def admit_document(file_path):
+    """
+    按文档的估算代价申请准入，在解析文档之前调用
+    
+    Raises:
+        AdmissionRejected: 容量已满
+    """
+    return admission.admit(estimate_cost(file_path)['cost'])
+
+def admission_rejected(error):
+    """准入被拒绝时的429响应"""
+    response = jsonify({'error': f'{str(error)}（约{error.retry_after}秒）', 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def file_expires_at(file_info):
+    """文件的过期时间戳"""
+    return (file_info['created_at'] + FILE_TTLS[file_info['kind']]).timestamp()
+
+def formatted_filename_for(file_info):
+    """排版结果的文件名"""
+    name_without_ext = os.path.splitext(file_info['original_name'])[0]
+    return f"{name_without_ext}_已排版.docx"
+
+def find_formatted_output(derived_key):
+    """
+    查找相同输入已有的排版结果，返回(内容哈希, 排版统计)，没有或内容已被删除时返回None
+    
+    复用时仍需以register_file的返回值为准：查找与登记之间内容可能被清理。
+    """
+    with file_registry.locked():
+        derived = file_registry.get_derived(derived_key)
+        if derived is None or not blob_store.exists(derived[0]):
+            return None
+        return derived
+
+def store_formatted_output(formatted_file_id, formatted_filename, output_path, derived_key, format_stats):
+    """将排版结果移入blob_store、登记并记录其来源，返回文件信息"""
+    content_hash = compute_file_hash(output_path)
+    with file_registry.locked():
+        file_info = store_file(output_path, formatted_file_id, content_hash, formatted_filename, KIND_FORMATTED)
+        file_registry.set_derived(derived_key, content_hash, format_stats)
+    return file_info
+
+def formatted_result(file_info, config_hash, format_stats, report=None):
+    """缓存复查报告并生成排版接口的响应"""
+    # 复查结果同时作为排版后文件的检查缓存
+    if report is not None:
+        report_cache.put((file_info['content_hash'], config_hash), report, file_expires_at(file_info))
+    
+    result = {
+        'formatted_file_id': file_info['file_id'],
+        'filename': file_info['original_name'],
+        'format_stats': format_stats,
+        'message': '排版完成'
+    }
+    if report is not None:
+        result['report'] = report
+    return result
+
+# 后台过期清理
+expiry_scheduler = ExpiryScheduler(file_registry, release_file, FILE_TTLS,
+                                   interval=EXPIRY_INTERVAL_SECONDS, batch_size=EXPIRY_BATCH_SIZE)
+
+@app.before_request
+def ensure_expiry_scheduler():
+    """
+    在首个请求时启动后台过期清理
+    
+    不在导入时启动：预加载应用再fork出的worker进程不会继承父进程的线程，
+    每个worker需在自己的进程中启动。
+    """
+    if not expiry_scheduler.running:
+        expiry_scheduler.start()
+
+# 请求级指标
+REQUEST_SECONDS = REGISTRY.histogram(
+    'paper_format_http_request_duration_seconds', '接口请求耗时（秒）', ('method', 'endpoint', 'status')
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('paper_format_http_requests_in_flight', '正在处理的请求数')
+COMPONENT_STATS = REGISTRY.gauge(
+    'paper_format_component_stat', '各组件的统计信息，与/api/cache/stats一致', ('component', 'stat')
+)
+
+def component_stats():
+    """获取各组件的统计信息"""
+    return {
+        'document_cache': document_cache.stats(),
+        'report_cache': report_cache.stats(),
+        'job_queue': job_queue.stats(),
+        'blob_store': blob_store.stats(),
+        'file_registry': file_registry.stats(),
+        'expiry': expiry_scheduler.stats(),
+        'compiled_configs': compiled_config_stats(),
+        'templates': template_registry.stats(),
+        'admission': admission.stats()
+    }
+
+@app.before_request
+def start_request_metrics():
+    """记录请求开始时间，带调试头时开始收集各阶段耗时"""
+    g.request_started = time.perf_counter()
+    g.timings = None
+    REQUESTS_IN_FLIGHT.inc()
+    if request.headers.get(TIMINGS_HEADER):
+        g.timings, g.timings_token = start_timings()
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    记录接口耗时，按路由规则（而非实际路径）区分接口以限制标签数量
+    
+    流式响应（如批量检查）只计到响应头发出为止。
+    """
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+    
+    timings = g.get('timings')
+    if timings is not None:
+        block = timings_block(timings, elapsed)
+        server_timing = [f'{name};dur={ms}' for name, ms in block['phases_ms'].items()]
+        server_timing.append(f"total;dur={block['total_ms']}")
+        response.headers['Server-Timing'] = ', '.join(server_timing)
+        
+        if response.is_json and not response.is_streamed:
+            data = response.get_json(silent=True)
+            if isinstance(data, dict):
+                data['timings'] = block
+                response.set_data(app.json.dumps(data))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc=None):
+    """结束计时收集"""
+    if g.get('request_started') is None:
+        return
+    REQUESTS_IN_FLIGHT.dec()
+    if g.get('timings') is not None:
+        stop_timings(g.timings_token)
+        g.timings = None
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus文本格式的指标"""
     try:
-        current_time = datetime.now()
-        for file_id, file_info in list(file_storage.items()):
-            if current_time - file_info['created_at'] > timedelta(hours=1):
-                file_path = file_info['path']
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                del file_storage[file_id]
-                logger.info(f"清理过期文件: {file_id}")
+        for component, stats in component_stats().items():
+            for stat, value in stats.items():
+                # 只导出数值统计，跳过字符串等其他信息
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    COMPONENT_STATS.set(value, component=component, stat=stat)
+        
+        return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
     except Exception as e:
-        logger.error(f"清理文件失败: {str(e)}")
+        logger.error(f"导出指标失败: {str(e)}")
+        return jsonify({'error': f'导出指标失败: {str(e)}'}), 500
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """文件上传接口"""
     try:
-        cleanup_old_files()
+        # 声明的请求体已超过上限时不再接收
+        if request.content_length is not None and request.content_length > MAX_FILE_SIZE + UPLOAD_OVERHEAD:
+            return jsonify({'error': f'文件大小超过限制(最大20MB)'}), 413
         
         if 'file' not in request.files:
             return jsonify({'error': '未找到上传文件'}), 400
@@ -73,29 +404,28 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': '仅支持.docx格式文件'}), 400
         
-        # 检查文件大小
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': f'文件大小超过限制(最大20MB)'}), 400
+        # 文件内容已在接收时写入临时文件，大小与哈希同时得出
+        stream = file.stream
+        if not stream.is_zip:
+            return jsonify({'error': '文件不是有效的.docx文档'}), 400
         
         # 生成唯一文件ID
         file_id = str(uuid.uuid4())
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, f"{file_id}_{filename}")
-        
-        # 保存文件
-        file.save(file_path)
+        file_size = stream.size
+        content_hash = stream.hexdigest()
         
-        # 存储文件信息
-        file_storage[file_id] = {
-            'path': file_path,
-            'original_name': filename,
-            'size': file_size,
-            'created_at': datetime.now()
-        }
+        # 相同内容只保存一份，新的file_id引用已有文件
+        with file_registry.locked():
+            if blob_store.exists(content_hash):
+                stream.discard()
+            else:
+                upload_path = os.path.join(UPLOAD_FOLDER, f"{file_id}_{filename}")
+                stream.commit(upload_path)
+                blob_store.add_file(upload_path, content_hash)
+            
+            # 存储文件信息
+            register_file(file_id, content_hash, filename)
         
         logger.info(f"文件上传成功: {file_id} - {filename}")
         
@@ -105,6 +435,9 @@ def upload_file():
             'size': file_size
         }), 200
         
+    except RequestEntityTooLarge:
+        logger.warning("文件上传中止: 文件大小超过限制")
+        return jsonify({'error': f'文件大小超过限制(最大20MB)'}), 413
     except Exception as e:
         logger.error(f"文件上传失败: {str(e)}")
         return jsonify({'error': f'文件上传失败: {str(e)}'}), 500
@@ -120,32 +453,44 @@ def check_format():
         
         file_id = data['file_id']
         
-        if file_id not in file_storage:
+        file_info = file_registry.get(file_id)
+        if file_info is None:
             return jsonify({'error': '文件不存在或已过期'}), 404
         
-        file_info = file_storage[file_id]
         file_path = file_info['path']
         
         if not os.path.exists(file_path):
             return jsonify({'error': '文件不存在'}), 404
         
-        # 获取或合并格式配置
-        custom_config = data.get('format_config', {})
-        format_config = FormatConfig.merge_config(custom_config)
+        # 获取编译后的格式配置（可引用模板），相同配置只合并、验证一次
+        format_config, error = resolve_format_config(data)
+        if error:
+            return error
         
-        # 验证配置
-        is_valid, error_msg = FormatConfig.validate_config(format_config)
-        if not is_valid:
-            return jsonify({'error': f'格式配置错误: {error_msg}'}), 400
+        # 相同文档与配置直接返回缓存的报告
+        cache_key = (file_info['content_hash'], format_config.hash)
+        report = report_cache.get(cache_key)
+        if report is not None:
+            logger.info(f"格式检查命中缓存: {file_id}")
+            return jsonify({**report, 'cached': True}), 200
         
-        # 执行格式检查
-        processor = DocxProcessor(file_path)
-        report = processor.check_format(format_config)
+        # 执行格式检查：大文档流式检查，其余直接共享缓存中的只读文档
+        with admit_document(file_path):
+            if file_info['size'] >= STREAM_CHECK_MIN_BYTES:
+                processor = StreamChecker(file_path)
+            else:
+                document = document_cache.get(file_info['content_hash'], file_path)
+                processor = DocxProcessor(file_path, document=document)
+            report = processor.check_format(format_config)
+        
+        report_cache.put(cache_key, report, file_expires_at(file_info))
         
         logger.info(f"格式检查完成: {file_id} - 合格率 {report['pass_rate']}%")
         
-        return jsonify(report), 200
+        return jsonify({**report, 'cached': False}), 200
         
+    except AdmissionRejected as e:
+        return admission_rejected(e)
     except ValueError as e:
         logger.error(f"格式检查失败: {str(e)}")
         return jsonify({'error': str(e)}), 400
@@ -164,51 +509,158 @@ def format_document():
         
         file_id = data['file_id']
         
-        if file_id not in file_storage:
+        file_info = file_registry.get(file_id)
+        if file_info is None:
             return jsonify({'error': '文件不存在或已过期'}), 404
         
-        file_info = file_storage[file_id]
         file_path = file_info['path']
         
         if not os.path.exists(file_path):
             return jsonify({'error': '文件不存在'}), 404
         
-        # 获取或合并格式配置
-        custom_config = data.get('format_config', {})
-        format_config = FormatConfig.merge_config(custom_config)
+        # 获取编译后的格式配置（可引用模板），相同配置只合并、验证一次
+        format_config, error = resolve_format_config(data)
+        if error:
+            return error
         
-        # 验证配置
-        is_valid, error_msg = FormatConfig.validate_config(format_config)
-        if not is_valid:
-            return jsonify({'error': f'格式配置错误: {error_msg}'}), 400
+        compress_level, error = resolve_compress_level(data)
+        if error:
+            return error
         
         # 生成输出文件路径
         formatted_file_id = str(uuid.uuid4())
-        original_name = file_info['original_name']
-        name_without_ext = os.path.splitext(original_name)[0]
-        formatted_filename = f"{name_without_ext}_已排版.docx"
+        formatted_filename = formatted_filename_for(file_info)
         formatted_path = os.path.join(UPLOAD_FOLDER, f"{formatted_file_id}_{formatted_filename}")
         
-        # 执行排版
-        processor = DocxProcessor(file_path)
-        processor.format_document(format_config, formatted_path)
+        # 相同文档以相同配置、引擎和压缩级别排版过时直接复用结果
+        engine = data.get('engine', FORMAT_ENGINE)
+        config_hash = format_config.hash
+        derived_key = (file_info['content_hash'], config_hash, engine, compress_level)
+        derived = find_formatted_output(derived_key)
         
-        # 存储排版后的文件信息
-        file_storage[formatted_file_id] = {
-            'path': formatted_path,
-            'original_name': formatted_filename,
-            'size': os.path.getsize(formatted_path),
-            'created_at': datetime.now()
-        }
+        # inline模式在本次响应中直接返回文档，不落盘也不登记
+        if data.get('inline'):
+            if derived is not None:
+                format_stats = derived[1]
+                output = os.path.abspath(blob_store.path(derived[0]))
+            else:
+                with admit_document(file_path):
+                    document = document_cache.get(file_info['content_hash'], file_path, writable=True)
+                    processor = DocxProcessor(file_path, document=document)
+                    output = io.BytesIO()
+                    processor.format_document(format_config, output, engine=engine, compress_level=compress_level)
+                output.seek(0)
+                format_stats = processor.format_stats
+            
+            logger.info(f"文档排版完成(直接返回): {file_id}")
+            
+            response = send_file(
+                output,
+                as_attachment=True,
+                download_name=formatted_filename,
+                mimetype=DOCX_MIMETYPE
+            )
+            response.headers['X-Format-Stats'] = json.dumps(format_stats)
+            return response
         
-        logger.info(f"文档排版完成: {file_id} -> {formatted_file_id}")
+        formatted_info = None
+        if derived is not None:
+            format_stats = derived[1]
+            formatted_info = register_file(formatted_file_id, derived[0], formatted_filename, KIND_FORMATTED)
+            if formatted_info is not None:
+                logger.info(f"文档排版复用已有结果: {file_id} -> {formatted_file_id}")
         
-        return jsonify({
-            'formatted_file_id': formatted_file_id,
-            'filename': formatted_filename,
-            'message': '排版完成'
-        }), 200
+        if formatted_info is None:
+            # 执行排版（在缓存文档的副本上修改）
+            with admit_document(file_path):
+                document = document_cache.get(file_info['content_hash'], file_path, writable=True)
+                processor = DocxProcessor(file_path, document=document)
+                processor.format_document(format_config, formatted_path, engine=engine, compress_level=compress_level)
+            format_stats = processor.format_stats
+            formatted_info = store_formatted_output(formatted_file_id, formatted_filename, formatted_path,
+                                                    derived_key, format_stats)
+            logger.info(f"文档排版完成: {file_id} -> {formatted_file_id}")
+        
+        return jsonify(formatted_result(formatted_info, config_hash, format_stats)), 200
+        
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    except ValueError as e:
+        logger.error(f"文档排版失败: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"文档排版失败: {str(e)}")
+        return jsonify({'error': f'文档排版失败: {str(e)}'}), 500
+
+@app.route('/api/format-check', methods=['POST'])
+def format_and_check_document():
+    """一键排版并复查接口"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'file_id' not in data:
+            return jsonify({'error': '缺少file_id参数'}), 400
+        
+        file_id = data['file_id']
+        
+        file_info = file_registry.get(file_id)
+        if file_info is None:
+            return jsonify({'error': '文件不存在或已过期'}), 404
+        
+        file_path = file_info['path']
+        
+        if not os.path.exists(file_path):
+            return jsonify({'error': '文件不存在'}), 404
+        
+        # 获取编译后的格式配置（可引用模板），相同配置只合并、验证一次
+        format_config, error = resolve_format_config(data)
+        if error:
+            return error
+        
+        compress_level, error = resolve_compress_level(data)
+        if error:
+            return error
+        
+        # 生成输出文件路径
+        formatted_file_id = str(uuid.uuid4())
+        formatted_filename = formatted_filename_for(file_info)
+        formatted_path = os.path.join(UPLOAD_FOLDER, f"{formatted_file_id}_{formatted_filename}")
+        
+        # 相同文档以相同配置、引擎和压缩级别排版过时直接复用结果，复查报告优先取缓存
+        engine = data.get('engine', FORMAT_ENGINE)
+        config_hash = format_config.hash
+        derived_key = (file_info['content_hash'], config_hash, engine, compress_level)
+        derived = find_formatted_output(derived_key)
+        
+        formatted_info = None
+        if derived is not None:
+            content_hash, format_stats = derived
+            report = report_cache.get((content_hash, config_hash))
+            if report is None:
+                # 复查通过准入后再登记，被拒绝时不产生新的文件登记
+                derived_path = blob_store.path(content_hash)
+                with admit_document(derived_path):
+                    document = document_cache.get(content_hash, derived_path)
+                    report = DocxProcessor(derived_path, document=document).check_format(format_config)
+            formatted_info = register_file(formatted_file_id, content_hash, formatted_filename, KIND_FORMATTED)
+        
+        if formatted_info is None:
+            # 没有可复用的结果（或结果已被清理）时排版并在内存中复查
+            with admit_document(file_path):
+                document = document_cache.get(file_info['content_hash'], file_path, writable=True)
+                processor = DocxProcessor(file_path, document=document)
+                report = processor.format_and_check(format_config, formatted_path, engine=engine,
+                                                    compress_level=compress_level)
+            format_stats = processor.format_stats
+            formatted_info = store_formatted_output(formatted_file_id, formatted_filename, formatted_path,
+                                                    derived_key, format_stats)
         
+        logger.info(f"文档排版并复查完成: {file_id} -> {formatted_file_id} - 合格率 {report['pass_rate']}%")
+        
+        return jsonify(formatted_result(formatted_info, config_hash, format_stats, report)), 200
+        
+    except AdmissionRejected as e:
+        return admission_rejected(e)
     except ValueError as e:
         logger.error(f"文档排版失败: {str(e)}")
         return jsonify({'error': str(e)}), 400
@@ -216,14 +668,296 @@ def format_document():
         logger.error(f"文档排版失败: {str(e)}")
         return jsonify({'error': f'文档排版失败: {str(e)}'}), 500
 
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交异步检查或排版任务"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'file_id' not in data:
+            return jsonify({'error': '缺少file_id参数'}), 400
+        
+        job_type = data.get('type', 'check')
+        if job_type not in JOB_TYPES:
+            return jsonify({'error': f'不支持的任务类型: {job_type}'}), 400
+        
+        file_id = data['file_id']
+        
+        file_info = file_registry.get(file_id)
+        if file_info is None:
+            return jsonify({'error': '文件不存在或已过期'}), 404
+        
+        file_path = file_info['path']
+        
+        if not os.path.exists(file_path):
+            return jsonify({'error': '文件不存在'}), 404
+        
+        # 获取编译后的格式配置（可引用模板），相同配置只合并、验证一次
+        format_config, error = resolve_format_config(data)
+        if error:
+            return error
+        
+        config_hash = format_config.hash
+        
+        if job_type == 'check':
+            cache_key = (file_info['content_hash'], config_hash)
+            report = report_cache.get(cache_key)
+            if report is not None:
+                job_id = job_queue.completed(job_type, {**report, 'cached': True})
+            else:
+                expires_at = file_expires_at(file_info)
+                
+                def on_checked(result):
+                    # 工作进程的计时记录计入本进程的指标，不随结果返回
+                    record_timings(result['timings'])
+                    report = result['report']
+                    report_cache.put(cache_key, report, expires_at)
+                    return {**report, 'cached': False}
+                
+                stream = file_info['size'] >= STREAM_CHECK_MIN_BYTES
+                job_id = job_queue.submit(job_type, run_check_job, file_path, format_config, stream,
+                                          on_done=on_checked)
+        else:
+            engine = data.get('engine', FORMAT_ENGINE)
+            if engine not in DocxProcessor.ENGINES:
+                return jsonify({'error': f'不支持的排版引擎: {engine}'}), 400
+            
+            compress_level, error = resolve_compress_level(data)
+            if error:
+                return error
+            
+            # 生成输出文件路径
+            formatted_file_id = str(uuid.uuid4())
+            formatted_filename = formatted_filename_for(file_info)
+            formatted_path = os.path.join(UPLOAD_FOLDER, f"{formatted_file_id}_{formatted_filename}")
+            verify = job_type == 'format-check'
+            
+            # 已有相同输入的排版结果（及所需的复查报告）时不再提交到进程池
+            derived_key = (file_info['content_hash'], config_hash, engine, compress_level)
+            derived = find_formatted_output(derived_key)
+            report = None
+            if derived is not None and verify:
+                report = report_cache.get((derived[0], config_hash))
+                if report is None:
+                    derived = None
+            
+            formatted_info = None
+            if derived is not None:
+                formatted_info = register_file(formatted_file_id, derived[0], formatted_filename, KIND_FORMATTED)
+            
+            if formatted_info is not None:
+                job_id = job_queue.completed(job_type, formatted_result(formatted_info, config_hash, derived[1], report))
+            else:
+                def on_formatted(result):
+                    record_timings(result['timings'])
+                    # 存储排版后的文件信息
+                    formatted_info = store_formatted_output(formatted_file_id, formatted_filename, formatted_path,
+                                                            derived_key, result['format_stats'])
+                    logger.info(f"异步排版完成: {file_id} -> {formatted_file_id}")
+                    return formatted_result(formatted_info, config_hash, result['format_stats'], result['report'])
+                
+                job_id = job_queue.submit(job_type, run_format_job, file_path, format_config, formatted_path,
+                                          engine, verify, compress_level,
+                                          on_done=on_formatted)
+        
+        logger.info(f"任务已提交: {job_id} - {job_type} - {file_id}")
+        
+        return jsonify(job_queue.status(job_id)), 202
+        
+    except Exception as e:
+        logger.error(f"任务提交失败: {str(e)}")
+        return jsonify({'error': f'任务提交失败: {str(e)}'}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """查询任务状态"""
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(status), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """获取任务结果，任务未完成时返回202"""
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    
+    if status['status'] == 'failed':
+        return jsonify({'error': f"任务执行失败: {status['error']}"}), 500
+    
+    if status['status'] != 'finished':
+        return jsonify(status), 202
+    
+    return jsonify(job_queue.result(job_id)), 200
+
+@app.route('/api/batch-check', methods=['POST'])
+def batch_check():
+    """
+    批量格式检查接口
+    
+    接受zip压缩包（multipart字段file，配置放在format_config字段中）或
+    JSON形式的file_ids列表，在进程池中并行检查，每完成一个文档即输出一行
+    NDJSON结果，最后输出一行汇总。
+    
+    每个待检查文档按估算代价占用准入控制的重型通道，容量不足时等待已提交的
+    文档完成后再提交，批量检查不会挤占同步请求的容量。
+    
+    压缩包与单个文档上传一样边接收边写入临时文件，大小上限相同。
+    """
+    try:
+        # 声明的请求体已超过上限时不再接收
+        if request.content_length is not None and request.content_length > MAX_FILE_SIZE + UPLOAD_OVERHEAD:
+            return jsonify({'error': f'压缩包大小超过限制(最大20MB)'}), 413
+        
+        if 'file' in request.files:
+            archive = request.files['file']
+            custom_config = json.loads(request.form.get('format_config') or '{}')
+            config_source = request.form
+        else:
+            data = request.get_json(silent=True)
+            if not data or not data.get('file_ids'):
+                return jsonify({'error': '缺少file_ids参数或上传文件'}), 400
+            
+            file_ids = data['file_ids']
+            if not isinstance(file_ids, list) or not all(isinstance(file_id, str) for file_id in file_ids):
+                return jsonify({'error': 'file_ids必须为字符串列表'}), 400
+            if len(file_ids) > BATCH_MAX_FILES:
+                return jsonify({'error': f'文档过多(最多{BATCH_MAX_FILES}个)'}), 400
+            custom_config = data.get('format_config') or {}
+            config_source = data
+        
+        # 获取编译后的格式配置（可引用模板），相同配置只合并、验证一次；配置无效时不解压
+        format_config, error = resolve_format_config(config_source, custom_config)
+        if error:
+            return error
+        
+        config_hash = format_config.hash
+        
+        if 'file' in request.files:
+            documents = extract_documents(archive.stream, UPLOAD_FOLDER, MAX_FILE_SIZE, BATCH_MAX_FILES)
+            
+            # 解出的文档与普通上传一样登记，后续可单独排版或下载；中途失败时撤销已登记的文档
+            created_at = datetime.now()
+            stored = []
+            try:
+                for document in documents:
+                    store_file(document['path'], document['file_id'], document['content_hash'],
+                               document['original_name'], created_at=created_at)
+                    stored.append(document['file_id'])
+            except BaseException:
+                for file_id in stored:
+                    release_file(file_id)
+                remove_documents(documents)
+                raise
+            file_ids = stored
+            logger.info(f"批量上传解压完成: {len(file_ids)}个文档")
+        
+    except RequestEntityTooLarge:
+        logger.warning("批量上传中止: 压缩包大小超过限制")
+        return jsonify({'error': f'压缩包大小超过限制(最大20MB)'}), 413
+    except ValueError as e:
+        logger.error(f"批量检查失败: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"批量检查失败: {str(e)}")
+        return jsonify({'error': f'批量检查失败: {str(e)}'}), 500
+    
+    def to_line(record):
+        return json.dumps(record, ensure_ascii=False) + '\n'
+    
+    def generate():
+        reports = []
+        errors = 0
+        pending = {}
+        
+        def finish(future):
+            """取出一个已完成文档的结果行"""
+            nonlocal errors
+            file_id, file_info, cache_key = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"批量检查文档失败: {file_id} - {str(e)}")
+                errors += 1
+                return to_line({'type': 'error', 'file_id': file_id, 'filename': file_info['original_name'],
+                                'error': str(e)})
+            
+            record_timings(result['timings'])
+            report = result['report']
+            report_cache.put(cache_key, report, file_expires_at(file_info))
+            reports.append(report)
+            return to_line({'type': 'result', 'file_id': file_id, 'filename': file_info['original_name'],
+                            'cached': False, 'report': report})
+        
+        try:
+            for file_id in file_ids:
+                file_info = file_registry.get(file_id)
+                if file_info is None or not os.path.exists(file_info['path']):
+                    errors += 1
+                    yield to_line({'type': 'error', 'file_id': file_id, 'error': '文件不存在或已过期'})
+                    continue
+                
+                cache_key = (file_info['content_hash'], config_hash)
+                report = report_cache.get(cache_key)
+                if report is not None:
+                    reports.append(report)
+                    yield to_line({'type': 'result', 'file_id': file_id, 'filename': file_info['original_name'],
+                                   'cached': True, 'report': report})
+                    continue
+                
+                try:
+                    cost = estimate_cost(file_info['path'])['cost']
+                except ValueError as e:
+                    errors += 1
+                    yield to_line({'type': 'error', 'file_id': file_id, 'filename': file_info['original_name'],
+                                   'error': str(e)})
+                    continue
+                
+                # 重型通道容量不足时先输出已完成的文档，没有本批次的文档在处理时按建议时间等待
+                while True:
+                    try:
+                        ticket = admission.acquire(cost, AdmissionController.LANE_HEAVY)
+                        break
+                    except AdmissionRejected as e:
+                        if pending:
+                            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                            for future in done:
+                                yield finish(future)
+                        else:
+                            time.sleep(e.retry_after)
+                
+                stream = file_info['size'] >= STREAM_CHECK_MIN_BYTES
+                try:
+                    future = job_queue.execute(run_check_job, file_info['path'], format_config, stream)
+                except BaseException:
+                    admission.release(ticket)
+                    raise
+                # 文档处理结束（包括客户端断开后被取消）时释放准入凭证
+                future.add_done_callback(lambda _, ticket=ticket: admission.release(ticket))
+                pending[future] = (file_id, file_info, cache_key)
+            
+            for future in as_completed(list(pending)):
+                yield finish(future)
+        finally:
+            # 客户端中途断开时取消尚未开始的文档
+            for future in pending:
+                future.cancel()
+        
+        summary = summarize_reports(reports, errors=errors)
+        logger.info(f"批量检查完成: {summary['checked']}个文档 - 平均合格率 {summary['average_pass_rate']}%")
+        yield to_line({'type': 'summary', **summary})
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.route('/api/download/<file_id>', methods=['GET'])
 def download_file(file_id):
     """文件下载接口"""
     try:
-        if file_id not in file_storage:
+        file_info = file_registry.get(file_id)
+        if file_info is None:
             return jsonify({'error': '文件不存在或已过期'}), 404
         
-        file_info = file_storage[file_id]
         file_path = file_info['path']
         
         if not os.path.exists(file_path):
@@ -231,53 +965,154 @@ def download_file(file_id):
         
         logger.info(f"文件下载: {file_id} - {file_info['original_name']}")
         
-        return send_file(
-            file_path,
+        # 内容哈希即强ETag，同一file_id的内容不会改变
+        etag = file_info['content_hash']
+        
+        if DOWNLOAD_OFFLOAD:
+            # 条件请求在这里判断，Range请求与文件传输交给代理
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+            
+            response = send_file_from_proxy(
+                os.path.abspath(file_path),
+                request.environ,
+                mimetype=DOCX_MIMETYPE,
+                as_attachment=True,
+                download_name=file_info['original_name'],
+                conditional=False,
+                etag=etag,
+                last_modified=file_info['created_at'],
+                use_x_sendfile=True,
+                response_class=app.response_class
+            )
+            if DOWNLOAD_OFFLOAD == 'x-accel-redirect':
+                relative_path = os.path.relpath(file_path, BLOB_FOLDER).replace(os.sep, '/')
+                del response.headers['X-Sendfile']
+                response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX + relative_path
+            return response
+        
+        # 支持If-None-Match/If-Modified-Since与Range断点续传
+        response = send_file(
+            os.path.abspath(file_path),
             as_attachment=True,
             download_name=file_info['original_name'],
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            mimetype=DOCX_MIMETYPE,
+            conditional=True,
+            etag=etag,
+            last_modified=file_info['created_at']
         )
+        response.accept_ranges = 'bytes'
+        return response
         
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         logger.error(f"文件下载失败: {str(e)}")
         return jsonify({'error': f'文件下载失败: {str(e)}'}), 500
 
 @app.route('/api/templates', methods=['GET'])
 def get_templates():
-    """获取格式模板列表"""
+    """获取格式模板列表，返回预先序列化的列表并支持If-None-Match"""
     try:
-        templates = FormatConfig.get_preset_templates()
-        
-        template_list = []
-        for name, config in templates.items():
-            template_list.append({
-                'name': name,
-                'description': f'{name}格式模板',
-                'config': config
-            })
+        body, etag = template_registry.listing()
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
         
-        return jsonify({
-            'templates': template_list,
-            'default': '国标通用'
-        }), 200
+    except Exception as e:
+        logger.error(f"获取模板失败: {str(e)}")
+        return jsonify({'error': f'获取模板失败: {str(e)}'}), 500
+
+@app.route('/api/templates/<template_id>', methods=['GET'])
+def get_template(template_id):
+    """获取单个模板，ETag为模板版本号"""
+    try:
+        entry = template_registry.get(template_id)
+        response = Response(entry['json'], mimetype='application/json')
+        response.set_etag(entry['version'])
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
         
+    except TemplateNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         logger.error(f"获取模板失败: {str(e)}")
         return jsonify({'error': f'获取模板失败: {str(e)}'}), 500
 
+@app.route('/api/templates', methods=['POST'])
+def save_template():
+    """保存用户模板，请求带If-Match时只在模板仍为该版本时覆盖"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('name') or not isinstance(data.get('config'), dict):
+            return jsonify({'error': '缺少name或config参数'}), 400
+        
+        # 防止覆盖他人在读取之后保存的版本，If-Match: *要求模板已存在
+        if request.if_match:
+            try:
+                current_version = template_registry.get(data['name'])['version']
+            except TemplateNotFoundError:
+                current_version = None
+            if current_version is None or not request.if_match.contains(current_version):
+                return jsonify({
+                    'error': f"模板版本已更新: {data['name']}",
+                    'current_version': current_version
+                }), 412
+        
+        entry = template_registry.save(data['name'], data['config'], data.get('description', ''))
+        
+        response = jsonify({
+            'id': data['name'],
+            'version': entry['version'],
+            'message': '模板已保存'
+        })
+        response.status_code = 201
+        response.set_etag(entry['version'])
+        return response
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"保存模板失败: {str(e)}")
+        return jsonify({'error': f'保存模板失败: {str(e)}'}), 500
+
+@app.route('/api/templates/<template_id>', methods=['DELETE'])
+def delete_template(template_id):
+    """删除用户模板"""
+    try:
+        template_registry.delete(template_id)
+        return jsonify({'message': '模板已删除'}), 200
+        
+    except TemplateNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"删除模板失败: {str(e)}")
+        return jsonify({'error': f'删除模板失败: {str(e)}'}), 500
+
 @app.route('/api/export-config', methods=['POST'])
 def export_config():
-    """导出格式配置"""
+    """导出格式配置，引用模板时直接返回预先序列化的配置"""
     try:
         data = request.get_json()
-        config = data.get('config', FormatConfig.get_default_config())
         
-        config_json = FormatConfig.export_config(config)
+        if data.get('template_id') and not data.get('config'):
+            config_json = template_registry.get(data['template_id'])['export_json']
+        else:
+            config = data.get('config', FormatConfig.get_default_config())
+            config_json = FormatConfig.export_config(config)
         
         return jsonify({
             'config_json': config_json
         }), 200
         
+    except TemplateNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         logger.error(f"导出配置失败: {str(e)}")
         return jsonify({'error': f'导出配置失败: {str(e)}'}), 500
@@ -305,6 +1140,11 @@ def import_config():
         logger.error(f"导入配置失败: {str(e)}")
         return jsonify({'error': f'导入配置失败: {str(e)}'}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """获取缓存统计信息"""
+    return jsonify(component_stats()), 200
+
 @app.route('/')
 @app.route('/<path:path>')
 def serve_static(path="index.html"):
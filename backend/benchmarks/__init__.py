@@ -0,0 +1,10 @@
+"""
+性能基准
+
+generator按参数确定性地生成合成论文，run对文档加载、各检查阶段、各排版阶段
+与保存分别计时，输出10~1000页的伸缩曲线（JSON），便于比较不同版本的结果。
+
+示例（在backend目录下运行）:
+    python -m benchmarks.run --pages 10,100,1000 -o bench.json
+    python -m benchmarks.run --baseline bench.json --tolerance 0.2
+"""
@@ -0,0 +1,254 @@
+import io
+import base64
+import random
+import zipfile
+from typing import Dict, Any, List
+from docx import Document
+from docx.enum.section import WD_SECTION
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Pt, Cm
+
+# 按小四号字、1.5倍行距的A4页面估算：每页约5个正文段落，每章约10页
+PARAGRAPHS_PER_PAGE = 5
+PAGES_PER_CHAPTER = 10
+# 正文段落的目标字数
+PARAGRAPH_CHARS = 200
+
+# 1x1像素的PNG，作为插图内容
+_PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+# 写入zip条目的固定时间戳，保证相同参数生成的文件逐字节相同
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_PHRASES = (
+    "本文针对该问题提出了一种改进方法", "实验结果表明所提方法具有较好的效果",
+    "在此基础上进一步分析了影响因素", "相关研究主要集中在以下几个方面",
+    "为了验证模型的有效性", "该方法在多个数据集上取得了稳定的结果",
+    "与传统方法相比计算开销明显降低", "下面对系统的总体结构进行说明",
+    "由于样本数量有限", "综合考虑精度与效率",
+    "如图所示各模块之间通过接口交互", "参数设置参考了已有文献的经验值"
+)
+_TOPICS = ("研究背景", "相关工作", "系统设计", "算法实现", "实验分析", "结果讨论", "方法概述", "数据处理")
+_CHAPTERS = ("绪论", "相关理论与技术", "系统需求分析", "总体设计", "详细实现", "实验与分析", "总结与展望")
+
+# 正文run的格式变化及其权重：多数run符合常见模板，少数不符合以覆盖检查与排版的各个分支
+_RUN_FONTS = (("宋体", 8), ("仿宋", 1), ("Times New Roman", 1))
+_RUN_SIZES = ((12, 8), (10.5, 1), (14, 1))
+
+
+def _weighted(rng: random.Random, choices) -> Any:
+    """按权重选取"""
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _sentence_text(rng: random.Random, length: int) -> str:
+    """由短语拼接出约length字的文本"""
+    parts = []
+    total = 0
+    while total < length:
+        phrase = rng.choice(_PHRASES)
+        parts.append(phrase)
+        total += len(phrase) + 1
+    return "，".join(parts) + "。"
+
+
+def _split(text: str, count: int) -> List[str]:
+    """将文本切分为count段，用作各run的文本"""
+    count = max(1, min(count, len(text)))
+    size = len(text) // count
+    pieces = [text[i * size:(i + 1) * size] for i in range(count - 1)]
+    pieces.append(text[(count - 1) * size:])
+    return pieces
+
+
+def _add_run(paragraph, text: str, font_name: str, font_size: float, bold: bool = False):
+    """添加run并直接设置字体（含东亚字体）、字号与加粗"""
+    run = paragraph.add_run(text)
+    run.font.name = font_name
+    run.element.rPr.rFonts.set(qn("w:eastAsia"), font_name)
+    run.font.size = Pt(font_size)
+    if bold:
+        run.font.bold = True
+    return run
+
+
+def _add_body_paragraph(doc, rng: random.Random, runs_per_paragraph: int):
+    """添加正文段落，文本按runs_per_paragraph切分，各run格式按权重随机"""
+    paragraph = doc.add_paragraph()
+    for piece in _split(_sentence_text(rng, PARAGRAPH_CHARS), runs_per_paragraph):
+        _add_run(paragraph, piece, _weighted(rng, _RUN_FONTS), _weighted(rng, _RUN_SIZES), rng.random() < 0.05)
+    if rng.random() < 0.8:
+        paragraph.paragraph_format.first_line_indent = Cm(0.74)
+    return paragraph
+
+
+def _add_heading(doc, rng: random.Random, text: str, level: int):
+    """
+    添加标题：大部分使用内置标题样式，其余为仅设置了字体的普通段落，
+    后者需要通过文本模式识别级别
+    """
+    if rng.random() < 0.7:
+        return doc.add_heading(text, level=level)
+    paragraph = doc.add_paragraph()
+    _add_run(paragraph, text, "黑体", {1: 16, 2: 14, 3: 12}.get(level, 12), True)
+    return paragraph
+
+
+def _add_caption(doc, text: str):
+    """添加图表标题"""
+    paragraph = doc.add_paragraph()
+    _add_run(paragraph, text, "宋体", 10.5)
+    paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    return paragraph
+
+
+def _add_figure(doc, chapter: int, number: int):
+    """添加插图及其下方的图题"""
+    doc.add_paragraph().add_run().add_picture(io.BytesIO(_PIXEL_PNG), width=Cm(8))
+    _add_caption(doc, f"图{chapter}.{number} 系统结构示意图")
+
+
+def _add_table(doc, rng: random.Random, chapter: int, number: int):
+    """添加表题及其下方的数据表"""
+    _add_caption(doc, f"表{chapter}.{number} 实验数据对比")
+    table = doc.add_table(rows=4, cols=3)
+    for row_index, row in enumerate(table.rows):
+        for cell in row.cells:
+            cell.text = "指标" if row_index == 0 else f"{rng.uniform(0, 100):.2f}"
+
+
+def _set_header(section, index: int):
+    """设置节的页眉与页脚"""
+    section.header.is_linked_to_previous = False
+    section.header.paragraphs[0].text = f"合成论文基准文档 第{index}部分"
+    section.footer.is_linked_to_previous = False
+    section.footer.paragraphs[0].text = f"- {index} -"
+
+
+def _normalized_zip(data: bytes) -> bytes:
+    """以固定时间戳重新打包，消除保存时间对文件内容的影响"""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, \
+            zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(zipfile.ZipInfo(info.filename, _ZIP_DATE_TIME), source.read(info.filename),
+                            compress_type=zipfile.ZIP_DEFLATED)
+    return output.getvalue()
+
+
+def generate_thesis(output, pages: int = 10, headings_per_chapter: int = 3, runs_per_paragraph: int = 2,
+                    figures_per_chapter: int = 2, tables_per_chapter: int = 1, sections: int = 1,
+                    seed: int = 0) -> Dict[str, Any]:
+    """
+    生成合成论文
+
+    文档包含封面、中英文摘要、目录、若干章正文、参考文献与致谢。相同参数生成的
+    文件逐字节相同，不同版本的基准结果可以直接比较。
+
+    Args:
+        output: 保存路径或可写的文件对象
+        pages: 正文页数（估算），决定章数与正文段落数
+        headings_per_chapter: 每章的二级标题数，每个二级标题下另有一个三级标题
+        runs_per_paragraph: 每个正文段落的run数
+        figures_per_chapter: 每章插图数
+        tables_per_chapter: 每章表格数
+        sections: 带页眉页脚的节数，章节平均分配到各节；为0时不设置页眉页脚
+        seed: 随机种子
+
+    Returns:
+        文档的结构统计
+    """
+    if pages < 1:
+        raise ValueError("页数必须大于0")
+
+    rng = random.Random(seed)
+    doc = Document()
+    chapters = max(1, round(pages / PAGES_PER_CHAPTER))
+    body_paragraphs = pages * PARAGRAPHS_PER_PAGE
+    headings_per_chapter = max(1, headings_per_chapter)
+    stats = {
+        "pages": pages,
+        "chapters": chapters,
+        "headings": 0,
+        "body_paragraphs": body_paragraphs,
+        "figures": 0,
+        "tables": 0,
+        "sections": min(max(0, sections), chapters),
+        "seed": seed
+    }
+
+    # 封面、摘要与目录
+    title = doc.add_paragraph()
+    _add_run(title, "基于合成数据的论文格式检查性能研究", "黑体", 22, True)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    abstract_title = doc.add_paragraph()
+    _add_run(abstract_title, "摘  要", "黑体", 16, True)
+    abstract_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    _add_body_paragraph(doc, rng, runs_per_paragraph)
+    doc.add_paragraph("关键词：格式检查；性能；基准测试")
+    english_title = doc.add_paragraph()
+    _add_run(english_title, "Abstract", "Times New Roman", 16, True)
+    english_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph("This thesis studies the performance of format checking on synthetic documents.")
+    doc.add_paragraph("目  录")
+    for chapter in range(1, chapters + 1):
+        doc.add_paragraph(f"第{chapter}章 {_CHAPTERS[(chapter - 1) % len(_CHAPTERS)]}\t{chapter * PAGES_PER_CHAPTER}")
+
+    # 各节包含的章数
+    section_count = stats["sections"]
+    chapters_per_section = -(-chapters // section_count) if section_count else 0
+    if section_count:
+        _set_header(doc.sections[0], 1)
+
+    # 正文段落平均分配到各章的各个小节
+    subsections = chapters * headings_per_chapter
+    for chapter in range(1, chapters + 1):
+        if section_count and chapter > 1 and (chapter - 1) % chapters_per_section == 0:
+            _set_header(doc.add_section(WD_SECTION.NEW_PAGE), len(doc.sections))
+
+        _add_heading(doc, rng, f"第{chapter}章 {_CHAPTERS[(chapter - 1) % len(_CHAPTERS)]}", 1)
+        stats["headings"] += 1
+        for heading in range(1, headings_per_chapter + 1):
+            subsection = (chapter - 1) * headings_per_chapter + heading - 1
+            paragraphs = body_paragraphs * (subsection + 1) // subsections - body_paragraphs * subsection // subsections
+            topic = _TOPICS[subsection % len(_TOPICS)]
+
+            _add_heading(doc, rng, f"{chapter}.{heading} {topic}", 2)
+            for index in range(paragraphs):
+                if index == paragraphs // 2:
+                    _add_heading(doc, rng, f"{chapter}.{heading}.1 {topic}细节", 3)
+                    stats["headings"] += 1
+                _add_body_paragraph(doc, rng, runs_per_paragraph)
+            stats["headings"] += 1
+
+        for number in range(1, figures_per_chapter + 1):
+            _add_figure(doc, chapter, number)
+        for number in range(1, tables_per_chapter + 1):
+            _add_table(doc, rng, chapter, number)
+        stats["figures"] += figures_per_chapter
+        stats["tables"] += tables_per_chapter
+
+    # 参考文献与致谢，文献数量随页数增长
+    doc.add_paragraph("参考文献")
+    for index in range(1, max(5, pages // 2) + 1):
+        doc.add_paragraph(f"[{index}] 作者{index}. 论文题目{index}[J]. 学报, {2000 + index % 24}, {index % 12 + 1}(2): 1-10.")
+    doc.add_paragraph("致  谢")
+    _add_body_paragraph(doc, rng, runs_per_paragraph)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    data = _normalized_zip(buffer.getvalue())
+    if isinstance(output, str):
+        with open(output, "wb") as f:
+            f.write(data)
+    else:
+        output.write(data)
+
+    stats["paragraphs"] = len(doc.paragraphs)
+    stats["runs"] = sum(len(p._p.r_lst) for p in doc.paragraphs)
+    stats["bytes"] = len(data)
+    return stats
@@ -0,0 +1,380 @@
+"""
+排版与检查性能基准
+
+对每个页数生成合成论文，分阶段计时：文档解析与建立索引、各_check_*检查阶段、
+各_apply_*排版阶段与保存，另对完整的check_format与流式检查整体计时。
+每个阶段重复多次取中位数，结果与运行环境、生成参数一起输出为JSON；
+对数坐标下拟合的伸缩指数反映各阶段随文档规模的增长方式（1.0为线性）。
+
+示例（在backend目录下运行）:
+    python -m benchmarks.run -o bench.json
+    python -m benchmarks.run --pages 10,100 --engine docx --repeat 5
+    python -m benchmarks.run --baseline bench.json --tolerance 0.2
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import logging
+import statistics
+import tempfile
+from typing import Dict, List, Any, Callable, Optional
+import docx
+from docx import Document
+from lxml import etree
+from utils.docx_processor import DocxProcessor
+from utils.stream_checker import StreamChecker
+from utils.xml_formatter import XmlFormatter
+from utils.style_formatter import StyleFormatter
+from utils.diff_formatter import DiffFormatter
+from utils.docx_writer import save_document, COMPRESS_LEVELS
+from utils.format_config import FormatConfig
+from utils.compiled_config import compile_config
+from benchmarks.generator import generate_thesis
+
+# 结果格式版本，字段变化时递增，比较时拒绝不同版本的结果
+RESULT_VERSION = 1
+
+DEFAULT_PAGES = (10, 25, 50, 100, 250, 500, 1000)
+
+# 与DocxProcessor.check_format的检查顺序一致，第二项表示是否接收配置参数
+CHECK_PHASES = (
+    ("page_settings", True), ("cover", False), ("abstract", True), ("toc", False),
+    ("headings", True), ("body", True), ("figures", True), ("header_footer", True),
+    ("references", True)
+)
+
+# 短于该秒数的阶段受计时噪声影响较大，比较时不判定为变慢
+MIN_COMPARE_SECONDS = 0.001
+
+
+def _timed(samples: Dict[str, List[float]], name: str, func: Callable, *args) -> Any:
+    """执行并记录一次耗时"""
+    start = time.perf_counter()
+    result = func(*args)
+    samples.setdefault(name, []).append(time.perf_counter() - start)
+    return result
+
+
+def _load(samples: Dict[str, List[float]], path: str) -> DocxProcessor:
+    """分别计时文档解析与建立段落索引"""
+    document = _timed(samples, "load.parse", Document, path)
+    return _timed(samples, "load.index", DocxProcessor, path, document)
+
+
+def run_check(samples: Dict[str, List[float]], path: str, config):
+    """加载文档并逐个计时检查阶段"""
+    processor = _load(samples, path)
+    processor._use_patterns(config)
+    for name, takes_config in CHECK_PHASES:
+        method = getattr(processor, f"_check_{name}")
+        _timed(samples, f"check.{name}", method, *((config,) if takes_config else ()))
+
+    _timed(samples, "check.total", processor.check_format, config)
+    _timed(samples, "stream_check.total", lambda: StreamChecker(path).check_format(config))
+
+
+def run_format(samples: Dict[str, List[float]], path: str, config, engine: str,
+               compress_level: Optional[int] = None):
+    """
+    加载文档并逐个计时排版阶段，阶段划分与DocxProcessor.format_document一致
+
+    保存写入内存，不计磁盘写入时间。
+    """
+    processor = DocxProcessor(path)
+    processor._use_patterns(config)
+    processor.format_stats = {"paragraphs": 0, "runs": 0}
+
+    if engine == "diff":
+        _timed(samples, "format.diff", lambda: DiffFormatter(processor).apply(config))
+    else:
+        _timed(samples, "format.page_settings", processor._apply_page_settings, config)
+        if engine == "xml":
+            _timed(samples, "format.xml", lambda: XmlFormatter(processor).apply(config))
+        elif engine == "style":
+            _timed(samples, "format.style", lambda: StyleFormatter(processor).apply(config))
+        else:
+            _timed(samples, "format.heading_formats", processor._apply_heading_formats, config)
+            _timed(samples, "format.body_formats", processor._apply_body_formats, config)
+    _timed(samples, "format.header_footer", processor._apply_header_footer, config)
+    _timed(samples, "save", save_document, processor.doc, io.BytesIO(), compress_level)
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    """一个阶段的计时汇总（秒）"""
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "samples": values
+    }
+
+
+def _totals(phases: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """按阶段组（load、check、format、save）累加中位耗时，不含整体计时"""
+    totals = {"load": 0.0, "check": 0.0, "format": 0.0, "save": 0.0}
+    for name, timing in phases.items():
+        group = name.split(".")[0]
+        if group in totals and not name.endswith(".total"):
+            totals[group] += timing["median"]
+    return totals
+
+
+def benchmark_document(path: str, config, engine: str, repeat: int,
+                       compress_level: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    对一个文档重复计时
+
+    Returns:
+        阶段名到计时汇总的映射
+    """
+    samples = {}
+    # 预热：首次运行包含模块级缓存（识别模式、编译后配置等）的构建
+    run_check({}, path, config)
+    for _ in range(repeat):
+        run_check(samples, path, config)
+        run_format(samples, path, config, engine, compress_level)
+    return {name: _summary(values) for name, values in samples.items()}
+
+
+def _exponent(points: List[tuple]) -> Optional[float]:
+    """最小二乘拟合log(耗时) = k·log(页数) + b，返回伸缩指数k"""
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return round(covariance / variance, 3)
+
+
+def scaling_curves(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """按阶段整理各页数的中位耗时，并计算伸缩指数与每段落耗时"""
+    curves = {}
+    for result in results:
+        for name, timing in result["phases"].items():
+            curve = curves.setdefault(name, {"pages": [], "seconds": [], "us_per_paragraph": []})
+            curve["pages"].append(result["pages"])
+            curve["seconds"].append(timing["median"])
+            curve["us_per_paragraph"].append(round(timing["median"] / result["document"]["paragraphs"] * 1e6, 3))
+
+    for curve in curves.values():
+        curve["exponent"] = _exponent(list(zip(curve["pages"], curve["seconds"])))
+    return curves
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python_docx": docx.__version__,
+        "lxml": ".".join(str(part) for part in etree.LXML_VERSION)
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    与基线结果逐页数、逐阶段比较中位耗时
+
+    Args:
+        tolerance: 允许的变慢比例，如0.2表示慢20%以内不算回退
+
+    Returns:
+        比较记录列表，ratio为当前/基线，regressed表示超出容忍范围
+
+    Raises:
+        ValueError: 结果格式版本不一致
+    """
+    if baseline.get("version") != current.get("version"):
+        raise ValueError(f"结果格式版本不一致: {baseline.get('version')} != {current.get('version')}")
+
+    baseline_results = {result["pages"]: result for result in baseline.get("results", [])}
+    rows = []
+    for result in current["results"]:
+        base = baseline_results.get(result["pages"])
+        if base is None:
+            continue
+        for name, timing in result["phases"].items():
+            if name not in base["phases"]:
+                continue
+            before = base["phases"][name]["median"]
+            after = timing["median"]
+            ratio = after / before if before > 0 else None
+            rows.append({
+                "pages": result["pages"],
+                "phase": name,
+                "baseline": before,
+                "current": after,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regressed": (
+                    tolerance is not None and ratio is not None
+                    and after >= MIN_COMPARE_SECONDS and ratio > 1 + tolerance
+                )
+            })
+    return rows
+
+
+def run(pages: List[int], engine: str = "xml", repeat: int = 3, config=None, work_dir: Optional[str] = None,
+        compress_level: Optional[int] = None, progress: Callable[[str], None] = None,
+        **generator_options) -> Dict[str, Any]:
+    """
+    生成各页数的合成论文并计时
+
+    Args:
+        pages: 页数列表
+        engine: 排版引擎，见DocxProcessor.ENGINES
+        repeat: 每个文档的重复次数
+        config: 格式配置，默认为国标通用
+        work_dir: 合成论文的存放目录，为None时使用临时目录
+        compress_level: 保存时的zip压缩级别
+        progress: 进度输出函数
+        generator_options: 传给generate_thesis的其余参数
+
+    Returns:
+        可JSON序列化的基准结果
+    """
+    config = compile_config(config)
+    progress = progress or (lambda message: None)
+    results = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = work_dir or temp_dir
+        os.makedirs(directory, exist_ok=True)
+        for page_count in pages:
+            path = os.path.join(directory, f"thesis_{page_count}p.docx")
+            document = generate_thesis(path, pages=page_count, **generator_options)
+
+            start = time.perf_counter()
+            phases = benchmark_document(path, config, engine, repeat, compress_level)
+            progress(f"{page_count}页: {document['paragraphs']}段, "
+                     f"{len(phases)}个阶段, 用时{time.perf_counter() - start:.2f}s")
+
+            results.append({
+                "pages": page_count,
+                "document": document,
+                "phases": phases,
+                "totals": _totals(phases)
+            })
+
+    return {
+        "version": RESULT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "parameters": {
+            "engine": engine,
+            "repeat": repeat,
+            "compress_level": compress_level,
+            "config_hash": config.hash,
+            "generator": generator_options
+        },
+        "results": results,
+        "scaling": scaling_curves(results)
+    }
+
+
+def _page_list(value: str) -> List[int]:
+    """解析逗号分隔的页数列表"""
+    try:
+        pages = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"页数列表无效: {value}")
+    if not pages or min(pages) < 1:
+        raise argparse.ArgumentTypeError(f"页数必须大于0: {value}")
+    return sorted(set(pages))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='论文格式检查与排版性能基准')
+    parser.add_argument('--pages', type=_page_list, default=list(DEFAULT_PAGES),
+                        help='逗号分隔的页数列表，默认为10~1000页的伸缩曲线')
+    parser.add_argument('--engine', choices=DocxProcessor.ENGINES, default='xml', help='排版引擎')
+    parser.add_argument('--repeat', type=int, default=3, help='每个文档的重复次数，取中位数')
+    parser.add_argument('--template', help='预设模板名，默认为国标通用')
+    parser.add_argument('--compress-level', type=int, choices=COMPRESS_LEVELS, help='保存时的zip压缩级别0-9')
+
+    generator_group = parser.add_argument_group('合成论文参数')
+    generator_group.add_argument('--headings-per-chapter', type=int, default=3, help='每章的二级标题数')
+    generator_group.add_argument('--runs-per-paragraph', type=int, default=2, help='每个正文段落的run数')
+    generator_group.add_argument('--figures-per-chapter', type=int, default=2, help='每章插图数')
+    generator_group.add_argument('--tables-per-chapter', type=int, default=1, help='每章表格数')
+    generator_group.add_argument('--sections', type=int, default=1, help='带页眉页脚的节数')
+    generator_group.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    parser.add_argument('--work-dir', help='保留生成的合成论文的目录，默认使用临时目录')
+    parser.add_argument('--output', '-o', help='JSON结果文件，默认输出到标准输出')
+    parser.add_argument('--baseline', help='用于比较的基线结果文件')
+    parser.add_argument('--tolerance', type=float,
+                        help='允许的变慢比例（如0.2），超出时返回非0退出码，需同时指定--baseline')
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    config = None
+    if args.template:
+        templates = FormatConfig.get_preset_templates()
+        if args.template not in templates:
+            print(f"预设模板不存在: {args.template}，可选: {', '.join(templates)}", file=sys.stderr)
+            return 2
+        config = templates[args.template]
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取基线结果失败: {str(e)}", file=sys.stderr)
+            return 2
+
+    result = run(
+        args.pages, engine=args.engine, repeat=max(1, args.repeat), config=config,
+        work_dir=args.work_dir, compress_level=args.compress_level,
+        progress=lambda message: print(message, file=sys.stderr),
+        headings_per_chapter=args.headings_per_chapter, runs_per_paragraph=args.runs_per_paragraph,
+        figures_per_chapter=args.figures_per_chapter, tables_per_chapter=args.tables_per_chapter,
+        sections=args.sections, seed=args.seed
+    )
+
+    exit_code = 0
+    if baseline is not None:
+        try:
+            rows = compare(result, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"无法与基线比较: {str(e)}", file=sys.stderr)
+            return 2
+        if baseline.get("parameters") != result["parameters"]:
+            print("警告: 基线结果的运行参数与本次不同，比较结果仅供参考", file=sys.stderr)
+        result["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "phases": rows}
+        for row in rows:
+            if row["ratio"] is not None:
+                marker = " <- 变慢" if row["regressed"] else ""
+                print(f"{row['pages']:>5}页 {row['phase']:<24} {row['baseline'] * 1000:10.2f}ms -> "
+                      f"{row['current'] * 1000:10.2f}ms  x{row['ratio']:.2f}{marker}", file=sys.stderr)
+        if any(row["regressed"] for row in rows):
+            exit_code = 1
+
+    data = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
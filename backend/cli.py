@@ -0,0 +1,217 @@
+"""
+论文格式命令行工具
+
+不经过Flask服务，直接对目录或通配符匹配到的文档批量检查或排版，
+适合在定时任务中处理归档目录。
+
+示例:
+    python cli.py check theses/ --template 理工科论文 --jobs 8 -o reports.jsonl
+    python cli.py format "2024/**/*.docx" --config my_config.json --output-dir formatted/
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import logging
+from multiprocessing import Pool
+from typing import Dict, List, Any, Tuple
+from utils.docx_processor import DocxProcessor
+from utils.format_config import FormatConfig
+from utils.compiled_config import compile_config
+from utils.job_queue import run_check_job, run_format_job
+from utils.docx_writer import COMPRESS_LEVELS
+
+# 超过该大小的文档使用流式检查器，与服务端配置一致
+STREAM_CHECK_MIN_BYTES = int(os.environ.get('STREAM_CHECK_MIN_BYTES', 5 * 1024 * 1024))
+
+
+def collect_documents(inputs: List[str]) -> List[str]:
+    """
+    展开目录与通配符，返回去重后的.docx文件列表
+
+    Args:
+        inputs: 文件、目录或通配符
+
+    Returns:
+        文档路径列表
+    """
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '**', '*.docx'), recursive=True)
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+
+        for path in sorted(matches):
+            # 跳过Word打开文档时生成的锁文件
+            if path.lower().endswith('.docx') and not os.path.basename(path).startswith('~$'):
+                paths.append(os.path.normpath(path))
+
+    return list(dict.fromkeys(paths))
+
+
+def load_config(template: str = None, config_path: str = None) -> Dict[str, Any]:
+    """
+    根据预设模板名或配置文件生成完整配置
+
+    Raises:
+        ValueError: 模板不存在或配置无效
+    """
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return compile_config(FormatConfig.import_config(f.read()))
+
+    templates = FormatConfig.get_preset_templates()
+    name = template or '国标通用'
+    if name not in templates:
+        raise ValueError(f"模板不存在: {name}，可选模板: {', '.join(templates)}")
+
+    try:
+        return compile_config(templates[name])
+    except ValueError as e:
+        raise ValueError(f"格式配置错误: {str(e)}")
+
+
+def formatted_output_path(path: str, output_dir: str, base_dir: str = None) -> str:
+    """
+    排版结果的保存路径，文件名与服务端命名方式一致
+
+    Args:
+        path: 文档路径
+        output_dir: 排版结果目录
+        base_dir: 输入文档的公共根目录，文档相对它的子目录在output_dir下保留
+    """
+    name_without_ext = os.path.splitext(os.path.basename(path))[0]
+    relative_dir = os.path.relpath(os.path.dirname(os.path.abspath(path)), base_dir) if base_dir else '.'
+    return os.path.normpath(os.path.join(output_dir, relative_dir, f"{name_without_ext}_已排版.docx"))
+
+
+def plan_output_paths(paths: List[str], output_dir: str) -> Dict[str, str]:
+    """
+    为每个文档分配排版结果路径
+
+    不同目录下的同名文档按各自相对公共根目录的子目录分开保存，避免互相覆盖。
+
+    Raises:
+        ValueError: 仍有多个文档对应同一个输出文件
+    """
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    outputs = {path: formatted_output_path(path, output_dir, base_dir) for path in paths}
+
+    owners = {}
+    for path, output_path in outputs.items():
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in owners:
+            raise ValueError(f"{owners[key]} 与 {path} 的排版结果都将保存为 {output_path}")
+        owners[key] = path
+    return outputs
+
+
+def process_document(task: Tuple) -> Dict[str, Any]:
+    """
+    在工作进程中处理一个文档，异常转换为错误记录
+
+    Args:
+        task: (命令, 文档路径, 配置, 排版结果路径, 排版引擎, 是否复查, zip压缩级别)
+    """
+    command, path, config, output_path, engine, verify, compress_level = task
+    record = {"file": path}
+    try:
+        if command == 'check':
+            stream = os.path.getsize(path) >= STREAM_CHECK_MIN_BYTES
+            report = run_check_job(path, config, stream)["report"]
+            record.update({"pass_rate": report["pass_rate"], "report": report})
+        else:
+            result = run_format_job(path, config, output_path, engine, verify, compress_level)
+            record.update({"output": output_path, "format_stats": result["format_stats"]})
+            if result["report"] is not None:
+                record.update({"pass_rate": result["report"]["pass_rate"], "report": result["report"]})
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='论文格式批量检查与排版')
+    parser.add_argument('command', choices=('check', 'format'), help='check: 格式检查；format: 一键排版')
+    parser.add_argument('inputs', nargs='+', help='文档、目录或通配符（支持**）')
+
+    config_group = parser.add_mutually_exclusive_group()
+    config_group.add_argument('--template', help='预设模板名，默认为国标通用')
+    config_group.add_argument('--config', help='格式配置JSON文件')
+
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help='工作进程数，默认为CPU核心数')
+    parser.add_argument('--chunksize', type=int, default=0, help='每次分发给工作进程的文档数，默认自动计算')
+    parser.add_argument('--output', '-o', help='JSON Lines结果文件，默认输出到标准输出')
+    parser.add_argument('--output-dir', default='formatted', help='排版结果目录，保留输入文档的子目录结构（format命令）')
+    parser.add_argument('--engine', choices=DocxProcessor.ENGINES, default='xml', help='排版引擎（format命令）')
+    parser.add_argument('--verify', action='store_true', help='排版后复查并输出报告（format命令）')
+    parser.add_argument('--compress-level', type=int, choices=COMPRESS_LEVELS,
+                        help='排版结果的zip压缩级别0-9，越低越快、文件越大（format命令）')
+    parser.add_argument('--verbose', '-v', action='store_true', help='输出逐个文档的处理日志')
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # docx_processor导入时已配置INFO级别日志，这里按需重新设置根日志级别
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        config = load_config(args.template, args.config)
+    except (OSError, ValueError) as e:
+        print(f"加载配置失败: {str(e)}", file=sys.stderr)
+        return 2
+
+    paths = collect_documents(args.inputs)
+    if not paths:
+        print("未找到.docx文档", file=sys.stderr)
+        return 2
+
+    output_paths = {}
+    if args.command == 'format':
+        try:
+            output_paths = plan_output_paths(paths, args.output_dir)
+        except ValueError as e:
+            print(f"排版结果路径冲突: {str(e)}", file=sys.stderr)
+            return 2
+        for output_path in output_paths.values():
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    jobs = max(1, min(args.jobs, len(paths)))
+    # 文档较多时成批分发，减少进程间通信次数
+    chunksize = args.chunksize or max(1, len(paths) // (jobs * 4))
+    tasks = [
+        (args.command, path, config, output_paths.get(path), args.engine, args.verify, args.compress_level)
+        for path in paths
+    ]
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    start = time.perf_counter()
+    try:
+        with Pool(processes=jobs) as pool:
+            for record in pool.imap_unordered(process_document, tasks, chunksize=chunksize):
+                if 'error' in record:
+                    failed += 1
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"处理完成: {len(paths)}个文档, 失败{failed}个, 用时{elapsed:.2f}s, "
+        f"{len(paths) / elapsed if elapsed > 0 else 0:.2f}文档/秒 ({jobs}个进程)",
+        file=sys.stderr
+    )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+from docx import Document
+
+# 测试从backend目录导入utils、benchmarks与cli
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generator import generate_thesis
+
+
+@pytest.fixture(scope="session")
+def thesis_path(tmp_path_factory):
+    """20页、两节的合成论文，整个测试会话共用"""
+    path = str(tmp_path_factory.mktemp("docs") / "thesis.docx")
+    generate_thesis(path, pages=20, sections=2)
+    return path
+
+
+@pytest.fixture
+def make_docx(tmp_path):
+    """生成只含给定段落的小文档"""
+    def make(name, *paragraphs):
+        document = Document()
+        for text in paragraphs:
+            document.add_paragraph(text)
+        path = str(tmp_path / name)
+        document.save(path)
+        return path
+    return make
+
+
+@pytest.fixture(scope="session")
+def app_dir(tmp_path_factory):
+    """应用的工作目录，上传目录、登记表与模板都放在其中"""
+    return tmp_path_factory.mktemp("app")
+
+
+@pytest.fixture(scope="session")
+def app_module(app_dir):
+    """在临时工作目录中导入app，整个测试会话共用一个应用实例"""
+    os.environ["FILE_REGISTRY_URL"] = f"sqlite:///{app_dir / 'registry.db'}"
+    os.environ["TEMPLATE_FOLDER"] = str(app_dir / "user_templates")
+    os.environ["JOB_WORKERS"] = "2"
+    previous = os.getcwd()
+    os.chdir(app_dir)
+    try:
+        import app
+    finally:
+        os.chdir(previous)
+    yield app
+    app.job_queue.shutdown()
+
+
+@pytest.fixture
+def client(app_module, app_dir, monkeypatch):
+    """测试客户端，请求期间工作目录为应用目录（UPLOAD_FOLDER是相对路径）"""
+    monkeypatch.chdir(app_dir)
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """上传文档并返回file_id"""
+    def upload_file(path, filename=None):
+        with open(path, "rb") as f:
+            response = client.post("/api/upload", data={"file": (f, filename or os.path.basename(path))},
+                                   content_type="multipart/form-data")
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()["file_id"]
+    return upload_file
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def registry(request, tmp_path):
+    """内存与SQLite两种文件登记表"""
+    from utils.file_registry import MemoryFileRegistry, SqliteFileRegistry
+    if request.param == "memory":
+        return MemoryFileRegistry()
+    return SqliteFileRegistry(str(tmp_path / "registry.db"))
+
+
+@pytest.fixture
+def add_file(registry):
+    """登记一个文件，created_at为当前时间减去age"""
+    from utils.file_registry import KIND_UPLOAD
+
+    def add(file_id, age=timedelta(0), kind=KIND_UPLOAD, content_hash=None, size=10):
+        registry.add({
+            "file_id": file_id,
+            "path": f"/blobs/{file_id}.docx",
+            "original_name": f"{file_id}.docx",
+            "size": size,
+            "content_hash": content_hash or f"hash-{file_id}",
+            "kind": kind,
+            "created_at": datetime.now() - age
+        })
+    return add
@@ -0,0 +1,140 @@
+import uuid
+import zipfile
+import pytest
+from utils.admission import AdmissionController, AdmissionRejected, estimate_cost, PART_COST
+
+
+@pytest.fixture
+def controller():
+    return AdmissionController(capacity=100, fast_lane_cost=10, fast_lane_slots=1)
+
+
+def test_estimate_cost_reads_only_the_central_directory(thesis_path):
+    cost = estimate_cost(thesis_path)
+    with zipfile.ZipFile(thesis_path) as package:
+        assert cost["document_xml_bytes"] == package.getinfo("word/document.xml").file_size
+        assert cost["parts"] == len(package.infolist())
+    assert cost["cost"] == cost["document_xml_bytes"] + PART_COST * cost["parts"]
+
+
+def test_estimate_cost_rejects_non_zip(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(ValueError):
+        estimate_cost(str(path))
+
+
+def test_heavy_lane_rejects_over_capacity(controller):
+    first = controller.acquire(60)
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire(50)
+    assert info.value.retry_after >= 1
+    assert info.value.cost == 50
+    assert controller.stats()["rejected_heavy"] == 1
+
+    controller.release(first)
+    controller.release(controller.acquire(50))
+    assert controller.stats()["in_flight_heavy_cost"] == 0
+
+
+def test_oversized_request_runs_alone(controller):
+    ticket = controller.acquire(500)
+    assert ticket["lane"] == controller.LANE_HEAVY
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(20)
+    controller.release(ticket)
+
+
+def test_small_document_takes_fast_lane_when_heavy_lane_is_full(controller):
+    heavy = controller.acquire(100)
+    fast = controller.acquire(5)
+    assert fast["lane"] == controller.LANE_FAST
+
+    # 快速通道已满时尝试重型通道的剩余容量，重型通道也满时拒绝
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire(5)
+    assert controller.stats()["rejected_fast"] == 1
+    assert info.value.retry_after >= 1
+
+    controller.release(heavy)
+    overflow = controller.acquire(5)
+    assert overflow["lane"] == controller.LANE_HEAVY
+    for ticket in (fast, overflow):
+        controller.release(ticket)
+
+
+def test_background_work_never_uses_fast_lane(controller):
+    ticket = controller.acquire(5, AdmissionController.LANE_HEAVY)
+    assert ticket["lane"] == controller.LANE_HEAVY
+    controller.release(ticket)
+
+
+def test_capacity_is_released_when_processing_fails(controller):
+    with pytest.raises(RuntimeError):
+        with controller.admit(80):
+            raise RuntimeError("处理失败")
+    stats = controller.stats()
+    assert stats["in_flight_heavy"] == 0 and stats["in_flight_heavy_cost"] == 0
+    controller.release(controller.acquire(80))
+
+
+def test_release_is_idempotent(controller):
+    ticket = controller.acquire(80)
+    controller.release(ticket)
+    controller.release(ticket)
+    assert controller.stats()["in_flight_heavy_cost"] == 0
+
+
+@pytest.fixture
+def admission(app_module, monkeypatch):
+    """容量很小的准入控制器，快速通道只接受代价不超过fast_lane_cost的文档"""
+    def install(fast_lane_cost=0):
+        controller = AdmissionController(capacity=1, fast_lane_cost=fast_lane_cost, fast_lane_slots=1)
+        monkeypatch.setattr(app_module, "admission", controller)
+        return controller
+    return install
+
+
+@pytest.fixture
+def new_file(upload, make_docx):
+    """上传内容唯一的文档，避免命中报告缓存"""
+    return lambda: upload(make_docx("admission.docx", f"正文段落 {uuid.uuid4()}"))
+
+
+def test_busy_server_returns_429_with_retry_after(client, admission, new_file):
+    controller = admission()
+    file_id = new_file()
+    ticket = controller.acquire(1)
+
+    response = client.post("/api/check", json={"file_id": file_id})
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert retry_after >= 1
+    assert response.get_json()["retry_after"] == retry_after
+
+    controller.release(ticket)
+    assert client.post("/api/check", json={"file_id": file_id}).status_code == 200
+
+
+def test_small_document_is_admitted_while_heavy_lane_is_full(client, admission, new_file):
+    controller = admission(fast_lane_cost=1024 * 1024)
+    ticket = controller.acquire(1, AdmissionController.LANE_HEAVY)
+
+    response = client.post("/api/check", json={"file_id": new_file()})
+    assert response.status_code == 200
+    assert controller.stats()["admitted_fast"] == 1
+    controller.release(ticket)
+
+
+def test_failed_request_releases_capacity(client, app_module, admission, new_file, monkeypatch):
+    controller = admission()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("解析失败")
+    monkeypatch.setattr(app_module.document_cache, "get", fail)
+
+    response = client.post("/api/check", json={"file_id": new_file()})
+    assert response.status_code == 500
+    stats = controller.stats()
+    assert stats["admitted_heavy"] == 1
+    assert stats["in_flight_heavy"] == 0 and stats["in_flight_fast"] == 0
@@ -0,0 +1,97 @@
+import io
+import os
+import json
+import zipfile
+import pytest
+from utils.upload_stream import StreamingUploadRequest
+
+SUMMARY_FIELDS = {
+    "documents", "checked", "errors", "average_pass_rate", "median_pass_rate", "min_pass_rate",
+    "max_pass_rate", "pass_rate_distribution", "common_failures"
+}
+
+
+def _archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as package:
+        for name, path in files.items():
+            package.write(path, name)
+    buffer.seek(0)
+    return buffer
+
+
+def _lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    body = response.get_data(as_text=True)
+    assert body.endswith("\n")
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def _part_files(app_dir):
+    return [name for name in os.listdir(app_dir / "temp_uploads") if name.endswith(".part")]
+
+
+def test_zip_batch_streams_one_line_per_document_then_summary(client, app_dir, thesis_path, make_docx):
+    archive = _archive({
+        "2023/thesis.docx": thesis_path,
+        "2024/short.docx": make_docx("short.docx", "第1章 绪论", "这是一段足够长的正文内容，用于格式检查。"),
+        "readme.txt": thesis_path
+    })
+    response = client.post("/api/batch-check", data={
+        "file": (archive, "batch.zip"),
+        "format_config": json.dumps({"body": {"font_size": 12.5}})
+    }, content_type="multipart/form-data")
+    records = _lines(response)
+
+    results, summary = records[:-1], records[-1]
+    assert [record["type"] for record in results] == ["result", "result"]
+    assert sorted(record["filename"] for record in results) == ["short.docx", "thesis.docx"]
+    for record in results:
+        assert set(record) == {"type", "file_id", "filename", "cached", "report"}
+        assert record["cached"] is False
+        assert 0 <= record["report"]["pass_rate"] <= 100
+
+    assert summary["type"] == "summary"
+    assert set(summary) == SUMMARY_FIELDS | {"type"}
+    assert summary["documents"] == summary["checked"] == 2 and summary["errors"] == 0
+    rates = sorted(record["report"]["pass_rate"] for record in results)
+    assert summary["min_pass_rate"] == rates[0] and summary["max_pass_rate"] == rates[-1]
+    assert sum(summary["pass_rate_distribution"].values()) == 2
+    assert _part_files(app_dir) == []
+
+
+def test_file_id_batch_reports_errors_and_cached_results(client, upload, thesis_path):
+    file_id = upload(thesis_path)
+    config = {"body": {"font_size": 13.5}}
+    assert client.post("/api/check", json={"file_id": file_id, "format_config": config}).status_code == 200
+
+    records = _lines(client.post("/api/batch-check", json={"file_ids": [file_id, "missing"], "format_config": config}))
+
+    assert records[0] == {"type": "result", "file_id": file_id, "filename": "thesis.docx", "cached": True,
+                          "report": records[0]["report"]}
+    assert records[1] == {"type": "error", "file_id": "missing", "error": "文件不存在或已过期"}
+    assert records[2]["type"] == "summary"
+    assert (records[2]["documents"], records[2]["checked"], records[2]["errors"]) == (2, 1, 1)
+
+
+@pytest.mark.parametrize("body", [{}, {"file_ids": "abc"}, {"file_ids": [1, 2]}])
+def test_invalid_file_ids_are_rejected(client, body):
+    assert client.post("/api/batch-check", json=body).status_code == 400
+
+
+def test_oversized_archive_is_rejected_before_reading(app_module, client, monkeypatch, thesis_path):
+    monkeypatch.setattr(app_module, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(app_module, "UPLOAD_OVERHEAD", 1024)
+    response = client.post("/api/batch-check", data={"file": (_archive({"a.docx": thesis_path}), "batch.zip")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 413
+
+
+def test_oversized_archive_is_aborted_while_streaming(app_module, client, app_dir, monkeypatch, thesis_path):
+    # 请求体大小未超过预检上限，接收过程中超过上传上限时中止并删除临时文件
+    monkeypatch.setattr(StreamingUploadRequest, "max_upload_size", 1024)
+    response = client.post("/api/batch-check", data={"file": (_archive({"a.docx": thesis_path}), "batch.zip")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 413
+    assert _part_files(app_dir) == []
@@ -0,0 +1,39 @@
+import os
+import json
+import shutil
+import pytest
+import cli
+
+
+def test_output_paths_mirror_input_directories(tmp_path):
+    paths = [str(tmp_path / "2023" / "a.docx"), str(tmp_path / "2024" / "a.docx")]
+    outputs = cli.plan_output_paths(paths, "out")
+    assert outputs == {
+        paths[0]: os.path.join("out", "2023", "a_已排版.docx"),
+        paths[1]: os.path.join("out", "2024", "a_已排版.docx")
+    }
+
+
+def test_single_directory_writes_directly_into_output_dir(tmp_path):
+    path = str(tmp_path / "a.docx")
+    assert cli.plan_output_paths([path], "out") == {path: os.path.join("out", "a_已排版.docx")}
+
+
+def test_colliding_outputs_are_rejected(tmp_path):
+    path = str(tmp_path / "a.docx")
+    with pytest.raises(ValueError):
+        cli.plan_output_paths([path, os.path.join(str(tmp_path), ".", "a.docx")], "out")
+
+
+def test_format_keeps_same_named_documents_apart(thesis_path, tmp_path, capsys):
+    for directory in ("x", "y"):
+        os.makedirs(tmp_path / "in" / directory)
+        shutil.copy(thesis_path, tmp_path / "in" / directory / "a.docx")
+
+    output_dir = str(tmp_path / "out")
+    assert cli.main(["format", str(tmp_path / "in"), "--output-dir", output_dir, "--jobs", "1"]) == 0
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert sorted(os.path.relpath(record["output"], output_dir) for record in records) == \
+        [os.path.join("x", "a_已排版.docx"), os.path.join("y", "a_已排版.docx")]
+    assert all(os.path.exists(record["output"]) for record in records)
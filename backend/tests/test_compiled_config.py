@@ -0,0 +1,77 @@
+import copy
+import json
+import pickle
+import pytest
+from docx.shared import Pt
+from utils.compiled_config import CompiledConfig, compile_config, compiled_config_stats, thaw
+from utils.format_config import FormatConfig
+
+
+def test_compiled_config_is_read_only():
+    config = compile_config({"body": {"font_size": 14}})
+
+    with pytest.raises(TypeError):
+        config["body"] = {}
+    with pytest.raises(TypeError):
+        config["body"]["font_size"] = 10
+    with pytest.raises(TypeError):
+        config["body"].update(font_size=10)
+    with pytest.raises(TypeError):
+        del config["page_settings"]
+    with pytest.raises(TypeError):
+        config |= {"body": {}}
+    assert config["body"]["font_size"] == 14
+
+
+def test_role_format_is_immutable():
+    role = compile_config({}).role("body")
+    with pytest.raises(AttributeError):
+        role.font_size = Pt(10)
+
+
+def test_compiling_does_not_touch_defaults_or_presets():
+    default_before = copy.deepcopy(FormatConfig.DEFAULT_CONFIG)
+    presets_before = copy.deepcopy(FormatConfig.get_preset_templates())
+
+    for preset in FormatConfig.get_preset_templates().values():
+        config = compile_config(preset)
+        # 修改解冻后的副本不影响编译结果与默认配置
+        mutable = thaw(config)
+        mutable["body"]["font_size"] = 99
+        mutable["page_settings"]["top_margin"] = 99
+    compile_config({"body": {"font_size": 16}, "heading1": {"bold": False}})
+
+    assert FormatConfig.DEFAULT_CONFIG == default_before
+    assert FormatConfig.get_preset_templates() == presets_before
+    assert compile_config(FormatConfig.DEFAULT_CONFIG)["body"]["font_size"] == default_before["body"]["font_size"]
+
+
+def test_same_canonical_json_reuses_compiled_object():
+    first = compile_config({"body": {"font_size": 13, "line_spacing": 1.5}, "heading2": {"bold": True}})
+    hits = compiled_config_stats()["hits"]
+
+    # 键的顺序不同但规范化JSON相同
+    second = compile_config(json.loads('{"heading2": {"bold": true}, "body": {"line_spacing": 1.5, "font_size": 13}}'))
+    assert second is first
+    assert compiled_config_stats()["hits"] == hits + 1
+
+    assert compile_config(first) is first
+    assert compile_config({"body": {"font_size": 13.5}}) is not first
+
+
+def test_compiled_config_pickles_back_to_cached_object():
+    config = compile_config({"body": {"font_size": 15}})
+    restored = pickle.loads(pickle.dumps(config))
+    assert isinstance(restored, CompiledConfig)
+    assert restored == config and restored.hash == config.hash
+    # 工作进程中再次收到同一配置时复用该进程内的编译结果
+    assert pickle.loads(pickle.dumps(config)) is restored
+
+
+def test_invalid_config_is_rejected_and_not_cached():
+    entries = compiled_config_stats()["entries"]
+    with pytest.raises(ValueError):
+        compile_config(["not", "a", "dict"])
+    with pytest.raises(ValueError):
+        compile_config({"body": {"font_size": -1}})
+    assert compiled_config_stats()["entries"] == entries
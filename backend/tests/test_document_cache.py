@@ -0,0 +1,84 @@
+import zipfile
+import pytest
+from docx import Document
+from utils.document_cache import DocumentCache, estimate_memory, XML_MEMORY_FACTOR
+
+
+@pytest.fixture
+def documents(tmp_path):
+    """三份内容不同、大小相同的文档"""
+    paths = {}
+    for name in ("a", "b", "c"):
+        document = Document()
+        document.add_paragraph(f"文档{name}")
+        path = str(tmp_path / f"{name}.docx")
+        document.save(path)
+        paths[name] = path
+    return paths
+
+
+def _estimate(path):
+    with zipfile.ZipFile(path) as package:
+        return estimate_memory(package)
+
+
+def test_estimate_scales_xml_parts(documents):
+    with zipfile.ZipFile(documents["a"]) as package:
+        xml_bytes = sum(info.file_size for info in package.infolist() if info.filename.endswith((".xml", ".rels")))
+        other_bytes = sum(info.file_size for info in package.infolist()) - xml_bytes
+    assert _estimate(documents["a"]) == xml_bytes * XML_MEMORY_FACTOR + other_bytes
+
+
+def test_least_recently_used_document_is_evicted(documents):
+    size = _estimate(documents["a"])
+    assert _estimate(documents["b"]) == _estimate(documents["c"]) == size
+
+    # 预算容纳两份母本
+    cache = DocumentCache(max_bytes=size * 2 + size // 2)
+    cache.get("a", documents["a"], writable=True)
+    cache.get("b", documents["b"], writable=True)
+    cache.get("a", documents["a"], writable=True)
+    cache.get("c", documents["c"], writable=True)
+
+    assert list(cache._entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["current_bytes"] == size * 2
+
+    misses = cache.stats()["misses"]
+    cache.get("b", documents["b"], writable=True)
+    assert cache.stats()["misses"] == misses + 1
+    assert list(cache._entries) == ["c", "b"]
+
+
+def test_reader_counts_against_the_budget(documents):
+    size = _estimate(documents["a"])
+    cache = DocumentCache(max_bytes=size * 3)
+    cache.get("a", documents["a"])
+    cache.get("b", documents["b"], writable=True)
+
+    # a的母本与只读副本加上b的母本正好占满预算，再读取b的只读副本时淘汰a
+    assert cache.stats()["current_bytes"] == size * 3
+    cache.get("b", documents["b"])
+    assert list(cache._entries) == ["b"]
+
+
+def test_writable_copy_does_not_affect_cached_reader(documents):
+    cache = DocumentCache()
+    reader = cache.get("a", documents["a"])
+
+    writable = cache.get("a", documents["a"], writable=True)
+    writable.paragraphs[0].text = "已修改"
+    writable.add_paragraph("新增段落")
+
+    assert cache.get("a", documents["a"]) is reader
+    assert [paragraph.text for paragraph in reader.paragraphs] == ["文档a"]
+    assert [paragraph.text for paragraph in cache.get("a", documents["a"], writable=True).paragraphs] == ["文档a"]
+
+
+def test_oversized_document_is_not_cached(documents):
+    cache = DocumentCache(max_bytes=_estimate(documents["a"]))
+    document = cache.get("a", documents["a"])
+
+    assert document.paragraphs[0].text == "文档a"
+    assert cache.stats()["entries"] == 0
+    assert cache.get("a", documents["a"]) is not document
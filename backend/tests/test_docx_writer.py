@@ -0,0 +1,68 @@
+import io
+import zipfile
+import pytest
+from docx import Document
+from utils.docx_writer import save_document, COMPRESS_LEVELS
+from utils.docx_processor import DocxProcessor
+
+
+@pytest.fixture(scope="module")
+def default_package(thesis_path):
+    """python-docx默认级别保存的压缩包：(成员名列表, 成员内容)"""
+    output = io.BytesIO()
+    save_document(Document(thesis_path), output)
+    with zipfile.ZipFile(output) as package:
+        return package.namelist(), {name: package.read(name) for name in package.namelist()}
+
+
+@pytest.mark.parametrize("compress_level", list(COMPRESS_LEVELS))
+def test_round_trip_at_each_compress_level(thesis_path, default_package, compress_level):
+    names, contents = default_package
+    output = io.BytesIO()
+    save_document(Document(thesis_path), output, compress_level)
+
+    output.seek(0)
+    with zipfile.ZipFile(output) as package:
+        assert package.testzip() is None
+        assert package.namelist() == names
+        assert {name: package.read(name) for name in names} == contents
+        expected_type = zipfile.ZIP_STORED if compress_level == 0 else zipfile.ZIP_DEFLATED
+        assert {info.compress_type for info in package.infolist()} == {expected_type}
+
+    output.seek(0)
+    reopened = Document(output)
+    assert [p.text for p in reopened.paragraphs] == [p.text for p in Document(thesis_path).paragraphs]
+
+
+def test_lower_levels_trade_size_for_speed(thesis_path):
+    sizes = {}
+    for compress_level in (0, 1, 9):
+        output = io.BytesIO()
+        save_document(Document(thesis_path), output, compress_level)
+        sizes[compress_level] = len(output.getvalue())
+    assert sizes[0] > sizes[1] >= sizes[9]
+
+
+def test_saves_to_path(thesis_path, tmp_path):
+    output = str(tmp_path / "stored.docx")
+    save_document(Document(thesis_path), output, 0)
+    assert DocxProcessor(output).paragraph_count == DocxProcessor(thesis_path).paragraph_count
+
+
+@pytest.mark.parametrize("compress_level", [-1, 10])
+def test_invalid_level_is_rejected(thesis_path, compress_level):
+    with pytest.raises(ValueError):
+        save_document(Document(thesis_path), io.BytesIO(), compress_level)
+
+
+def test_inline_format_returns_document_in_response(app_module, client, upload, thesis_path):
+    file_id = upload(thesis_path)
+    files = app_module.file_registry.stats()
+    response = client.post("/api/format", json={"file_id": file_id, "inline": True, "compress_level": 1})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    assert "X-Format-Stats" in response.headers
+    assert Document(io.BytesIO(response.data)).paragraphs
+    # inline结果不落盘也不登记
+    assert app_module.file_registry.stats() == files
@@ -0,0 +1,96 @@
+import os
+import sys
+import subprocess
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def uploaded(app_module, upload, thesis_path):
+    """已上传的文档：(file_id, 文件信息, 文件内容)"""
+    file_id = upload(thesis_path)
+    with open(thesis_path, "rb") as f:
+        content = f.read()
+    return file_id, app_module.file_registry.get(file_id), content
+
+
+def test_download_sends_file_with_strong_etag(client, uploaded):
+    file_id, file_info, content = uploaded
+    response = client.get(f"/api/download/{file_id}")
+
+    assert response.status_code == 200
+    assert response.data == content
+    assert response.headers["ETag"] == f'"{file_info["content_hash"]}"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "thesis.docx" in response.headers["Content-Disposition"]
+
+
+def test_matching_if_none_match_returns_304(client, uploaded):
+    file_id, file_info, _ = uploaded
+    response = client.get(f"/api/download/{file_id}", headers={"If-None-Match": f'"{file_info["content_hash"]}"'})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.get(f"/api/download/{file_id}", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_range_request_returns_partial_content(client, uploaded):
+    file_id, _, content = uploaded
+    response = client.get(f"/api/download/{file_id}", headers={"Range": "bytes=100-199"})
+
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(content)}"
+    assert response.data == content[100:200]
+
+    response = client.get(f"/api/download/{file_id}", headers={"Range": "bytes=-50"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes {len(content) - 50}-{len(content) - 1}/{len(content)}"
+    assert response.data == content[-50:]
+
+
+def test_unsatisfiable_range_returns_416(client, uploaded):
+    file_id, _, content = uploaded
+    response = client.get(f"/api/download/{file_id}", headers={"Range": f"bytes={len(content) + 10}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(content)}"
+
+
+def test_unknown_file_returns_404(client):
+    assert client.get("/api/download/unknown").status_code == 404
+
+
+def test_x_sendfile_offload(app_module, client, monkeypatch, uploaded):
+    monkeypatch.setattr(app_module, "DOWNLOAD_OFFLOAD", "x-sendfile")
+    file_id, file_info, _ = uploaded
+    response = client.get(f"/api/download/{file_id}")
+
+    assert response.status_code == 200
+    assert response.headers["X-Sendfile"] == os.path.abspath(file_info["path"])
+    assert response.headers["ETag"] == f'"{file_info["content_hash"]}"'
+    assert response.data == b""
+
+    response = client.get(f"/api/download/{file_id}", headers={"If-None-Match": f'"{file_info["content_hash"]}"'})
+    assert response.status_code == 304
+    assert "X-Sendfile" not in response.headers
+
+
+def test_x_accel_redirect_offload(app_module, client, monkeypatch, uploaded):
+    monkeypatch.setattr(app_module, "DOWNLOAD_OFFLOAD", "x-accel-redirect")
+    file_id, file_info, _ = uploaded
+    response = client.get(f"/api/download/{file_id}")
+
+    content_hash = file_info["content_hash"]
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Redirect"] == f"/protected-blobs/{content_hash[:2]}/{content_hash}.docx"
+    assert "X-Sendfile" not in response.headers
+    assert response.data == b""
+
+
+def test_unknown_offload_mode_is_rejected_at_startup(tmp_path):
+    env = {**os.environ, "DOWNLOAD_OFFLOAD": "nginx", "FILE_REGISTRY_URL": "memory://"}
+    result = subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {BACKEND!r}); import app"],
+                            cwd=str(tmp_path), env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "不支持的DOWNLOAD_OFFLOAD: nginx" in result.stderr
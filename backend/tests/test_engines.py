@@ -0,0 +1,95 @@
+import zipfile
+import pytest
+from docx.oxml.ns import qn
+from utils.docx_processor import DocxProcessor
+from utils.compiled_config import compile_config
+
+CONFIGS = [
+    {},
+    {"body": {"line_spacing": 20, "line_spacing_type": "fixed"}, "heading2": {"bold": False}}
+]
+
+
+def _format(thesis_path, tmp_path, config, engine):
+    output = str(tmp_path / f"{engine}.docx")
+    report = DocxProcessor(thesis_path).format_and_check(config, output, engine=engine)
+    with zipfile.ZipFile(output) as package:
+        return package.read("word/document.xml"), report
+
+
+@pytest.mark.parametrize("engine", ["xml", "diff"])
+@pytest.mark.parametrize("custom_config", CONFIGS)
+def test_engine_writes_same_document_as_docx_engine(thesis_path, tmp_path, custom_config, engine):
+    config = compile_config(custom_config)
+    expected_xml, expected_report = _format(thesis_path, tmp_path, config, "docx")
+    xml, report = _format(thesis_path, tmp_path, config, engine)
+    assert xml == expected_xml
+    assert report == expected_report
+
+
+@pytest.mark.parametrize("custom_config", CONFIGS)
+def test_diff_engine_leaves_compliant_document_untouched(thesis_path, tmp_path, custom_config):
+    config = compile_config(custom_config)
+    compliant = str(tmp_path / "compliant.docx")
+    DocxProcessor(thesis_path).format_document(config, compliant, engine="docx")
+
+    processor = DocxProcessor(compliant)
+    output = str(tmp_path / "diff.docx")
+    processor.format_document(config, output, engine="diff")
+    stats = processor.format_stats
+
+    assert stats["mutations"] and all(count == 0 for count in stats["mutations"].values()), stats["mutations"]
+    assert stats["paragraphs"] == 0 and stats["runs"] == 0
+    assert stats["unchanged_paragraphs"] > 0
+    with zipfile.ZipFile(compliant) as before, zipfile.ZipFile(output) as after:
+        assert after.read("word/document.xml") == before.read("word/document.xml")
+
+
+@pytest.mark.parametrize("custom_config", CONFIGS)
+def test_style_engine_passes_everything_docx_engine_passes(thesis_path, tmp_path, custom_config):
+    # style引擎另为图表标题指定Caption样式，其余检查项的结果应与直接格式引擎一致
+    config = compile_config(custom_config)
+    _, expected = _format(thesis_path, tmp_path, config, "docx")
+    _, report = _format(thesis_path, tmp_path, config, "style")
+
+    assert [(item["category"], item["name"]) for item in report["items"]] == \
+        [(item["category"], item["name"]) for item in expected["items"]]
+    for item, expected_item in zip(report["items"], expected["items"]):
+        if expected_item["passed"]:
+            assert item["passed"], (item["category"], item["name"])
+    assert report["pass_rate"] >= expected["pass_rate"]
+
+
+def test_style_engine_headings_do_not_inherit_body_indent(thesis_path, tmp_path):
+    config = compile_config({"body": {"line_spacing": 20, "line_spacing_type": "fixed"}})
+    output = str(tmp_path / "style.docx")
+    DocxProcessor(thesis_path).format_document(config, output, engine="style")
+    processor = DocxProcessor(output)
+
+    indents = {}
+    for info in processor.paragraph_index:
+        if info["level"] > 0 or info["role"] == processor.ROLE_CAPTION:
+            indents.setdefault(info["style_name"], set()).add(info["first_line_indent"])
+    assert set(indents) == {"Heading 1", "Heading 2", "Heading 3", "Caption", "TOC Heading"}
+    assert all(values == {0.0} for values in indents.values()), indents
+
+    # 正文的固定行距不会沿basedOn链传给标题
+    for name in indents:
+        assert processor.doc.styles[name].paragraph_format.line_spacing is not None, name
+    body = [info for info in processor.paragraph_index if info["role"] == processor.ROLE_BODY and info["level"] == 0
+            and info["text"]]
+    assert body and all(abs(info["first_line_indent"] - 2 * 0.37) < 0.01 for info in body)
+
+
+def test_style_engine_keeps_titles_out_of_the_outline(thesis_path, tmp_path):
+    output = str(tmp_path / "style.docx")
+    DocxProcessor(thesis_path).format_document(compile_config({}), output, engine="style")
+    processor = DocxProcessor(output)
+
+    title_roles = (processor.ROLE_ABSTRACT_CHINESE, processor.ROLE_ABSTRACT_ENGLISH,
+                   processor.ROLE_TOC_TITLE, processor.ROLE_REFERENCE_TITLE)
+    titles = [info for info in processor.paragraph_index if info["role"] in title_roles]
+    assert titles and all(info["style_name"] == "TOC Heading" for info in titles)
+
+    outline = processor.doc.styles["TOC Heading"].element.pPr.find(qn("w:outlineLvl"))
+    assert outline.get(qn("w:val")) == "9"
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from utils.expiry import ExpiryScheduler
+from utils.file_registry import KIND_UPLOAD, KIND_FORMATTED
+
+
+def _releaser(registry, failing=()):
+    def release(file_id):
+        if file_id in failing:
+            raise OSError("磁盘错误")
+        file_info = registry.remove(file_id)
+        if file_info is not None:
+            file_info["blob_removed"] = registry.references(file_info["content_hash"]) == 0
+        return file_info
+    return release
+
+
+def test_expired_files_are_released_per_kind(registry, add_file):
+    add_file("old-upload", timedelta(hours=2))
+    add_file("new-upload", timedelta(minutes=5))
+    add_file("old-formatted", timedelta(hours=2), kind=KIND_FORMATTED)
+
+    ttls = {KIND_UPLOAD: timedelta(hours=1), KIND_FORMATTED: timedelta(hours=3)}
+    scheduler = ExpiryScheduler(registry, _releaser(registry), ttls)
+
+    assert scheduler.run_once() == 1
+    assert registry.get("old-upload") is None
+    assert registry.get("new-upload") is not None
+    assert registry.get("old-formatted") is not None
+    assert scheduler.stats()["reclaimed_by_kind"] == {KIND_UPLOAD: 1, KIND_FORMATTED: 0}
+
+
+def test_failing_files_do_not_stop_the_rest(registry, add_file):
+    for index in range(7):
+        add_file(f"f{index}", timedelta(hours=2, seconds=index))
+
+    release = _releaser(registry, failing={"f6", "f5", "f2"})
+    scheduler = ExpiryScheduler(registry, release, {KIND_UPLOAD: timedelta(hours=1)}, batch_size=2)
+
+    assert scheduler.run_once() == 4
+    assert scheduler.stats()["errors"] == 3
+    assert sorted(info["file_id"] for info in registry.expired(datetime.now())) == ["f2", "f5", "f6"]
+
+    # 下一次清理重试之前失败的文件
+    scheduler.release = _releaser(registry)
+    assert scheduler.run_once() == 3
+    assert registry.expired(datetime.now()) == []
@@ -0,0 +1,56 @@
+import os
+import pytest
+
+
+def test_derived_outputs_are_keyed_by_compress_level(registry):
+    registry.set_derived(("src", "cfg", "xml", None), "default", {"paragraphs": 1})
+    registry.set_derived(("src", "cfg", "xml", 0), "stored", {"paragraphs": 1})
+    assert registry.get_derived(("src", "cfg", "xml", None))[0] == "default"
+    assert registry.get_derived(("src", "cfg", "xml", 0))[0] == "stored"
+    assert registry.get_derived(("src", "cfg", "xml", 9)) is None
+
+
+@pytest.mark.parametrize("compress_level", [10, -1, "9", True, 1.5])
+def test_invalid_compress_level_is_rejected(client, upload, thesis_path, compress_level):
+    file_id = upload(thesis_path)
+    for endpoint in ("/api/format", "/api/format-check", "/api/jobs"):
+        response = client.post(endpoint, json={"file_id": file_id, "type": "format", "compress_level": compress_level})
+        assert response.status_code == 400, endpoint
+
+
+def test_format_results_are_reused_per_compress_level(app_module, client, upload, thesis_path):
+    file_id = upload(thesis_path)
+
+    def formatted_hash(compress_level):
+        response = client.post("/api/format", json={"file_id": file_id, "compress_level": compress_level})
+        assert response.status_code == 200
+        formatted_id = response.get_json()["formatted_file_id"]
+        return app_module.file_registry.get(formatted_id)["content_hash"]
+
+    stored = formatted_hash(0)
+    assert formatted_hash(0) == stored
+    assert formatted_hash(9) != stored
+
+
+def test_shared_content_is_counted_once(registry, add_file):
+    add_file("a", content_hash="same", size=100)
+    add_file("b", content_hash="same", size=100)
+    add_file("c", content_hash="other", size=30)
+    assert registry.content_stats() == {"blobs": 2, "bytes": 130}
+    assert registry.references("same") == 2
+
+    registry.remove("a")
+    assert registry.content_stats() == {"blobs": 2, "bytes": 130}
+    registry.remove("b")
+    assert registry.content_stats() == {"blobs": 1, "bytes": 30}
+
+
+def test_identical_uploads_share_one_blob(app_module, upload, make_docx):
+    path = make_docx("dedupe.docx", "只上传一份内容的文档")
+    before = app_module.blob_store.stats()
+    first, second = upload(path), upload(path, "renamed.docx")
+
+    assert app_module.file_registry.get(first)["path"] == app_module.file_registry.get(second)["path"]
+    after = app_module.blob_store.stats()
+    assert after["blobs"] == before["blobs"] + 1
+    assert after["bytes"] == before["bytes"] + os.path.getsize(path)
@@ -0,0 +1,103 @@
+import time
+import zipfile
+import pytest
+from utils.job_queue import JobQueue
+from utils.file_registry import SqliteFileRegistry
+
+
+def _wait(get_status, job_id, timeout=60):
+    """轮询直至任务结束"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = get_status(job_id)
+        if status["status"] in ("finished", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"任务未在{timeout}秒内结束: {job_id}")
+
+
+@pytest.fixture
+def queue(registry):
+    job_queue = JobQueue(registry, max_workers=1)
+    yield job_queue
+    job_queue.shutdown()
+
+
+def test_job_finishes_with_result(queue):
+    job_id = queue.submit("check", pow, 2, 10, on_done=lambda result: {"value": result})
+    assert queue.status(job_id)["status"] in ("queued", "running", "finished")
+
+    status = _wait(queue.status, job_id)
+    assert status["status"] == "finished"
+    assert status["finished_at"] is not None
+    assert queue.result(job_id) == {"value": 1024}
+
+
+def test_job_failure_is_recorded(queue):
+    job_id = queue.submit("check", int, "不是数字")
+    status = _wait(queue.status, job_id)
+    assert status["status"] == "failed"
+    assert "不是数字" in status["error"]
+    assert queue.result(job_id) is None
+
+
+def test_unknown_job_has_no_status(queue):
+    assert queue.status("unknown") is None
+    assert queue.result("unknown") is None
+
+
+def test_job_state_is_shared_through_the_registry(tmp_path):
+    # 两个JobQueue各自连接同一个SQLite数据库，模拟两个worker进程
+    path = str(tmp_path / "registry.db")
+    submitter = JobQueue(SqliteFileRegistry(path), max_workers=1)
+    other = JobQueue(SqliteFileRegistry(path), max_workers=1)
+    try:
+        job_id = submitter.submit("check", pow, 3, 3, on_done=lambda result: {"value": result})
+        assert other.status(job_id)["status"] in ("queued", "finished")
+
+        _wait(submitter.status, job_id)
+        assert other.status(job_id)["status"] == "finished"
+        assert other.result(job_id) == {"value": 27}
+        assert other.stats()["finished"] == 1
+    finally:
+        submitter.shutdown()
+        other.shutdown()
+
+
+def _poll(client, job_id):
+    response = client.get(f"/api/jobs/{job_id}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_check_job_is_submitted_polled_and_fetched(client, upload, thesis_path):
+    file_id = upload(thesis_path)
+    response = client.post("/api/jobs", json={"file_id": file_id, "type": "check",
+                                              "format_config": {"body": {"font_size": 13}}})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    assert _wait(lambda job: _poll(client, job), job_id)["status"] == "finished"
+    response = client.get(f"/api/jobs/{job_id}/result")
+    assert response.status_code == 200
+    assert response.get_json()["cached"] is False
+    assert "pass_rate" in response.get_json()
+
+
+def test_failed_job_result_is_an_error(client, upload, tmp_path):
+    # 是zip压缩包但不是docx，上传成功而检查失败
+    path = str(tmp_path / "broken.docx")
+    with zipfile.ZipFile(path, "w") as package:
+        package.writestr("readme.txt", "not a document")
+    response = client.post("/api/jobs", json={"file_id": upload(path), "type": "check"})
+    job_id = response.get_json()["job_id"]
+
+    assert _wait(lambda job: _poll(client, job), job_id)["status"] == "failed"
+    response = client.get(f"/api/jobs/{job_id}/result")
+    assert response.status_code == 500
+    assert "error" in response.get_json()
+
+
+def test_unknown_job_id_returns_404(client):
+    assert client.get("/api/jobs/unknown").status_code == 404
+    assert client.get("/api/jobs/unknown/result").status_code == 404
@@ -0,0 +1,138 @@
+import re
+import time
+import uuid
+import pytest
+from utils.metrics import MetricsRegistry
+
+# 文本格式0.0.4的样本行：指标名、可选标签、数值
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def parse_metrics(text):
+    """
+    解析并校验Prometheus文本格式
+
+    Returns:
+        {(样本名, 排序后的标签元组): 数值}
+    """
+    assert text.endswith("\n")
+    types = {}
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, type_name = line.split(" ")
+            assert type_name in ("counter", "gauge", "histogram", "summary", "untyped")
+            assert name not in types, f"重复的TYPE: {name}"
+            types[name] = type_name
+            continue
+
+        match = SAMPLE_LINE.match(line)
+        assert match, f"无效的样本行: {line!r}"
+        name, _, label_text, value = match.groups()
+        labels = tuple(sorted(LABEL.findall(label_text or "")))
+        if label_text:
+            assert ",".join(f'{k}="{v}"' for k, v in LABEL.findall(label_text)) == label_text, line
+
+        family = name
+        if name not in types:
+            family = next((name[:-len(suffix)] for suffix in HISTOGRAM_SUFFIXES if name.endswith(suffix)), name)
+            assert types.get(family) == "histogram", f"样本之前没有TYPE: {name}"
+        key = (name, labels)
+        assert key not in samples, f"重复的样本: {line}"
+        samples[key] = float(value)
+
+    for family, type_name in types.items():
+        if type_name == "histogram":
+            _check_histogram(family, samples)
+    return samples
+
+
+def _check_histogram(family, samples):
+    """累计桶计数不减、以+Inf结束且等于_count，并且有_sum"""
+    series = {}
+    for (name, labels), value in samples.items():
+        if name == f"{family}_bucket":
+            le = dict(labels)["le"]
+            rest = tuple(label for label in labels if label[0] != "le")
+            series.setdefault(rest, []).append((float(le), value))
+
+    for labels, buckets in series.items():
+        buckets.sort()
+        assert buckets[-1][0] == float("inf")
+        counts = [count for _, count in buckets]
+        assert counts == sorted(counts), (family, labels)
+        assert samples[(f"{family}_count", labels)] == counts[-1]
+        assert (f"{family}_sum", labels) in samples
+
+
+def _value(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "测试耗时", ("kind",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, kind='a"b')
+    registry.counter("test_total", "计数\n换行").inc(2)
+
+    text = registry.render()
+    samples = parse_metrics(text)
+    assert 'kind="a\\"b"' in text
+    assert "# HELP test_total 计数\\n换行" in text
+    assert _value(samples, "test_seconds_bucket", kind='a\\"b', le="0.1") == 2
+    assert _value(samples, "test_seconds_bucket", kind='a\\"b', le="1") == 3
+    assert _value(samples, "test_seconds_bucket", kind='a\\"b', le="+Inf") == 4
+    assert _value(samples, "test_seconds_count", kind='a\\"b') == 4
+    assert _value(samples, "test_seconds_sum", kind='a\\"b') == pytest.approx(3.65)
+    assert _value(samples, "test_total") == 2
+
+
+def test_labels_must_match_declaration():
+    counter = MetricsRegistry().counter("test_total", "计数", ("operation",))
+    with pytest.raises(ValueError):
+        counter.inc(operation="check", extra="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1, operation="check")
+
+
+def test_metrics_endpoint_is_valid_text_format(client, upload, make_docx):
+    file_id = upload(make_docx("metrics.docx", "正文段落"))
+    assert client.post("/api/check", json={"file_id": file_id}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+
+    samples = parse_metrics(response.get_data(as_text=True))
+    assert _value(samples, "paper_format_documents_total", operation="check") >= 1
+    assert any(name == "paper_format_phase_seconds_count" for name, _ in samples)
+
+
+def test_process_pool_job_is_counted_once(client, upload, make_docx):
+    # 内容唯一的文档，避免命中报告缓存
+    file_id = upload(make_docx("pool.docx", f"正文段落 {uuid.uuid4()}"))
+    before = parse_metrics(client.get("/metrics").get_data(as_text=True))
+
+    job_id = client.post("/api/jobs", json={"file_id": file_id, "type": "check"}).get_json()["job_id"]
+    deadline = time.time() + 60
+    while client.get(f"/api/jobs/{job_id}").get_json()["status"] not in ("finished", "failed"):
+        assert time.time() < deadline
+        time.sleep(0.05)
+    assert client.get(f"/api/jobs/{job_id}/result").status_code == 200
+
+    after = parse_metrics(client.get("/metrics").get_data(as_text=True))
+    assert _value(after, "paper_format_documents_total", operation="check") == \
+        _value(before, "paper_format_documents_total", operation="check") + 1
+
+    # 工作进程中每个阶段的累计耗时只计入一次
+    phase_deltas = {
+        labels: value - before.get((name, labels), 0)
+        for (name, labels), value in after.items() if name == "paper_format_phase_seconds_count"
+    }
+    assert any(delta == 1 for delta in phase_deltas.values())
+    assert all(delta in (0, 1) for delta in phase_deltas.values()), phase_deltas
@@ -0,0 +1,46 @@
+import time
+from utils.report_cache import ReportCache
+from utils.compiled_config import compile_config
+
+
+def test_hit_needs_same_content_and_config_hash():
+    cache = ReportCache()
+    config_hash = compile_config({"body": {"font_size": 11}}).hash
+    cache.put(("doc", config_hash), {"pass_rate": 90}, time.time() + 60)
+
+    assert cache.get(("doc", config_hash)) == {"pass_rate": 90}
+    assert cache.get(("other-doc", config_hash)) is None
+    assert cache.get(("doc", compile_config({"body": {"font_size": 12}}).hash)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_equivalent_configs_share_an_entry():
+    cache = ReportCache()
+    config = {"body": {"font_size": 11, "font_name": "宋体"}, "heading1": {"bold": True}}
+    reordered = {"heading1": {"bold": True}, "body": {"font_name": "宋体", "font_size": 11}}
+    cache.put(("doc", compile_config(config).hash), {"pass_rate": 90}, time.time() + 60)
+    assert cache.get(("doc", compile_config(reordered).hash)) == {"pass_rate": 90}
+
+
+def test_expired_reports_miss():
+    cache = ReportCache()
+    cache.put(("doc", "cfg"), {"pass_rate": 90}, time.time() - 1)
+    assert cache.get(("doc", "cfg")) is None
+
+
+def test_check_endpoint_reuses_report_only_for_same_document_and_config(client, upload, thesis_path, make_docx):
+    file_id = upload(thesis_path)
+    other_id = upload(make_docx("other.docx", "第1章 绪论", "另一份文档的正文内容。"))
+    config = {"body": {"font_size": 11.5}}
+
+    def check(target, format_config):
+        response = client.post("/api/check", json={"file_id": target, "format_config": format_config})
+        assert response.status_code == 200
+        return response.get_json()["cached"]
+
+    assert check(file_id, config) is False
+    assert check(file_id, config) is True
+    # 同一内容以新的file_id上传时仍命中
+    assert check(upload(thesis_path, "copy.docx"), config) is True
+    assert check(other_id, config) is False
+    assert check(file_id, {"body": {"font_size": 10.5}}) is False
@@ -0,0 +1,57 @@
+import re
+import pytest
+from utils import role_matcher
+from utils.role_matcher import PATTERN_GROUPS, RoleMatcher, get_role_matcher
+from utils.format_config import FormatConfig
+
+DEFAULT_PATTERNS = FormatConfig.DEFAULT_CONFIG["patterns"]
+
+# 局部标志与可能以任意字符开头的模式都无法推导首字符
+CUSTOM_PATTERNS = {
+    **DEFAULT_PATTERNS,
+    "abstract_english": [r"(?i:abstract)$"],
+    "heading1": [r"\s*第\d+章", r"(?:Chapter\s+)?\d+\s"],
+    "heading3": [r"x*\d+\.\d+\.\d+"]
+}
+
+TEXTS = [
+    "", "摘要", "摘 要", "Abstract", "ABSTRACT", "abstract", "目录", "参考文献",
+    "图1 系统架构", "表 2 实验结果", "第一章 绪论", "第3章 方法", "  第3章 方法", "致谢",
+    "附 录", "1.1 研究背景", "2.3", "3.1.2 细节", "x3.1.2 细节", "Chapter 4 结论",
+    "4 结论", "本文研究了论文格式检查。", "1.1研究背景", "Chapter", "图表"
+]
+
+
+def _match_per_pattern(patterns, text):
+    """逐个模式依次匹配，与合并正则之前的实现一致"""
+    if not text:
+        return "body", 0
+    for key, role, level in PATTERN_GROUPS:
+        for pattern in patterns.get(key, []):
+            if re.match(pattern, text):
+                return role, level
+    return "body", 0
+
+
+@pytest.mark.parametrize("patterns", [DEFAULT_PATTERNS, CUSTOM_PATTERNS], ids=["default", "custom"])
+def test_matches_agree_with_per_pattern_loop(patterns):
+    matcher = RoleMatcher(patterns)
+    for text in TEXTS:
+        assert matcher.match(text) == _match_per_pattern(patterns, text), text
+
+
+def test_prefilter_is_disabled_for_scoped_flags_and_optional_prefixes():
+    assert RoleMatcher(DEFAULT_PATTERNS)._prefilter
+    assert not RoleMatcher({"abstract_english": [r"(?i:abstract)$"]})._prefilter
+    assert not RoleMatcher({"heading1": [r"\s*第\d+章"]})._prefilter
+
+
+def test_matcher_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(role_matcher, "MAX_ROLE_MATCHERS", 3)
+    monkeypatch.setattr(role_matcher, "_matcher_cache", role_matcher.OrderedDict())
+
+    matchers = [get_role_matcher({"heading1": [f"^第{index}章"]}) for index in range(5)]
+
+    assert len(role_matcher._matcher_cache) == 3
+    assert get_role_matcher({"heading1": ["^第4章"]}) is matchers[4]
+    assert get_role_matcher({"heading1": ["^第0章"]}) is not matchers[0]
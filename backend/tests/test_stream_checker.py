@@ -0,0 +1,25 @@
+import pytest
+from utils.docx_processor import DocxProcessor
+from utils.stream_checker import StreamChecker
+from utils.compiled_config import compile_config
+
+
+@pytest.mark.parametrize("custom_config", [{}, {"body": {"font_size": 10.5}}])
+def test_stream_report_matches_in_memory_report(thesis_path, custom_config):
+    config = compile_config(custom_config)
+    assert StreamChecker(thesis_path).check_format(config) == DocxProcessor(thesis_path).check_format(config)
+
+
+def test_stream_report_matches_after_formatting(thesis_path, tmp_path):
+    config = compile_config({})
+    output = str(tmp_path / "formatted.docx")
+    DocxProcessor(thesis_path).format_document(config, output, engine="xml")
+    assert StreamChecker(output).check_format(config) == DocxProcessor(output).check_format(config)
+
+
+def test_stream_report_matches_for_style_engine_output(thesis_path, tmp_path):
+    # style引擎的输出依赖样式继承，两种检查器须得出相同的有效格式
+    config = compile_config({})
+    output = str(tmp_path / "styled.docx")
+    DocxProcessor(thesis_path).format_document(config, output, engine="style")
+    assert StreamChecker(output).check_format(config) == DocxProcessor(output).check_format(config)
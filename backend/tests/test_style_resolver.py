@@ -0,0 +1,124 @@
+import pytest
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from utils.style_resolver import StyleResolver, RUN_DEFAULTS
+
+STYLES = f"""
+<w:styles {nsdecls("w")}>
+  <w:docDefaults>
+    <w:rPrDefault><w:rPr><w:rFonts w:ascii="Times New Roman"/><w:sz w:val="21"/></w:rPr></w:rPrDefault>
+    <w:pPrDefault><w:pPr><w:jc w:val="both"/></w:pPr></w:pPrDefault>
+  </w:docDefaults>
+  <w:style w:type="paragraph" w:default="1" w:styleId="Normal">
+    <w:pPr><w:ind w:firstLineChars="200"/></w:pPr>
+    <w:rPr><w:rFonts w:ascii="SimSun"/><w:sz w:val="24"/></w:rPr>
+  </w:style>
+  <w:style w:type="paragraph" w:styleId="Heading1">
+    <w:basedOn w:val="Normal"/>
+    <w:pPr><w:jc w:val="center"/><w:ind w:firstLine="0"/></w:pPr>
+    <w:rPr><w:sz w:val="32"/></w:rPr>
+  </w:style>
+  <w:style w:type="paragraph" w:styleId="Heading2">
+    <w:basedOn w:val="Heading1"/>
+    <w:pPr><w:jc w:val="start"/></w:pPr>
+    <w:rPr><w:b/></w:rPr>
+  </w:style>
+  <w:style w:type="paragraph" w:styleId="Quote">
+    <w:basedOn w:val="Normal"/>
+    <w:pPr><w:ind w:hanging="420" w:hangingChars="100"/></w:pPr>
+    <w:rPr><w:rFonts w:asciiTheme="minorHAnsi"/></w:rPr>
+  </w:style>
+  <w:style w:type="paragraph" w:styleId="LoopA"><w:basedOn w:val="LoopB"/><w:rPr><w:sz w:val="28"/></w:rPr></w:style>
+  <w:style w:type="paragraph" w:styleId="LoopB"><w:basedOn w:val="LoopA"/><w:rPr><w:b/></w:rPr></w:style>
+  <w:style w:type="character" w:styleId="Strong">
+    <w:rPr><w:b/><w:sz w:val="18"/></w:rPr>
+  </w:style>
+</w:styles>
+"""
+
+
+def _rPr(children=""):
+    return parse_xml(f'<w:rPr {nsdecls("w")}>{children}</w:rPr>')
+
+
+def _pPr(children=""):
+    return parse_xml(f'<w:pPr {nsdecls("w")}>{children}</w:pPr>')
+
+
+@pytest.fixture
+def resolver():
+    return StyleResolver(parse_xml(STYLES))
+
+
+def test_based_on_chain_inherits_nearest_definition(resolver):
+    # 字体来自Normal，字号来自Heading1，加粗来自Heading2
+    assert resolver.run_properties("Heading2", None) == \
+        {"font_name": "SimSun", "font_size": 16.0, "bold": True}
+    paragraph = resolver.paragraph_properties("Heading2", None)
+    assert paragraph["alignment"] == WD_ALIGN_PARAGRAPH.LEFT
+    assert paragraph["first_line_indent"] == 0.0
+
+
+def test_based_on_cycle_terminates(resolver):
+    assert resolver.run_properties("LoopA", None) == \
+        {"font_name": "Times New Roman", "font_size": 14.0, "bold": True}
+
+
+def test_doc_defaults_fill_properties_no_style_sets(resolver):
+    paragraph = resolver.paragraph_properties("Normal", None)
+    assert paragraph["alignment"] == WD_ALIGN_PARAGRAPH.JUSTIFY
+    assert abs(paragraph["first_line_indent"] - 2 * 0.37) < 1e-9
+    # 各级均未设置加粗时使用Word默认值
+    assert resolver.run_properties("Normal", None)["bold"] is False
+
+
+def test_builtin_defaults_without_styles_part():
+    resolver = StyleResolver(None)
+    assert resolver.run_properties(None, None) == RUN_DEFAULTS
+    assert resolver.run_properties(None, _rPr('<w:sz w:val="28"/>'))["font_size"] == 14.0
+
+
+def test_unknown_style_falls_back_to_default_paragraph_style(resolver):
+    assert resolver.run_properties("Missing", None) == resolver.run_properties(None, None) == \
+        {"font_name": "SimSun", "font_size": 12.0, "bold": False}
+
+
+def test_direct_run_formatting_beats_paragraph_style(resolver):
+    props = resolver.run_properties("Heading2", _rPr('<w:rFonts w:ascii="KaiTi"/><w:b w:val="0"/>'))
+    assert props == {"font_name": "KaiTi", "font_size": 16.0, "bold": False}
+
+
+def test_character_style_sits_between_direct_and_paragraph_style(resolver):
+    props = resolver.run_properties("Heading1", _rPr('<w:rStyle w:val="Strong"/>'))
+    assert props == {"font_name": "SimSun", "font_size": 9.0, "bold": True}
+
+    props = resolver.run_properties("Heading1", _rPr('<w:rStyle w:val="Strong"/><w:sz w:val="30"/>'))
+    assert props["font_size"] == 15.0
+
+
+def test_direct_paragraph_formatting_beats_style(resolver):
+    props = resolver.paragraph_properties("Heading1", _pPr('<w:jc w:val="right"/><w:ind w:firstLine="567"/>'))
+    assert props["alignment"] == WD_ALIGN_PARAGRAPH.RIGHT
+    assert abs(props["first_line_indent"] - 1.0) < 0.01
+
+
+def test_character_units_take_precedence_over_twips(resolver):
+    props = resolver.paragraph_properties("Quote", None)
+    assert abs(props["first_line_indent"] + 0.37) < 1e-9
+
+
+def test_theme_font_is_unknown_and_stops_lookup(resolver):
+    assert resolver.run_properties("Quote", None)["font_name"] is None
+
+
+def test_results_are_cached_by_style_and_signature(resolver):
+    first = resolver.run_properties("Heading1", _rPr('<w:b/><w:i/>'))
+    # 不参与解析的元素不影响签名
+    second = resolver.run_properties("Heading1", _rPr('<w:b/><w:color w:val="FF0000"/>'))
+    assert second is first
+    resolver.run_properties("Heading2", _rPr('<w:b/>'))
+
+    stats = resolver.stats()
+    assert stats["run_signatures"] == 2
+    assert stats["styles"] == 2
@@ -0,0 +1,107 @@
+import pytest
+
+
+def _save(client, name, font_size, **headers):
+    return client.post("/api/templates", headers=headers,
+                       json={"name": name, "config": {"body": {"font_size": font_size}}})
+
+
+def _check(client, file_id, **data):
+    response = client.post("/api/check", json={"file_id": file_id, **data})
+    body = response.get_json()
+    body.pop("cached", None)
+    return response.status_code, body
+
+
+def test_template_etag_round_trip(client):
+    saved = _save(client, "etag-template", 14)
+    assert saved.status_code == 201
+    version = saved.get_json()["version"]
+    assert saved.headers["ETag"] == f'"{version}"'
+
+    response = client.get("/api/templates/etag-template")
+    assert response.status_code == 200
+    assert response.get_json()["version"] == version
+    assert response.headers["ETag"] == saved.headers["ETag"]
+    assert response.get_json()["config"]["body"]["font_size"] == 14
+
+    cached = client.get("/api/templates/etag-template", headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+    listing = client.get("/api/templates")
+    assert client.get("/api/templates", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+
+def test_save_with_stale_if_match_is_rejected(client):
+    first = _save(client, "if-match-template", 14)
+    etag = first.headers["ETag"]
+
+    # 他人在此期间保存了新版本
+    second = _save(client, "if-match-template", 15)
+    assert second.headers["ETag"] != etag
+
+    stale = _save(client, "if-match-template", 16, **{"If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.get_json()["current_version"] == second.get_json()["version"]
+    assert client.get("/api/templates/if-match-template").get_json()["config"]["body"]["font_size"] == 15
+
+    current = _save(client, "if-match-template", 16, **{"If-Match": second.headers["ETag"]})
+    assert current.status_code == 201
+    assert client.get("/api/templates/if-match-template").get_json()["config"]["body"]["font_size"] == 16
+
+
+def test_if_match_star_requires_existing_template(client):
+    missing = _save(client, "if-match-new-template", 14, **{"If-Match": "*"})
+    assert missing.status_code == 412
+    assert missing.get_json()["current_version"] is None
+
+    assert _save(client, "if-match-new-template", 14).status_code == 201
+    assert _save(client, "if-match-new-template", 15, **{"If-Match": "*"}).status_code == 201
+
+
+def test_stale_template_version_is_a_conflict(client, upload, make_docx):
+    file_id = upload(make_docx("template.docx", "正文段落"))
+    old_version = _save(client, "pinned-template", 14).get_json()["version"]
+    new_version = _save(client, "pinned-template", 15).get_json()["version"]
+
+    status, body = _check(client, file_id, template_id="pinned-template", template_version=old_version)
+    assert status == 409
+    assert body["current_version"] == new_version
+
+    status, _ = _check(client, file_id, template_id="missing-template")
+    assert status == 404
+
+
+def test_template_reference_resolves_to_pinned_version(client, app_module, upload, make_docx):
+    file_id = upload(make_docx("template.docx", "正文段落"))
+    saved = _save(client, "resolved-template", 14).get_json()
+
+    entry = app_module.template_registry.get("resolved-template")
+    assert app_module.template_registry.resolve("resolved-template", saved["version"]) is entry["compiled"]
+    assert entry["compiled"]["body"]["font_size"] == 14
+
+    status, by_reference = _check(client, file_id, template_id="resolved-template",
+                                  template_version=saved["version"])
+    assert status == 200
+    template = client.get("/api/templates/resolved-template").get_json()
+    status, by_value = _check(client, file_id, format_config=template["config"])
+    assert status == 200
+    assert by_reference == by_value
+
+
+def test_template_with_overrides_does_not_change_template(client, app_module):
+    version = _save(client, "override-template", 14).get_json()["version"]
+
+    config = app_module.template_registry.resolve("override-template", version, {"body": {"font_size": 16}})
+    assert config["body"]["font_size"] == 16
+    assert app_module.template_registry.resolve("override-template", version)["body"]["font_size"] == 14
+
+
+def test_preset_templates_cannot_be_overwritten(client):
+    response = _save(client, "国标通用", 14)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("payload", [{}, {"name": "x"}, {"name": "x", "config": []}])
+def test_save_requires_name_and_config(client, payload):
+    assert client.post("/api/templates", json=payload).status_code == 400
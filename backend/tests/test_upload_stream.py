@@ -0,0 +1,93 @@
+import gc
+import io
+import os
+import hashlib
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.upload_stream import UploadStream, StreamingUploadRequest
+
+
+def _part_files(folder):
+    return [name for name in os.listdir(folder) if name.endswith(".part")]
+
+
+def test_stream_hashes_and_commits(tmp_path):
+    stream = UploadStream(str(tmp_path), max_size=1024)
+    stream.write(b"PK\x03")
+    stream.write(b"\x04rest of the archive")
+
+    assert stream.is_zip
+    assert stream.size == 23
+    assert stream.hexdigest() == hashlib.sha256(b"PK\x03\x04rest of the archive").hexdigest()
+
+    stream.commit(str(tmp_path / "final.docx"))
+    stream.close()
+    assert (tmp_path / "final.docx").read_bytes() == b"PK\x03\x04rest of the archive"
+    assert _part_files(tmp_path) == []
+
+
+def test_stream_over_limit_removes_temp_file(tmp_path):
+    stream = UploadStream(str(tmp_path), max_size=10)
+    stream.write(b"0123456789")
+    with pytest.raises(RequestEntityTooLarge):
+        stream.write(b"x")
+    assert _part_files(tmp_path) == []
+
+
+def test_uncommitted_stream_is_removed_on_close(tmp_path):
+    stream = UploadStream(str(tmp_path), max_size=1024)
+    stream.write(b"partial")
+    assert len(_part_files(tmp_path)) == 1
+    stream.close()
+    assert _part_files(tmp_path) == []
+
+
+def test_uploaded_hash_is_sha256_of_sent_bytes(app_module, upload, thesis_path):
+    with open(thesis_path, "rb") as f:
+        content = f.read()
+    file_info = app_module.file_registry.get(upload(thesis_path))
+
+    assert file_info["content_hash"] == hashlib.sha256(content).hexdigest()
+    assert file_info["size"] == len(content)
+    with open(file_info["path"], "rb") as f:
+        assert f.read() == content
+
+
+def test_oversized_upload_returns_413_without_temp_file(client, app_dir, monkeypatch, thesis_path):
+    monkeypatch.setattr(StreamingUploadRequest, "max_upload_size", 1024)
+    with open(thesis_path, "rb") as f:
+        response = client.post("/api/upload", data={"file": (f, "thesis.docx")}, content_type="multipart/form-data")
+    assert response.status_code == 413
+    assert _part_files(app_dir / "temp_uploads") == []
+
+
+def test_declared_oversized_body_is_rejected_before_reading(app_module, client, monkeypatch, thesis_path):
+    monkeypatch.setattr(app_module, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(app_module, "UPLOAD_OVERHEAD", 0)
+    with open(thesis_path, "rb") as f:
+        response = client.post("/api/upload", data={"file": (f, "thesis.docx")}, content_type="multipart/form-data")
+    assert response.status_code == 413
+
+
+def test_aborted_upload_is_cleaned_up(client, app_dir, thesis_path):
+    with open(thesis_path, "rb") as f:
+        content = f.read()
+    boundary = "----upload-boundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="thesis.docx"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    # 客户端只发送了一半文件内容就断开，请求体短于声明的Content-Length
+    body = head + content[:len(content) // 2]
+    response = client.post(
+        "/api/upload",
+        input_stream=io.BytesIO(body),
+        content_type=f"multipart/form-data; boundary={boundary}",
+        content_length=len(head) + len(content) + 64
+    )
+    # 解析中途出错时由UploadStream.__del__兜底删除临时文件
+    gc.collect()
+
+    assert response.status_code == 400
+    assert _part_files(app_dir / "temp_uploads") == []
@@ -0,0 +1,225 @@
+import math
+import time
+import zipfile
+import itertools
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 主文档部件的默认位置
+DOCUMENT_PART = "word/document.xml"
+# 每个部件的固定开销（按字节计），覆盖解压、关系解析与对象构建
+PART_COST = 4 * 1024
+
+# 尚无耗时记录时的重试等待秒数
+DEFAULT_RETRY_AFTER = 2
+# 每单位代价耗时的指数移动平均系数
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """容量已满，请求被拒绝"""
+
+    def __init__(self, message: str, retry_after: int, cost: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.cost = cost
+
+
+def estimate_cost(file_path: str) -> Dict[str, int]:
+    """
+    在解析文档之前估算处理代价
+
+    只读取zip的中央目录，不解压任何部件。代价以word/document.xml解压后的字节数
+    为主，另按部件数计入固定开销。
+
+    Returns:
+        document_xml_bytes、parts、uncompressed_bytes与cost
+
+    Raises:
+        ValueError: 文件不是有效的zip压缩包
+    """
+    try:
+        with zipfile.ZipFile(file_path) as package:
+            infos = package.infolist()
+    except (OSError, zipfile.BadZipFile) as e:
+        raise ValueError(f"无法打开文档: {str(e)}")
+
+    document_bytes = 0
+    uncompressed_bytes = 0
+    for info in infos:
+        uncompressed_bytes += info.file_size
+        if info.filename == DOCUMENT_PART:
+            document_bytes = info.file_size
+
+    if not document_bytes:
+        # 主文档不在默认位置时按最大的XML部件估算
+        document_bytes = max((info.file_size for info in infos if info.filename.endswith(".xml")), default=0)
+
+    return {
+        "document_xml_bytes": document_bytes,
+        "parts": len(infos),
+        "uncompressed_bytes": uncompressed_bytes,
+        "cost": document_bytes + PART_COST * len(infos)
+    }
+
+
+class AdmissionController:
+    """
+    按估算代价的准入控制
+
+    重型通道中正在处理的请求代价之和不超过capacity，超出时立即拒绝并给出
+    建议的重试等待时间，而不是让所有请求一起变慢；单个代价超过capacity的请求
+    只在没有其他重型请求时准入。代价不超过fast_lane_cost的小文档走快速通道，
+    只受并发数限制，不会因为大文档占满容量而被拒绝；快速通道已满时再尝试
+    使用重型通道的剩余容量。
+
+    重试等待时间根据各通道每单位代价的平均耗时，估算正在处理的请求释放出
+    足够容量所需的时间。
+    """
+
+    LANE_FAST = "fast"
+    LANE_HEAVY = "heavy"
+
+    def __init__(self, capacity: int, fast_lane_cost: int, fast_lane_slots: int, max_retry_after: int = 60):
+        """
+        Args:
+            capacity: 重型通道的代价容量
+            fast_lane_cost: 走快速通道的代价上限
+            fast_lane_slots: 快速通道的并发数
+            max_retry_after: 建议重试等待时间的上限（秒）
+        """
+        self.capacity = capacity
+        self.fast_lane_cost = fast_lane_cost
+        self.fast_lane_slots = fast_lane_slots
+        self.max_retry_after = max_retry_after
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._active = {}
+        self._seconds_per_cost = {self.LANE_FAST: None, self.LANE_HEAVY: None}
+        self._stats = {
+            "admitted_fast": 0,
+            "admitted_heavy": 0,
+            "rejected_fast": 0,
+            "rejected_heavy": 0
+        }
+
+    def acquire(self, cost: int, lane: Optional[str] = None) -> Dict[str, Any]:
+        """
+        申请准入
+
+        Args:
+            cost: 估算代价
+            lane: 指定通道，None时按代价选择；批量处理等后台工作指定重型通道，
+                  不占用交互请求的快速通道
+
+        Returns:
+            准入凭证，处理完成后交给release
+
+        Raises:
+            AdmissionRejected: 容量已满
+        """
+        with self._lock:
+            requested = lane or (self.LANE_FAST if cost <= self.fast_lane_cost else self.LANE_HEAVY)
+            fast_available = self._count(self.LANE_FAST) < self.fast_lane_slots
+            if lane is None and cost <= self.fast_lane_cost and fast_available:
+                lane = self.LANE_FAST
+            elif lane == self.LANE_FAST:
+                lane = self.LANE_FAST if fast_available else None
+            else:
+                lane = self.LANE_HEAVY if self._heavy_fits(cost) else None
+
+            if lane is None:
+                self._stats[f"rejected_{requested}"] += 1
+                retry_after = self._retry_after(requested, cost)
+                logger.warning(f"请求被准入控制拒绝: 代价{cost}, {retry_after}秒后重试")
+                raise AdmissionRejected("服务繁忙，请稍后重试", retry_after, cost)
+
+            ticket = {"id": next(self._ids), "lane": lane, "cost": cost, "started": time.monotonic()}
+            self._active[ticket["id"]] = ticket
+            self._stats[f"admitted_{lane}"] += 1
+            return ticket
+
+    def release(self, ticket: Dict[str, Any]):
+        """释放准入凭证，并据本次耗时更新每单位代价的平均耗时"""
+        elapsed = time.monotonic() - ticket["started"]
+        with self._lock:
+            if self._active.pop(ticket["id"], None) is None:
+                return
+            lane = ticket["lane"]
+            sample = elapsed / max(ticket["cost"], 1)
+            previous = self._seconds_per_cost[lane]
+            self._seconds_per_cost[lane] = sample if previous is None else (
+                EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * previous
+            )
+
+    @contextmanager
+    def admit(self, cost: int, lane: Optional[str] = None):
+        """在准入范围内执行，结束时自动释放"""
+        ticket = self.acquire(cost, lane)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def _tickets(self, lane: str) -> List[Dict[str, Any]]:
+        return [ticket for ticket in self._active.values() if ticket["lane"] == lane]
+
+    def _count(self, lane: str) -> int:
+        return sum(1 for ticket in self._active.values() if ticket["lane"] == lane)
+
+    def _heavy_cost(self) -> int:
+        return sum(ticket["cost"] for ticket in self._tickets(self.LANE_HEAVY))
+
+    def _heavy_fits(self, cost: int) -> bool:
+        """重型通道是否还能容纳该代价，调用方需持有锁"""
+        if not self._tickets(self.LANE_HEAVY):
+            return True
+        return self._heavy_cost() + cost <= self.capacity
+
+    def _remaining(self, ticket: Dict[str, Any], now: float) -> float:
+        """估算凭证对应请求的剩余处理时间"""
+        seconds_per_cost = self._seconds_per_cost[ticket["lane"]]
+        if seconds_per_cost is None:
+            return DEFAULT_RETRY_AFTER
+        return max(0.0, seconds_per_cost * ticket["cost"] - (now - ticket["started"]))
+
+    def _retry_after(self, lane: str, cost: int) -> int:
+        """估算释放出足够容量所需的秒数，调用方需持有锁"""
+        now = time.monotonic()
+        heavy = sorted(((self._remaining(ticket, now), ticket["cost"]) for ticket in self._tickets(self.LANE_HEAVY)))
+
+        # 重型通道需要释放的代价；单个超大请求需等待重型通道清空
+        needed = self._heavy_cost() + cost - self.capacity if cost <= self.capacity else self._heavy_cost()
+        wait = 0.0
+        freed = 0
+        for remaining, ticket_cost in heavy:
+            if freed >= needed:
+                break
+            wait = remaining
+            freed += ticket_cost
+
+        if lane == self.LANE_FAST:
+            # 快速通道的请求只需等待任一快速请求完成
+            fast = [self._remaining(ticket, now) for ticket in self._tickets(self.LANE_FAST)]
+            if fast:
+                wait = min(wait, min(fast))
+
+        return max(1, min(self.max_retry_after, int(math.ceil(wait))))
+
+    def stats(self) -> Dict[str, Any]:
+        """获取准入统计信息"""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "fast_lane_cost": self.fast_lane_cost,
+                "fast_lane_slots": self.fast_lane_slots,
+                "in_flight_fast": self._count(self.LANE_FAST),
+                "in_flight_heavy": self._count(self.LANE_HEAVY),
+                "in_flight_heavy_cost": self._heavy_cost(),
+                **self._stats
+            }
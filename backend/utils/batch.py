@@ -0,0 +1,157 @@
+import os
+import uuid
+import hashlib
+import zipfile
+import logging
+from collections import Counter
+from typing import Dict, List, Any, Iterable
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+# 合格率分布区间（下限, 标签）
+PASS_RATE_BUCKETS = ((90, "90-100"), (80, "80-89"), (60, "60-79"), (0, "0-59"))
+
+
+def extract_documents(archive, dest_folder: str, max_file_size: int, max_files: int) -> List[Dict[str, Any]]:
+    """
+    从zip压缩包中解出所有.docx文档
+
+    Args:
+        archive: zip文件路径或文件对象
+        dest_folder: 解压目标目录
+        max_file_size: 单个文档的最大解压大小
+        max_files: 最多解出的文档数
+
+    Returns:
+        文档信息列表，每项包含file_id、path、original_name、size与content_hash
+
+    Raises:
+        ValueError: 压缩包无效、文档过多或过大；出错时已解出的文档会被删除
+    """
+    try:
+        package = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise ValueError("无效的zip压缩包")
+
+    with package:
+        members = [
+            member for member in package.infolist()
+            if not member.is_dir()
+            and member.filename.lower().endswith(".docx")
+            and not os.path.basename(member.filename).startswith(("~$", "."))
+            and not member.filename.startswith("__MACOSX/")
+        ]
+
+        if not members:
+            raise ValueError("压缩包中没有.docx文件")
+        if len(members) > max_files:
+            raise ValueError(f"压缩包中文档过多(最多{max_files}个)")
+
+        # 先按中央目录记录的大小检查，再按实际读出的字节数限制
+        for member in members:
+            if member.file_size > max_file_size:
+                raise ValueError(f"文件大小超过限制: {member.filename}")
+
+        documents = []
+        try:
+            for member in members:
+                file_id = str(uuid.uuid4())
+                filename = secure_filename(os.path.basename(member.filename)) or "document.docx"
+                path = os.path.join(dest_folder, f"{file_id}_{filename}")
+
+                size = 0
+                sha256 = hashlib.sha256()
+                # 先登记路径，解压中途出错时一并清理
+                documents.append({"file_id": file_id, "path": path, "original_name": filename})
+                with package.open(member) as source, open(path, "wb") as target:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                        size += len(chunk)
+                        if size > max_file_size:
+                            raise ValueError(f"文件大小超过限制: {member.filename}")
+                        sha256.update(chunk)
+                        target.write(chunk)
+
+                documents[-1].update({"size": size, "content_hash": sha256.hexdigest()})
+        except zipfile.BadZipFile as e:
+            remove_documents(documents)
+            raise ValueError(f"无效的zip压缩包: {str(e)}")
+        except BaseException:
+            remove_documents(documents)
+            raise
+
+    return documents
+
+
+def remove_documents(documents: Iterable[Dict[str, Any]]):
+    """删除已解出但尚未移入存储的文档"""
+    for document in documents:
+        try:
+            os.remove(document["path"])
+        except FileNotFoundError:
+            pass
+
+
+def summarize_reports(reports: Iterable[Dict[str, Any]], errors: int = 0, top_n: int = 10) -> Dict[str, Any]:
+    """
+    汇总批量检查结果
+
+    Args:
+        reports: 各文档的检查报告
+        errors: 检查失败的文档数
+        top_n: 返回的常见不合格项数量
+
+    Returns:
+        合格率统计与最常见的不合格项
+    """
+    pass_rates = []
+    distribution = {label: 0 for _, label in PASS_RATE_BUCKETS}
+    documents_failing = Counter()
+    occurrences = Counter()
+
+    for report in reports:
+        pass_rate = report["pass_rate"]
+        pass_rates.append(pass_rate)
+        for lower, label in PASS_RATE_BUCKETS:
+            if pass_rate >= lower:
+                distribution[label] += 1
+                break
+
+        failed = Counter(
+            (item["category"], item["name"]) for item in report["items"] if not item["passed"]
+        )
+        occurrences.update(failed)
+        documents_failing.update(failed.keys())
+
+    checked = len(pass_rates)
+    pass_rates.sort()
+
+    return {
+        "documents": checked + errors,
+        "checked": checked,
+        "errors": errors,
+        "average_pass_rate": round(sum(pass_rates) / checked, 1) if checked else 0,
+        "median_pass_rate": _median(pass_rates),
+        "min_pass_rate": pass_rates[0] if checked else 0,
+        "max_pass_rate": pass_rates[-1] if checked else 0,
+        "pass_rate_distribution": distribution,
+        "common_failures": [
+            {
+                "category": category,
+                "name": name,
+                "documents": count,
+                "occurrences": occurrences[(category, name)]
+            }
+            for (category, name), count in documents_failing.most_common(top_n)
+        ]
+    }
+
+
+def _median(values: List[float]) -> float:
+    """计算有序列表的中位数"""
+    if not values:
+        return 0
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return round((values[middle - 1] + values[middle]) / 2, 1)
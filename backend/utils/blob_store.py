@@ -0,0 +1,67 @@
+import os
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    按内容寻址的文档存储
+
+    文件以SHA-256命名保存，相同内容只保存一份。引用关系由文件登记表记录
+    （引用数即登记表中该内容哈希的行数），最后一个引用删除时调用remove()。
+    """
+
+    def __init__(self, root: str, registry):
+        """
+        Args:
+            root: 存储目录
+            registry: 记录引用关系的文件登记表，统计信息由它计算
+        """
+        self.root = root
+        self.registry = registry
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, content_hash: str) -> str:
+        """内容哈希对应的文件路径"""
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}.docx")
+
+    def exists(self, content_hash: str) -> bool:
+        """是否已保存该内容"""
+        return os.path.exists(self.path(content_hash))
+
+    def add_file(self, src_path: str, content_hash: str) -> str:
+        """
+        将文件移入存储，内容已存在时删除源文件
+
+        Args:
+            src_path: 源文件路径，调用后不再存在
+            content_hash: 文件内容的SHA-256
+
+        Returns:
+            存储中的文件路径
+        """
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            os.remove(src_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(src_path, path)
+        return path
+
+    def remove(self, content_hash: str):
+        """删除内容"""
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"删除文档: {content_hash}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计信息
+
+        每个被引用的内容恰好保存一份，按登记表中不同的内容哈希统计，
+        不遍历存储目录，各worker进程看到的结果一致。
+        """
+        return self.registry.content_stats()
@@ -0,0 +1,238 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt, Cm, Length
+from docx.text.paragraph import Paragraph
+from utils.format_config import FormatConfig
+from utils.xml_formatter import XmlFormatter, _PPR_SUCCESSORS, _RPR_SUCCESSORS
+
+logger = logging.getLogger(__name__)
+
+# 编译结果缓存的最大条目数
+MAX_COMPILED_CONFIGS = 256
+
+_ALIGNMENTS = {
+    "center": WD_ALIGN_PARAGRAPH.CENTER,
+    "right": WD_ALIGN_PARAGRAPH.RIGHT
+}
+
+
+class FrozenDict(dict):
+    """只读字典，可正常进行JSON序列化与进程间传递"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("编译后的格式配置不可修改")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __ior__(self, other):
+        self._readonly()
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value: Any) -> Any:
+    """递归转换为只读结构：字典转为FrozenDict，列表转为元组"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """将只读结构还原为普通的字典与列表"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class RoleFormat(NamedTuple):
+    """某一角色（标题、正文、图表标题等）预先构建好的格式值"""
+
+    font_name: str
+    font_size: Length
+    bold: Optional[bool]
+    alignment: WD_ALIGN_PARAGRAPH
+    line_spacing: Optional[Union[Length, float]]
+    space_before: Optional[Length]
+    space_after: Optional[Length]
+    first_line_indent: Length
+
+    @classmethod
+    def from_config(cls, format_config: Dict[str, Any]) -> "RoleFormat":
+        """由配置段构建，缺省值与逐项设置时一致"""
+        line_spacing = format_config.get("line_spacing")
+        if line_spacing is not None and format_config.get("line_spacing_type") == "fixed":
+            line_spacing = Pt(line_spacing)
+
+        return cls(
+            font_name=format_config.get("font_name", "宋体"),
+            font_size=Pt(format_config.get("font_size", 12)),
+            bold=format_config.get("bold"),
+            alignment=_ALIGNMENTS.get(format_config.get("alignment", "left"), WD_ALIGN_PARAGRAPH.LEFT),
+            line_spacing=line_spacing,
+            space_before=Pt(format_config["space_before"] * 12) if "space_before" in format_config else None,
+            space_after=Pt(format_config["space_after"] * 12) if "space_after" in format_config else None,
+            first_line_indent=Cm(format_config.get("first_line_indent", 2) * 0.37)
+        )
+
+    def apply(self, paragraph):
+        """设置段落及其所有run的格式（首行缩进除外）"""
+        for run in paragraph.runs:
+            if not run or not run.font:
+                continue
+
+            try:
+                run.font.name = self.font_name
+                if run.element.rPr is not None:
+                    run.element.rPr.rFonts.set(qn('w:eastAsia'), self.font_name)
+
+                run.font.size = self.font_size
+
+                if self.bold is not None:
+                    run.font.bold = self.bold
+            except Exception as e:
+                logger.warning(f"设置段落格式失败: {str(e)}")
+                continue
+
+        paragraph.alignment = self.alignment
+
+        paragraph_format = paragraph.paragraph_format
+        if self.line_spacing is not None:
+            paragraph_format.line_spacing = self.line_spacing
+        if self.space_before is not None:
+            paragraph_format.space_before = self.space_before
+        if self.space_after is not None:
+            paragraph_format.space_after = self.space_after
+
+
+class CompiledConfig(FrozenDict):
+    """
+    编译后的格式配置
+
+    内容为合并默认值并验证后的只读配置，可像普通字典一样读取。各角色的长度值、
+    对齐枚举和XML片段在首次使用时构建并随配置缓存，同一配置的后续请求和
+    每个run都不再重复读取字典、构造Pt()/Cm()对象。
+    """
+
+    def __init__(self, merged_config: Dict[str, Any]):
+        """
+        Args:
+            merged_config: 已合并默认值并通过验证的配置
+        """
+        super().__init__((key, freeze(value)) for key, value in merged_config.items())
+        self.hash = FormatConfig.config_hash(self)
+        self._roles = {}
+        self._fragments = {}
+
+    def __reduce__(self):
+        # 在工作进程中重新编译，以便复用该进程内的缓存
+        return compile_config, (thaw(self),)
+
+    def role(self, name: str) -> RoleFormat:
+        """
+        某一配置段的格式值
+
+        Args:
+            name: 配置段名，如"body"、"heading2"，不存在时使用缺省值
+        """
+        role = self._roles.get(name)
+        if role is None:
+            role = self._roles[name] = RoleFormat.from_config(self.get(name, {}))
+        return role
+
+    def fragment(self, name: str) -> Tuple[List, List]:
+        """
+        某一配置段的(pPr子元素, rPr子元素)片段
+
+        由RoleFormat.apply作用于一个空白段落得到，保证与逐run排版结果一致。
+        """
+        fragment = self._fragments.get(name)
+        if fragment is None:
+            p = OxmlElement("w:p")
+            p.append(OxmlElement("w:r"))
+            self.role(name).apply(Paragraph(p, None))
+            fragment = self._fragments[name] = (
+                XmlFormatter._prepare(p.pPr, _PPR_SUCCESSORS),
+                XmlFormatter._prepare(p.r_lst[0].rPr, _RPR_SUCCESSORS)
+            )
+        return fragment
+
+    def indent_fragment(self, name: str = "body") -> List:
+        """某一配置段的首行缩进片段"""
+        key = f"{name}:indent"
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            p = OxmlElement("w:p")
+            Paragraph(p, None).paragraph_format.first_line_indent = self.role(name).first_line_indent
+            fragment = self._fragments[key] = XmlFormatter._prepare(p.pPr, _PPR_SUCCESSORS)
+        return fragment
+
+
+_compiled_cache = OrderedDict()
+_compiled_lock = threading.Lock()
+_compiled_stats = {"hits": 0, "misses": 0}
+
+
+def compile_config(custom_config: Optional[Dict[str, Any]] = None) -> CompiledConfig:
+    """
+    合并、验证并编译格式配置，按自定义配置的规范化哈希缓存
+
+    Args:
+        custom_config: 用户自定义配置，已编译的配置原样返回
+
+    Raises:
+        ValueError: 配置不合法
+    """
+    if isinstance(custom_config, CompiledConfig):
+        return custom_config
+
+    custom_config = custom_config or {}
+    if not isinstance(custom_config, dict):
+        raise ValueError("格式配置必须为对象")
+
+    key = FormatConfig.config_hash(custom_config)
+    with _compiled_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is not None:
+            _compiled_cache.move_to_end(key)
+            _compiled_stats["hits"] += 1
+            return compiled
+
+    merged_config = FormatConfig.merge_config(custom_config)
+    is_valid, error_msg = FormatConfig.validate_config(merged_config)
+    if not is_valid:
+        raise ValueError(error_msg)
+    compiled = CompiledConfig(merged_config)
+
+    with _compiled_lock:
+        _compiled_stats["misses"] += 1
+        _compiled_cache[key] = compiled
+        while len(_compiled_cache) > MAX_COMPILED_CONFIGS:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def compiled_config_stats() -> Dict[str, Any]:
+    """获取编译缓存统计信息"""
+    with _compiled_lock:
+        return {
+            "entries": len(_compiled_cache),
+            "max_entries": MAX_COMPILED_CONFIGS,
+            **_compiled_stats
+        }
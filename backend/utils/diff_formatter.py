@@ -0,0 +1,171 @@
+import copy
+import logging
+from typing import Dict, List, Any, Optional
+from docx.oxml.ns import qn
+from docx.shared import Cm
+from lxml import etree
+from utils.xml_formatter import XmlFormatter, _MERGE_TAGS, _TAG_IND, _TAG_SPACING, _ATTR_HANGING, _ATTR_LINE_RULE
+
+logger = logging.getLogger(__name__)
+
+# 属性元素对应的统计类别
+_CATEGORIES = {
+    qn("w:rFonts"): "font_name",
+    qn("w:sz"): "font_size",
+    qn("w:b"): "bold",
+    qn("w:jc"): "alignment",
+    qn("w:spacing"): "spacing",
+    qn("w:ind"): "first_line_indent"
+}
+
+# 开关型元素，省略w:val与"1"、"true"、"on"等价
+_ON_OFF_TAGS = {qn("w:b")}
+_ON_VALUES = (None, "1", "true", "on")
+
+_ATTR_VAL = qn("w:val")
+
+
+class DiffFormatter(XmlFormatter):
+    """
+    差异排版引擎
+
+    目标片段与XmlFormatter相同，但写入前先与段落现有的w:pPr/w:rPr比较，
+    只改写不一致的元素和属性，已符合要求的段落与run保持原样。大部分内容
+    已合规的文档几乎不产生写入，输出XML也与原文档最为接近。
+    """
+
+    def __init__(self, processor):
+        """
+        Args:
+            processor: 已建立段落索引的DocxProcessor
+        """
+        super().__init__(processor)
+        self.stats = {
+            "paragraphs": 0,
+            "runs": 0,
+            "unchanged_paragraphs": 0,
+            "mutations": {category: 0 for category in ("page_margins", *_CATEGORIES.values())}
+        }
+
+    def apply(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        对比并改写页面设置、标题与正文格式
+
+        Args:
+            config: 编译后的格式配置
+
+        Returns:
+            改写的段落数与run数、无需改写的段落数以及各类别的改写次数
+        """
+        self._apply_page_settings(config)
+
+        body_fragment = config.fragment("body")
+        indent_fragment = config.indent_fragment("body")
+
+        for info in self.processor.paragraph_index:
+            p = info["paragraph"]._p
+            level = info["level"]
+
+            if level > 0:
+                self._diff_paragraph(p, config.fragment(f"heading{level}"))
+            elif len(info["text"]) > 0:
+                self._diff_paragraph(p, body_fragment, indent_fragment)
+
+        return self.stats
+
+    def _apply_page_settings(self, config: Dict[str, Any]):
+        """改写与配置不一致的页边距，按写入XML的缇值比较"""
+        page_config = config.get("page_settings", {})
+        for section in self.processor.doc.sections:
+            for name, default in self.processor.PAGE_MARGINS:
+                target = Cm(page_config.get(name, default))
+                current = getattr(section, name)
+                if current is None or current.twips != target.twips:
+                    setattr(section, name, target)
+                    self.stats["mutations"]["page_margins"] += 1
+
+    def _diff_paragraph(self, p, fragment, indent_fragment: Optional[List] = None):
+        """对比段落及其所有run，段落没有run时与逐run排版一样只处理首行缩进"""
+        runs = p.r_lst
+        changed = False
+
+        if runs:
+            pPr_fragment, rPr_fragment = fragment
+            changed = self._diff(p.pPr, p.get_or_add_pPr, pPr_fragment)
+            changed_runs = 0
+            for r in runs:
+                if self._diff(r.rPr, r.get_or_add_rPr, rPr_fragment):
+                    changed_runs += 1
+            if changed_runs:
+                changed = True
+                self.stats["runs"] += changed_runs
+
+        if indent_fragment and self._diff(p.pPr, p.get_or_add_pPr, indent_fragment):
+            changed = True
+
+        if changed:
+            self.stats["paragraphs"] += 1
+        elif runs:
+            self.stats["unchanged_paragraphs"] += 1
+
+    def _diff(self, target, get_or_add, fragment: List) -> bool:
+        """
+        将片段中与目标不一致的元素写入目标属性元素
+
+        Args:
+            target: 现有的w:pPr/w:rPr，不存在时为None
+            get_or_add: 需要写入时创建目标属性元素的方法
+            fragment: _prepare生成的片段
+
+        Returns:
+            是否有改写
+        """
+        changed = False
+        for tag, successors, child in fragment:
+            existing = target.find(tag) if target is not None else None
+
+            if existing is None:
+                if target is None:
+                    target = get_or_add()
+                self._insert(target, successors, child)
+            elif tag in _MERGE_TAGS:
+                updates = self._attribute_updates(tag, existing, child)
+                stale_hanging = tag == _TAG_IND and _ATTR_HANGING in existing.attrib
+                if not updates and not stale_hanging:
+                    continue
+                if stale_hanging:
+                    del existing.attrib[_ATTR_HANGING]
+                for name, value in updates:
+                    existing.set(name, value)
+            elif self._equivalent(tag, existing, child):
+                continue
+            else:
+                target.replace(existing, copy.deepcopy(child))
+
+            category = _CATEGORIES.get(tag) or etree.QName(tag).localname
+            self.stats["mutations"][category] = self.stats["mutations"].get(category, 0) + 1
+            changed = True
+        return changed
+
+    @staticmethod
+    def _attribute_updates(tag: str, existing, child) -> List:
+        """合并型元素中需要改写的属性"""
+        updates = []
+        for name, value in child.attrib.items():
+            # 固定行距不覆盖已有的"最小值"行距规则，与python-docx一致
+            if tag == _TAG_SPACING and name == _ATTR_LINE_RULE and value == "exact" \
+                    and existing.get(_ATTR_LINE_RULE) == "atLeast":
+                continue
+            if existing.get(name) != value:
+                updates.append((name, value))
+        return updates
+
+    @staticmethod
+    def _equivalent(tag: str, existing, child) -> bool:
+        """整体替换型元素是否已与目标一致"""
+        if len(existing) or len(child):
+            return False
+        if tag in _ON_OFF_TAGS:
+            return (existing.get(_ATTR_VAL) in _ON_VALUES) == (child.get(_ATTR_VAL) in _ON_VALUES) \
+                and len(existing.attrib) <= 1
+        return dict(existing.attrib) == dict(child.attrib)
@@ -0,0 +1,141 @@
+import copy
+import zipfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any
+from docx import Document
+from utils.metrics import PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+# 解析后的lxml树连同python-docx对象约占XML部件解压后字节数的6-7倍（实测论文样本），
+# 按7倍估算；图片等二进制部件按原始字节保存在内存中
+XML_MEMORY_FACTOR = 7
+
+
+def estimate_memory(package: zipfile.ZipFile) -> int:
+    """根据docx压缩包目录估算解析后文档占用的内存（字节）"""
+    size = 0
+    for info in package.infolist():
+        if info.filename.endswith((".xml", ".rels")):
+            size += info.file_size * XML_MEMORY_FACTOR
+        else:
+            size += info.file_size
+    return size
+
+
+class DocumentCache:
+    """
+    已解析文档的LRU缓存
+
+    缓存按内容哈希保存未经修改的原始文档，只读请求直接共享同一份只读副本，
+    需要修改文档的请求获得一份深拷贝，均无需重新解压和解析docx。
+    内存预算按解析后文档的估算内存计算，见estimate_memory。
+
+    注意：python-docx的代理对象会缓存子元素引用，对已被访问过的文档做深拷贝时
+    这些子元素会被复制成游离的树，因此拷贝只从从未对外暴露的母本进行。
+    超出预算而不缓存的文档不做拷贝，解析结果直接交给调用方。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, content_hash: str, file_path: str, writable: bool = False):
+        """
+        获取文档对象
+
+        Args:
+            content_hash: 文档内容的SHA-256
+            file_path: 缓存未命中时加载的文件路径
+            writable: 是否需要可修改的副本
+
+        Returns:
+            python-docx文档对象，writable为False时调用方不得修改
+        """
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        # 解析与拷贝计入与DocxProcessor相同的阶段计时
+        timer = PhaseTimer()
+        if entry is None:
+            entry = timer.timed("load", self._load, content_hash, file_path)
+            if not entry["cached"]:
+                # 文档过大未放入缓存，刚解析出的母本不与任何请求共享，直接交给调用方
+                return entry["master"]
+
+        if writable:
+            return timer.timed("cache.copy", copy.deepcopy, entry["master"])
+
+        if entry["reader"] is None:
+            reader = timer.timed("cache.copy", copy.deepcopy, entry["master"])
+            with self._lock:
+                if entry["reader"] is None:
+                    entry["reader"] = reader
+                    if self._entries.get(content_hash) is entry:
+                        entry["bytes"] += entry["size"]
+                        self._current_bytes += entry["size"]
+                        self._evict()
+        return entry["reader"]
+
+    def _load(self, content_hash: str, file_path: str) -> Dict[str, Any]:
+        """解析文档并放入缓存，文档过大时不缓存（cached为False）"""
+        try:
+            document = Document(file_path)
+            with zipfile.ZipFile(file_path) as package:
+                size = estimate_memory(package)
+        except Exception as e:
+            logger.error(f"加载文档失败: {str(e)}")
+            raise ValueError(f"无法打开文档: {str(e)}")
+
+        entry = {"master": document, "reader": None, "size": size, "bytes": size, "cached": False}
+        if size * 2 > self.max_bytes:
+            return entry
+
+        with self._lock:
+            existing = self._entries.get(content_hash)
+            if existing is not None:
+                return existing
+            entry["cached"] = True
+            self._entries[content_hash] = entry
+            self._current_bytes += size
+            self._evict()
+
+        return entry
+
+    def _evict(self):
+        """淘汰最久未使用的文档直至回到内存预算内，调用方需持有锁"""
+        while self._current_bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= evicted["bytes"]
+            self.evictions += 1
+
+    def discard(self, content_hash: str):
+        """移除指定文档"""
+        with self._lock:
+            entry = self._entries.pop(content_hash, None)
+            if entry is not None:
+                self._current_bytes -= entry["bytes"]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
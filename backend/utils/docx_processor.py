@@ -3,13 +3,50 @@ import os
 from docx import Document
 from docx.shared import Pt, Cm, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.oxml.ns import qn
-from typing import Dict, List, Any, Tuple
+from docx.oxml.ns import qn, nsmap
+from lxml import etree
+from typing import Dict, List, Any, Tuple, Optional
 import logging
+from utils.role_matcher import get_role_matcher
+from utils.xml_formatter import XmlFormatter
+from utils.style_formatter import StyleFormatter
+from utils.diff_formatter import DiffFormatter
+from utils.docx_writer import save_document
+from utils.findings import FindingAggregator, aggregated_items
+from utils.style_resolver import StyleResolver
+from utils.compiled_config import RoleFormat, compile_config
+from utils.metrics import PhaseTimer, record_document
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 段落文本相关元素，预编译以避免python-docx每次调用xpath时重新编译
+_RUN_CONTENT_XPATH = etree.XPath("./w:r/* | ./w:hyperlink/w:r/*", namespaces=nsmap)
+_RUN_CONTENT_TEXT = {
+    qn("w:tab"): "\t",
+    qn("w:ptab"): "\t",
+    qn("w:cr"): "\n",
+    qn("w:noBreakHyphen"): "-"
+}
+_TAG_T = qn("w:t")
+_TAG_BR = qn("w:br")
+_ATTR_TYPE = qn("w:type")
+
+
+def paragraph_text(p) -> str:
+    """获取w:p元素的文本，与python-docx的Paragraph.text结果一致"""
+    parts = []
+    for elem in _RUN_CONTENT_XPATH(p):
+        tag = elem.tag
+        if tag == _TAG_T:
+            parts.append(elem.text or "")
+        elif tag == _TAG_BR:
+            if elem.get(_ATTR_TYPE) in (None, "textWrapping"):
+                parts.append("\n")
+        else:
+            parts.append(_RUN_CONTENT_TEXT.get(tag, ""))
+    return "".join(parts)
+
 
 class DocxProcessor:
     """Word文档处理核心类"""
@@ -20,34 +57,149 @@ class DocxProcessor:
         "四号": 14, "小四": 12, "五号": 10.5, "小五": 9
     }
     
-    HEADING_PATTERNS = {
-        1: [
-            r'^第[一二三四五六七八九十百]+章',
-            r'^第\d+章',
-            r'^摘\s*要$',
-            r'^Abstract$',
-            r'^目\s*录$',
-            r'^参考文献$',
-            r'^致\s*谢$',
-            r'^附\s*录$'
-        ],
-        2: [r'^\d+\.\d+\s+', r'^\d+\.\d+$'],
-        3: [r'^\d+\.\d+\.\d+\s+', r'^\d+\.\d+\.\d+$']
-    }
+    # 段落角色
+    ROLE_BODY = "body"
+    ROLE_ABSTRACT_CHINESE = "abstract_chinese"
+    ROLE_ABSTRACT_ENGLISH = "abstract_english"
+    ROLE_TOC_TITLE = "toc_title"
+    ROLE_REFERENCE_TITLE = "reference_title"
+    ROLE_CAPTION = "caption"
+    
+    # 排版引擎：docx逐run通过python-docx对象设置，xml按角色批量写入XML片段，
+    # style改写样式定义并为段落指定样式，diff只改写与目标格式不一致的属性
+    ENGINES = ("docx", "xml", "style", "diff")
+    
+    # 页边距（cm）及其默认值
+    PAGE_MARGINS = (
+        ("top_margin", 2.5), ("bottom_margin", 2.5),
+        ("left_margin", 3.0), ("right_margin", 2.5)
+    )
+    
+    def __init__(self, file_path: str, document=None):
+        """
+        初始化文档处理器
+        
+        Args:
+            file_path: 文档路径
+            document: 已解析的文档对象（如来自文档缓存），提供时不再读取文件
+        """
+        self._matcher = get_role_matcher()
+        self.file_path = file_path
+        # 各阶段耗时（秒），同时计入进程的阶段直方图
+        self.timings = PhaseTimer()
+        
+        if document is not None:
+            self.doc = document
+        else:
+            try:
+                self.doc = self.timings.timed("load", Document, file_path)
+                logger.info(f"成功加载文档: {file_path}")
+            except Exception as e:
+                logger.error(f"加载文档失败: {str(e)}")
+                raise ValueError(f"无法打开文档: {str(e)}")
+        
+        self.timings.timed("index", self._build_paragraph_index)
+    
+    def _build_paragraph_index(self):
+        """
+        单次遍历文档构建段落索引
+        
+        每个条目记录段落的标题级别、角色、去除首尾空白的文本以及首个run的有效字体信息，
+        所有检查与排版方法都从该索引读取，避免重复遍历文档和重复执行正则匹配。
+        """
+        self.paragraph_index = []
+        self.run_count = 0
+        style_names = {}
+        # 排版可能改写样式定义，每次建立索引时重新解析
+        self._resolver = StyleResolver(self.doc.styles.element)
+        
+        for position, para in enumerate(self.doc.paragraphs, 1):
+            p = para._p
+            style_id = p.style
+            if style_id not in style_names:
+                style_names[style_id] = para.style.name if para.style is not None else None
+            
+            self.paragraph_index.append(self._index_entry(p, style_names[style_id], para, position))
+            self.run_count += len(p.r_lst)
+        
+        self.paragraph_count = len(self.paragraph_index)
+    
+    def _index_entry(self, p, style_name: str, paragraph=None, position: int = 0) -> Dict[str, Any]:
+        """
+        根据段落XML元素生成索引条目
+        
+        Args:
+            p: w:p元素
+            style_name: 段落样式名
+            paragraph: 对应的python-docx段落对象，流式检查时为None
+            position: 段落在正文中的序号（从1开始），用于在报告中定位
+        """
+        text = paragraph_text(p).strip()
+        role, level = self._classify(style_name, text)
+        
+        # 字体与段落格式取经样式继承链解析后的有效值，而非仅直接格式
+        r_lst = p.r_lst
+        style_id = p.style
+        run_props = self._resolver.run_properties(style_id, r_lst[0].rPr) if r_lst else {}
+        paragraph_props = self._resolver.paragraph_properties(style_id, p.pPr)
+        
+        return {
+            "paragraph": paragraph,
+            "position": position,
+            "text": text,
+            "style_name": style_name,
+            "level": level,
+            "role": role,
+            "has_runs": len(r_lst) > 0,
+            "font_name": run_props.get("font_name"),
+            "font_size": run_props.get("font_size"),
+            "bold": run_props.get("bold"),
+            "alignment": paragraph_props["alignment"],
+            "first_line_indent": paragraph_props["first_line_indent"]
+        }
     
-    def __init__(self, file_path: str):
-        """初始化文档处理器"""
+    def document_size(self) -> Dict[str, Optional[int]]:
+        """文档规模：段落数、run数、节数与文件大小（字节，未知时为None）"""
         try:
-            self.doc = Document(file_path)
-            self.file_path = file_path
-            logger.info(f"成功加载文档: {file_path}")
-        except Exception as e:
-            logger.error(f"加载文档失败: {str(e)}")
-            raise ValueError(f"无法打开文档: {str(e)}")
+            file_bytes = os.path.getsize(self.file_path) if isinstance(self.file_path, str) else None
+        except OSError:
+            file_bytes = None
+        return {
+            "paragraphs": self.paragraph_count,
+            "runs": self.run_count,
+            "sections": len(self._section_facts()),
+            "bytes": file_bytes
+        }
+    
+    def _section_facts(self) -> List[Dict[str, Any]]:
+        """获取各节的页边距（cm）与页眉页脚信息"""
+        facts = []
+        for section in self.doc.sections:
+            facts.append({
+                "top_margin": section.top_margin.cm if section.top_margin is not None else None,
+                "bottom_margin": section.bottom_margin.cm if section.bottom_margin is not None else None,
+                "left_margin": section.left_margin.cm if section.left_margin is not None else None,
+                "right_margin": section.right_margin.cm if section.right_margin is not None else None,
+                "has_header": section.header is not None,
+                "has_footer": section.footer is not None
+            })
+        return facts
+    
+    def _use_patterns(self, config: Dict[str, Any]):
+        """切换到模板配置的识别模式，模式变化时仅对索引重新分类"""
+        matcher = get_role_matcher(config.get("patterns"))
+        if matcher is self._matcher:
+            return
+        
+        self._matcher = matcher
+        for info in self.paragraph_index:
+            info["role"], info["level"] = self._classify(info["style_name"], info["text"])
     
     def check_format(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """检查文档格式并生成报告"""
         try:
+            self._use_patterns(config)
+            
             report = {
                 "total_items": 0,
                 "passed_items": 0,
@@ -56,21 +208,23 @@ class DocxProcessor:
                 "items": []
             }
             
-            report["items"].extend(self._check_page_settings(config))
-            report["items"].extend(self._check_cover())
-            report["items"].extend(self._check_abstract(config))
-            report["items"].extend(self._check_toc())
-            report["items"].extend(self._check_headings(config))
-            report["items"].extend(self._check_body(config))
-            report["items"].extend(self._check_figures(config))
-            report["items"].extend(self._check_header_footer(config))
-            report["items"].extend(self._check_references(config))
+            timed = self.timings.timed
+            report["items"].extend(timed("check.page_settings", self._check_page_settings, config))
+            report["items"].extend(timed("check.cover", self._check_cover))
+            report["items"].extend(timed("check.abstract", self._check_abstract, config))
+            report["items"].extend(timed("check.toc", self._check_toc))
+            report["items"].extend(timed("check.headings", self._check_headings, config))
+            report["items"].extend(timed("check.body", self._check_body, config))
+            report["items"].extend(timed("check.figures", self._check_figures, config))
+            report["items"].extend(timed("check.header_footer", self._check_header_footer, config))
+            report["items"].extend(timed("check.references", self._check_references, config))
             
             report["total_items"] = len(report["items"])
             report["passed_items"] = sum(1 for item in report["items"] if item["passed"])
             report["failed_items"] = report["total_items"] - report["passed_items"]
             report["pass_rate"] = round((report["passed_items"] / report["total_items"] * 100) if report["total_items"] > 0 else 0, 1)
             
+            record_document("check", self.document_size())
             return report
         except Exception as e:
             logger.error(f"格式检查失败: {str(e)}")
@@ -79,8 +233,9 @@ class DocxProcessor:
     def _check_page_settings(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
         """检查页面设置"""
         items = []
+        sections = self._section_facts()
         
-        if not self.doc.sections or len(self.doc.sections) == 0:
+        if not sections:
             items.append({
                 "category": "页面设置",
                 "name": "文档节",
@@ -91,12 +246,12 @@ class DocxProcessor:
             })
             return items
         
-        section = self.doc.sections[0]
+        section = sections[0]
         page_config = config.get("page_settings", {})
         
         # 检查上页边距
-        if section.top_margin is not None:
-            top_margin = section.top_margin.cm
+        if section["top_margin"] is not None:
+            top_margin = section["top_margin"]
             expected_top = page_config.get("top_margin", 2.5)
             items.append({
                 "category": "页面设置",
@@ -117,8 +272,8 @@ class DocxProcessor:
             })
         
         # 检查下页边距
-        if section.bottom_margin is not None:
-            bottom_margin = section.bottom_margin.cm
+        if section["bottom_margin"] is not None:
+            bottom_margin = section["bottom_margin"]
             expected_bottom = page_config.get("bottom_margin", 2.5)
             items.append({
                 "category": "页面设置",
@@ -139,8 +294,8 @@ class DocxProcessor:
             })
         
         # 检查左页边距
-        if section.left_margin is not None:
-            left_margin = section.left_margin.cm
+        if section["left_margin"] is not None:
+            left_margin = section["left_margin"]
             expected_left = page_config.get("left_margin", 3.0)
             items.append({
                 "category": "页面设置",
@@ -161,8 +316,8 @@ class DocxProcessor:
             })
         
         # 检查右页边距
-        if section.right_margin is not None:
-            right_margin = section.right_margin.cm
+        if section["right_margin"] is not None:
+            right_margin = section["right_margin"]
             expected_right = page_config.get("right_margin", 2.5)
             items.append({
                 "category": "页面设置",
@@ -187,7 +342,7 @@ class DocxProcessor:
     def _check_cover(self) -> List[Dict[str, Any]]:
         """检查封面页"""
         items = []
-        has_cover = len(self.doc.paragraphs) > 0
+        has_cover = self.paragraph_count > 0
         items.append({
             "category": "封面页",
             "name": "封面存在性",
@@ -203,20 +358,19 @@ class DocxProcessor:
         items = []
         abstract_found = False
         
-        for para in self.doc.paragraphs:
-            text = para.text.strip()
-            if re.match(r'^摘\s*要$', text) or text == "Abstract":
+        for info in self.paragraph_index:
+            if info["role"] in (self.ROLE_ABSTRACT_CHINESE, self.ROLE_ABSTRACT_ENGLISH):
                 abstract_found = True
-                is_chinese = re.match(r'^摘\s*要$', text)
+                is_chinese = info["role"] == self.ROLE_ABSTRACT_CHINESE
                 
                 abstract_config = config.get("abstract_title", {}).get("chinese" if is_chinese else "english", {})
                 expected_font = abstract_config.get("font_name", "黑体" if is_chinese else "Times New Roman")
                 expected_size = abstract_config.get("font_size", 18)
                 expected_align = abstract_config.get("alignment", "center")
                 
-                actual_font = para.runs[0].font.name if para.runs and para.runs[0].font.name else "未知"
-                actual_size = para.runs[0].font.size.pt if para.runs and para.runs[0].font.size else 0
-                actual_align = "center" if para.alignment == WD_ALIGN_PARAGRAPH.CENTER else "left"
+                actual_font = info["font_name"] or "未知"
+                actual_size = info["font_size"] or 0
+                actual_align = "center" if info["alignment"] == WD_ALIGN_PARAGRAPH.CENTER else "left"
                 
                 items.append({
                     "category": "摘要",
@@ -260,7 +414,7 @@ class DocxProcessor:
     def _check_toc(self) -> List[Dict[str, Any]]:
         """检查目录"""
         items = []
-        toc_found = any(re.match(r'^目\s*录$', para.text.strip()) for para in self.doc.paragraphs)
+        toc_found = any(info["role"] == self.ROLE_TOC_TITLE for info in self.paragraph_index)
         
         items.append({
             "category": "目录",
@@ -274,167 +428,127 @@ class DocxProcessor:
         return items
     
     def _check_headings(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """检查标题格式"""
-        items = []
+        """检查标题格式，每级标题的每项格式汇总为一个检查项"""
+        aggregators = {}
         
-        for para in self.doc.paragraphs:
-            level = self._detect_heading_level(para)
-            if level > 0:
-                heading_config = config.get(f"heading{level}", {})
-                
-                if para.runs and len(para.runs) > 0:
-                    run_font = para.runs[0].font
-                    actual_font = run_font.name if run_font and run_font.name else "未知"
-                    actual_size = run_font.size.pt if run_font and run_font.size else 0
-                    actual_bold = run_font.bold if run_font else False
-                    
-                    expected_font = heading_config.get("font_name", "黑体")
-                    expected_size = heading_config.get("font_size", 16)
-                    expected_bold = heading_config.get("bold", True)
-                    expected_align = heading_config.get("alignment", "center")
-                    
-                    actual_align = "center" if para.alignment == WD_ALIGN_PARAGRAPH.CENTER else "left"
-                    
-                    items.append({
-                        "category": f"{level}级标题",
-                        "name": f"字体",
-                        "passed": actual_font == expected_font,
-                        "current": actual_font,
-                        "expected": expected_font,
-                        "suggestion": f"将字体调整为{expected_font}"
-                    })
-                    
-                    items.append({
-                        "category": f"{level}级标题",
-                        "name": f"字号",
-                        "passed": abs(actual_size - expected_size) < 1,
-                        "current": f"{actual_size}pt",
-                        "expected": f"{expected_size}pt",
-                        "suggestion": f"将字号调整为{expected_size}pt"
-                    })
-                    
-                    items.append({
-                        "category": f"{level}级标题",
-                        "name": f"加粗",
-                        "passed": actual_bold == expected_bold,
-                        "current": "是" if actual_bold else "否",
-                        "expected": "是" if expected_bold else "否",
-                        "suggestion": f"{'添加' if expected_bold else '取消'}加粗"
-                    })
-                    
-                    items.append({
-                        "category": f"{level}级标题",
-                        "name": f"对齐方式",
-                        "passed": actual_align == expected_align,
-                        "current": "居中" if actual_align == "center" else "左对齐",
-                        "expected": "居中" if expected_align == "center" else "左对齐",
-                        "suggestion": f"调整为{'居中' if expected_align == 'center' else '左对齐'}"
-                    })
+        for info in self.paragraph_index:
+            level = info["level"]
+            if level > 0 and info["has_runs"]:
+                if level not in aggregators:
+                    aggregators[level] = self._heading_aggregators(level, config.get(f"heading{level}", {}))
+                for aggregator in aggregators[level]:
+                    aggregator.add(info)
         
+        items = []
+        for level in sorted(aggregators):
+            items.extend(aggregated_items(aggregators[level]))
         return items
     
-    def _check_body(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """检查正文格式"""
-        items = []
+    def _heading_aggregators(self, level: int, heading_config: Dict[str, Any]) -> List[FindingAggregator]:
+        """某一级标题的聚合检查项"""
+        category = f"{level}级标题"
+        expected_font = heading_config.get("font_name", "黑体")
+        expected_size = heading_config.get("font_size", 16)
+        expected_bold = heading_config.get("bold", True)
+        expected_align = heading_config.get("alignment", "center")
+        
+        return [
+            self._font_aggregator(category, expected_font),
+            self._size_aggregator(category, expected_size),
+            FindingAggregator(
+                category, "加粗", expected_bold,
+                value=lambda info: info["bold"],
+                passes=lambda bold: bold == expected_bold,
+                suggestion=f"{'添加' if expected_bold else '取消'}加粗",
+                label=lambda bold: "是" if bold else "否"
+            ),
+            self._alignment_aggregator(category, expected_align)
+        ]
+    
+    def _font_aggregator(self, category: str, expected_font: str) -> FindingAggregator:
+        """字体检查项"""
+        return FindingAggregator(
+            category, "字体", expected_font,
+            value=lambda info: info["font_name"] or "未知",
+            passes=lambda font: font == expected_font,
+            suggestion=f"将字体调整为{expected_font}"
+        )
+    
+    def _size_aggregator(self, category: str, expected_size: float) -> FindingAggregator:
+        """字号检查项"""
+        return FindingAggregator(
+            category, "字号", expected_size,
+            value=lambda info: info["font_size"] or 0,
+            passes=lambda size: abs(size - expected_size) < 1,
+            suggestion=f"将字号调整为{expected_size}pt",
+            label=lambda size: f"{size}pt"
+        )
+    
+    def _alignment_aggregator(self, category: str, expected_align: str) -> FindingAggregator:
+        """对齐方式检查项"""
+        return FindingAggregator(
+            category, "对齐方式", expected_align,
+            value=lambda info: "center" if info["alignment"] == WD_ALIGN_PARAGRAPH.CENTER else "left",
+            passes=lambda align: align == expected_align,
+            suggestion=f"调整为{'居中' if expected_align == 'center' else '左对齐'}",
+            label=lambda align: "居中" if align == "center" else "左对齐"
+        )
+    
+    def _is_body_paragraph(self, info: Dict[str, Any]) -> bool:
+        """是否为参与正文检查的段落：有内容的普通正文段落"""
+        return info["level"] == 0 and info["role"] == self.ROLE_BODY \
+            and info["has_runs"] and len(info["text"]) > 10
+    
+    def _body_aggregators(self, config: Dict[str, Any]) -> List[FindingAggregator]:
+        """正文的聚合检查项"""
         body_config = config.get("body", {})
-        
-        checked_paragraphs = 0
-        for para in self.doc.paragraphs:
-            if self._detect_heading_level(para) == 0 and len(para.text.strip()) > 10:
-                checked_paragraphs += 1
-                if checked_paragraphs > 5:
-                    break
-                
-                if para.runs and len(para.runs) > 0:
-                    run_font = para.runs[0].font
-                    actual_font = run_font.name if run_font and run_font.name else "未知"
-                    actual_size = run_font.size.pt if run_font and run_font.size else 0
-                    
-                    expected_font = body_config.get("font_name", "宋体")
-                    expected_size = body_config.get("font_size", 12)
-                    expected_line_spacing = body_config.get("line_spacing", 1.5)
-                    expected_indent = body_config.get("first_line_indent", 2)
-                    
-                    items.append({
-                        "category": "正文",
-                        "name": "字体",
-                        "passed": actual_font == expected_font,
-                        "current": actual_font,
-                        "expected": expected_font,
-                        "suggestion": f"将字体调整为{expected_font}"
-                    })
-                    
-                    items.append({
-                        "category": "正文",
-                        "name": "字号",
-                        "passed": abs(actual_size - expected_size) < 1,
-                        "current": f"{actual_size}pt",
-                        "expected": f"{expected_size}pt",
-                        "suggestion": f"将字号调整为{expected_size}pt"
-                    })
-                    
-                    actual_indent = para.paragraph_format.first_line_indent
-                    indent_chars = actual_indent.cm / 0.37 if actual_indent else 0
-                    
-                    items.append({
-                        "category": "正文",
-                        "name": "首行缩进",
-                        "passed": abs(indent_chars - expected_indent) < 0.5,
-                        "current": f"{indent_chars:.1f}字符",
-                        "expected": f"{expected_indent}字符",
-                        "suggestion": f"将首行缩进调整为{expected_indent}字符"
-                    })
-                    
-                    break
-        
-        return items
+        expected_font = body_config.get("font_name", "宋体")
+        expected_size = body_config.get("font_size", 12)
+        expected_indent = body_config.get("first_line_indent", 2)
+        
+        return [
+            self._font_aggregator("正文", expected_font),
+            self._size_aggregator("正文", expected_size),
+            FindingAggregator(
+                "正文", "首行缩进", expected_indent,
+                value=lambda info: round(info["first_line_indent"] / 0.37, 1) if info["first_line_indent"] else 0,
+                passes=lambda indent: abs(indent - expected_indent) < 0.5,
+                suggestion=f"将首行缩进调整为{expected_indent}字符",
+                label=lambda indent: f"{indent:.1f}字符"
+            )
+        ]
+    
+    def _check_body(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """检查全部正文段落的格式"""
+        aggregators = self._body_aggregators(config)
+        for info in self.paragraph_index:
+            if self._is_body_paragraph(info):
+                for aggregator in aggregators:
+                    aggregator.add(info)
+        return aggregated_items(aggregators)
     
     def _check_figures(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """检查图表标题"""
-        items = []
+        """检查全部图表标题"""
         figure_config = config.get("figure_caption", {})
-        
-        for para in self.doc.paragraphs:
-            text = para.text.strip()
-            if re.match(r'^(图|表)\s*\d+', text):
-                if para.runs and len(para.runs) > 0:
-                    run_font = para.runs[0].font
-                    actual_font = run_font.name if run_font and run_font.name else "未知"
-                    actual_size = run_font.size.pt if run_font and run_font.size else 0
-                    actual_align = "center" if para.alignment == WD_ALIGN_PARAGRAPH.CENTER else "left"
-                    
-                    expected_font = figure_config.get("font_name", "宋体")
-                    expected_size = figure_config.get("font_size", 10.5)
-                    expected_align = figure_config.get("alignment", "center")
-                    
-                    items.append({
-                        "category": "图表标题",
-                        "name": "字体",
-                        "passed": actual_font == expected_font,
-                        "current": actual_font,
-                        "expected": expected_font,
-                        "suggestion": f"将字体调整为{expected_font}"
-                    })
-                    
-                    items.append({
-                        "category": "图表标题",
-                        "name": "字号",
-                        "passed": abs(actual_size - expected_size) < 1,
-                        "current": f"{actual_size}pt",
-                        "expected": f"{expected_size}pt",
-                        "suggestion": f"将字号调整为{expected_size}pt"
-                    })
-                    
-                    break
-        
-        return items
+        aggregators = [
+            self._font_aggregator("图表标题", figure_config.get("font_name", "宋体")),
+            self._size_aggregator("图表标题", figure_config.get("font_size", 10.5)),
+            self._alignment_aggregator("图表标题", figure_config.get("alignment", "center"))
+        ]
+        
+        for info in self.paragraph_index:
+            if info["role"] == self.ROLE_CAPTION and info["has_runs"]:
+                for aggregator in aggregators:
+                    aggregator.add(info)
+        return aggregated_items(aggregators)
     
     def _check_header_footer(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
         """检查页眉页脚"""
         items = []
-        section = self.doc.sections[0]
+        sections = self._section_facts()
+        section = sections[0] if sections else {"has_header": False, "has_footer": False}
         
-        has_header = section.header is not None
+        has_header = section["has_header"]
         items.append({
             "category": "页眉页脚",
             "name": "页眉存在性",
@@ -444,7 +558,7 @@ class DocxProcessor:
             "suggestion": "添加页眉" if not has_header else ""
         })
         
-        has_footer = section.footer is not None
+        has_footer = section["has_footer"]
         items.append({
             "category": "页眉页脚",
             "name": "页码存在性",
@@ -461,15 +575,14 @@ class DocxProcessor:
         items = []
         ref_found = False
         
-        for para in self.doc.paragraphs:
-            if re.match(r'^参考文献$', para.text.strip()):
+        for info in self.paragraph_index:
+            if info["role"] == self.ROLE_REFERENCE_TITLE:
                 ref_found = True
                 ref_config = config.get("reference", {})
                 
-                if para.runs and len(para.runs) > 0:
-                    run_font = para.runs[0].font
-                    actual_font = run_font.name if run_font and run_font.name else "未知"
-                    actual_size = run_font.size.pt if run_font and run_font.size else 0
+                if info["has_runs"]:
+                    actual_font = info["font_name"] or "未知"
+                    actual_size = info["font_size"] or 0
                     
                     expected_font = ref_config.get("title_font_name", "黑体")
                     expected_size = ref_config.get("title_font_size", 16)
@@ -506,61 +619,119 @@ class DocxProcessor:
     
     def _detect_heading_level(self, paragraph) -> int:
         """检测段落的标题级别"""
-        if paragraph and paragraph.style and paragraph.style.name:
-            if paragraph.style.name.startswith('Heading'):
-                try:
-                    return int(paragraph.style.name.split()[-1])
-                except:
-                    pass
-        
-        text = paragraph.text.strip()
-        for level, patterns in self.HEADING_PATTERNS.items():
-            for pattern in patterns:
-                if re.match(pattern, text):
-                    return level
-        
-        return 0
-    
-    def format_document(self, config: Dict[str, Any], output_path: str) -> str:
-        """一键排版文档"""
+        style_name = paragraph.style.name if paragraph and paragraph.style else None
+        return self._classify(style_name, paragraph.text.strip())[1]
+    
+    def _classify(self, style_name: str, text: str) -> Tuple[str, int]:
+        """根据样式名和段落文本判断段落角色与标题级别"""
+        role, level = self._matcher.match(text)
+        
+        if style_name and style_name.startswith('Heading'):
+            try:
+                level = int(style_name.split()[-1])
+            except:
+                pass
+        
+        return role, level
+    
+    def format_document(self, config: Dict[str, Any], output_path, engine: str = "docx",
+                        compress_level: Optional[int] = None):
+        """
+        一键排版文档
+        
+        Args:
+            config: 格式配置，未编译的配置先经compile_config合并、验证与编译
+            output_path: 排版后文档的保存路径，或可写的文件对象（如BytesIO）
+            engine: 排版引擎，见ENGINES
+            compress_level: zip压缩级别0-9，None时使用默认级别
+            
+        Returns:
+            output_path，排版写入的元素数量记录在format_stats中
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"不支持的排版引擎: {engine}")
+        
+        config = compile_config(config)
         try:
-            self._apply_page_settings(config)
-            self._apply_heading_formats(config)
-            self._apply_body_formats(config)
-            self._apply_header_footer(config)
+            self._use_patterns(config)
+            self.format_stats = {"paragraphs": 0, "runs": 0}
+            timed = self.timings.timed
+            
+            if engine == "diff":
+                # 页面设置同样只在不一致时改写，由DiffFormatter处理
+                self.format_stats = timed("format.diff", DiffFormatter(self).apply, config)
+            else:
+                timed("format.page_settings", self._apply_page_settings, config)
+                if engine == "xml":
+                    self.format_stats = timed("format.xml", XmlFormatter(self).apply, config)
+                elif engine == "style":
+                    self.format_stats = timed("format.style", StyleFormatter(self).apply, config)
+                else:
+                    timed("format.heading_formats", self._apply_heading_formats, config)
+                    timed("format.body_formats", self._apply_body_formats, config)
+            timed("format.header_footer", self._apply_header_footer, config)
             
-            self.doc.save(output_path)
-            logger.info(f"文档排版完成: {output_path}")
+            timed("save", save_document, self.doc, output_path, compress_level)
+            record_document("format", self.document_size())
+            logger.info(f"文档排版完成: {output_path if isinstance(output_path, str) else '内存'}")
             return output_path
         except Exception as e:
             logger.error(f"文档排版失败: {str(e)}")
             raise
     
+    def format_and_check(self, config: Dict[str, Any], output_path, engine: str = "docx",
+                         compress_level: Optional[int] = None) -> Dict[str, Any]:
+        """
+        一键排版并复查排版结果
+        
+        排版后直接在内存中的文档上重新建立段落索引并执行格式检查，
+        无需保存后再重新读取文件。
+        
+        Args:
+            config: 格式配置
+            output_path: 排版后文档的保存路径，或可写的文件对象
+            engine: 排版引擎，见ENGINES
+            compress_level: zip压缩级别0-9，None时使用默认级别
+            
+        Returns:
+            排版后文档的检查报告
+        """
+        self.format_document(config, output_path, engine=engine, compress_level=compress_level)
+        self.timings.timed("index", self._build_paragraph_index)
+        return self.check_format(config)
+    
     def _apply_page_settings(self, config: Dict[str, Any]):
         """应用页面设置"""
         page_config = config.get("page_settings", {})
         for section in self.doc.sections:
-            section.top_margin = Cm(page_config.get("top_margin", 2.5))
-            section.bottom_margin = Cm(page_config.get("bottom_margin", 2.5))
-            section.left_margin = Cm(page_config.get("left_margin", 3.0))
-            section.right_margin = Cm(page_config.get("right_margin", 2.5))
+            for name, default in self.PAGE_MARGINS:
+                setattr(section, name, Cm(page_config.get(name, default)))
     
     def _apply_heading_formats(self, config: Dict[str, Any]):
         """应用标题格式"""
-        for para in self.doc.paragraphs:
-            level = self._detect_heading_level(para)
+        for info in self.paragraph_index:
+            level = info["level"]
             if level > 0:
-                heading_config = config.get(f"heading{level}", {})
-                self._set_paragraph_format(para, heading_config)
+                self._set_paragraph_format(info["paragraph"], config.role(f"heading{level}"))
+                self._count_formatted(info["paragraph"])
     
     def _apply_body_formats(self, config: Dict[str, Any]):
         """应用正文格式"""
-        body_config = config.get("body", {})
-        
-        for para in self.doc.paragraphs:
-            if self._detect_heading_level(para) == 0 and len(para.text.strip()) > 0:
-                self._set_paragraph_format(para, body_config)
-                para.paragraph_format.first_line_indent = Cm(body_config.get("first_line_indent", 2) * 0.37)
+        body = config.role("body")
+        
+        for info in self.paragraph_index:
+            if info["level"] == 0 and len(info["text"]) > 0:
+                para = info["paragraph"]
+                self._set_paragraph_format(para, body)
+                self._count_formatted(para)
+                para.paragraph_format.first_line_indent = body.first_line_indent
+    
+    def _count_formatted(self, paragraph):
+        """记录排版写入的段落数与run数"""
+        run_count = len(paragraph._p.r_lst)
+        if run_count:
+            self.format_stats["paragraphs"] += 1
+            self.format_stats["runs"] += run_count
     
     def _apply_header_footer(self, config: Dict[str, Any]):
         """应用页眉页脚"""
@@ -578,47 +749,9 @@ class DocxProcessor:
                     run.font.name = header_config.get("font_name", "宋体")
                     run.font.size = Pt(header_config.get("font_size", 9))
     
-    def _set_paragraph_format(self, paragraph, format_config: Dict[str, Any]):
-        """设置段落格式"""
+    def _set_paragraph_format(self, paragraph, role: RoleFormat):
+        """设置段落格式，格式值取自编译后配置中的RoleFormat"""
         if not paragraph or not paragraph.runs:
             return
         
-        for run in paragraph.runs:
-            if not run or not run.font:
-                continue
-            
-            try:
-                font_name = format_config.get("font_name", "宋体")
-                run.font.name = font_name
-                if run.element.rPr is not None:
-                    run.element.rPr.rFonts.set(qn('w:eastAsia'), font_name)
-                
-                font_size = format_config.get("font_size", 12)
-                run.font.size = Pt(font_size)
-                
-                if "bold" in format_config:
-                    run.font.bold = format_config["bold"]
-            except Exception as e:
-                logger.warning(f"设置段落格式失败: {str(e)}")
-                continue
-        
-        alignment = format_config.get("alignment", "left")
-        if alignment == "center":
-            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        elif alignment == "right":
-            paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        else:
-            paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        
-        if "line_spacing" in format_config:
-            line_spacing = format_config["line_spacing"]
-            if format_config.get("line_spacing_type") == "fixed":
-                paragraph.paragraph_format.line_spacing = Pt(line_spacing)
-            else:
-                paragraph.paragraph_format.line_spacing = line_spacing
-        
-        if "space_before" in format_config:
-            paragraph.paragraph_format.space_before = Pt(format_config["space_before"] * 12)
-        
-        if "space_after" in format_config:
-            paragraph.paragraph_format.space_after = Pt(format_config["space_after"] * 12)
\ No newline at end of file
+        role.apply(paragraph)
@@ -0,0 +1,63 @@
+import logging
+from typing import Optional
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+from docx.opc.pkgwriter import PackageWriter
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_LEVELS = range(0, 10)
+
+
+class _LeveledZipPkgWriter:
+    """
+    按指定压缩级别写入的docx压缩包，级别0不压缩
+
+    实现与python-docx的_ZipPkgWriter相同的write/close接口。
+    """
+
+    def __init__(self, pkg_file, compress_level: int):
+        self._zipf = ZipFile(
+            pkg_file, "w",
+            compression=ZIP_STORED if compress_level == 0 else ZIP_DEFLATED,
+            compresslevel=None if compress_level == 0 else compress_level
+        )
+
+    def write(self, pack_uri, blob: bytes):
+        """以pack_uri对应的成员名写入内容"""
+        self._zipf.writestr(pack_uri.membername, blob)
+
+    def close(self):
+        """写入中央目录并关闭压缩包"""
+        self._zipf.close()
+
+
+def save_document(document, output, compress_level: Optional[int] = None):
+    """
+    保存文档
+
+    Args:
+        document: python-docx文档
+        output: 文件路径或可写的文件对象（如BytesIO、响应流）
+        compress_level: zip压缩级别0-9，None时使用python-docx默认级别；
+                        级别越低保存越快、文件越大
+    """
+    if compress_level is None:
+        document.save(output)
+        return
+
+    if compress_level not in COMPRESS_LEVELS:
+        raise ValueError(f"不支持的压缩级别: {compress_level}")
+
+    # 与OpcPackage.save相同的写入流程，仅替换压缩包写入器。PackageWriter的这几个
+    # 静态方法不是公开接口，requirements.txt固定了python-docx版本，升级时须通过
+    # tests/test_docx_writer.py的各级别往返测试。先用Document.save再重新压缩虽只依赖
+    # 公开接口，但总要先按默认级别压缩一遍，低级别反而比默认更慢，失去了该选项的意义
+    package = document.part.package
+    for part in package.parts:
+        part.before_marshal()
+
+    phys_writer = _LeveledZipPkgWriter(output, compress_level)
+    PackageWriter._write_content_types_stream(phys_writer, package.parts)
+    PackageWriter._write_pkg_rels(phys_writer, package.rels)
+    PackageWriter._write_parts(phys_writer, package.parts)
+    phys_writer.close()
@@ -0,0 +1,155 @@
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """
+    后台过期清理
+
+    在独立线程中定期按类型查询创建时间早于TTL的文件（登记表的created_at索引
+    使查询只触及已过期的行），分批释放，上传请求不再承担清理开销。释放失败的
+    文件计入errors并在下次清理时重试。
+    """
+
+    def __init__(self, registry, release: Callable[[str], Optional[Dict[str, Any]]],
+                 ttls: Dict[str, timedelta], interval: float = 60, batch_size: int = 500):
+        """
+        Args:
+            registry: 文件登记表
+            release: 释放一个文件的函数，返回被删除的文件信息，
+                     其中blob_removed表示文件内容是否随之删除
+            ttls: 各文件类型的保留时间
+            interval: 两次清理之间的秒数
+            batch_size: 每批释放的文件数
+        """
+        self.registry = registry
+        self.release = release
+        self.ttls = ttls
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "reclaimed_files": 0,
+            "reclaimed_blobs": 0,
+            "reclaimed_bytes": 0,
+            "reclaimed_by_kind": {kind: 0 for kind in ttls},
+            "errors": 0,
+            "last_run_at": None,
+            "last_run_seconds": None,
+            "last_reclaimed": 0
+        }
+
+    @property
+    def running(self) -> bool:
+        """后台线程是否在本进程中运行（fork出的子进程中为False）"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动后台线程，已在运行时不做任何事"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="expiry-scheduler", daemon=True)
+            self._thread.start()
+        logger.info(f"过期清理已启动: 间隔{self.interval}s")
+
+    def stop(self):
+        """停止后台线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"过期清理失败: {str(e)}")
+                with self._lock:
+                    self._stats["errors"] += 1
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> int:
+        """
+        清理一次所有已过期的文件
+
+        Returns:
+            释放的文件数
+        """
+        start = time.perf_counter()
+        now = datetime.now()
+        reclaimed = 0
+
+        for kind, ttl in self.ttls.items():
+            # 本次清理中释放失败的文件，之后的批次跳过它们，避免反复重试阻塞其余文件
+            failed = set()
+            while True:
+                limit = self.batch_size + len(failed)
+                candidates = self.registry.expired(now - ttl, kind=kind, limit=limit)
+                batch = [file_info for file_info in candidates if file_info["file_id"] not in failed]
+                if not batch:
+                    break
+
+                # 每个文件在各自的事务中释放，单个文件失败不影响同批其他文件
+                released = []
+                for file_info in batch[:self.batch_size]:
+                    try:
+                        result = self.release(file_info["file_id"])
+                    except Exception as e:
+                        logger.error(f"释放过期文件失败: {file_info['file_id']} - {str(e)}")
+                        failed.add(file_info["file_id"])
+                        continue
+                    if result is not None:
+                        released.append(result)
+
+                self._record(kind, released)
+                reclaimed += len(released)
+
+                if len(candidates) < limit:
+                    break
+
+            if failed:
+                with self._lock:
+                    self._stats["errors"] += len(failed)
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["last_run_at"] = now.isoformat()
+            self._stats["last_run_seconds"] = round(time.perf_counter() - start, 4)
+            self._stats["last_reclaimed"] = reclaimed
+
+        if reclaimed:
+            logger.info(f"清理过期文件: {reclaimed}个")
+        return reclaimed
+
+    def _record(self, kind: str, released):
+        """累计清理指标"""
+        with self._lock:
+            self._stats["reclaimed_files"] += len(released)
+            self._stats["reclaimed_by_kind"][kind] = self._stats["reclaimed_by_kind"].get(kind, 0) + len(released)
+            for file_info in released:
+                if file_info.get("blob_removed"):
+                    self._stats["reclaimed_blobs"] += 1
+                    self._stats["reclaimed_bytes"] += file_info["size"]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取清理统计信息"""
+        with self._lock:
+            return {
+                **self._stats,
+                "reclaimed_by_kind": dict(self._stats["reclaimed_by_kind"]),
+                "ttl_seconds": {kind: ttl.total_seconds() for kind, ttl in self.ttls.items()},
+                "interval_seconds": self.interval,
+                "running": self.running
+            }
@@ -0,0 +1,390 @@
+import os
+import json
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 文件类型：用户上传的原始文档与排版结果
+KIND_UPLOAD = "upload"
+KIND_FORMATTED = "formatted"
+
+# 排版结果的来源：(源文档哈希, 配置哈希, 排版引擎, zip压缩级别)，压缩级别None表示默认级别
+DerivedKey = Tuple[str, str, str, Optional[int]]
+# SQLite中表示默认压缩级别的值（主键列不使用NULL）
+DEFAULT_COMPRESS_LEVEL = -1
+
+
+class MemoryFileRegistry:
+    """
+    进程内文件登记表
+
+    仅适用于单进程部署和调试，多个worker进程之间不共享。
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._derived = {}
+        self._jobs = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def locked(self):
+        """在锁内执行一组登记与文件操作"""
+        with self._lock:
+            yield
+
+    def add(self, file_info: Dict[str, Any]):
+        """登记文件，file_info须包含file_id"""
+        with self._lock:
+            self._files[file_info["file_id"]] = dict(file_info)
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """获取文件信息，不存在时返回None"""
+        file_info = self._files.get(file_id)
+        return dict(file_info) if file_info is not None else None
+
+    def remove(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """删除登记并返回被删除的文件信息"""
+        with self._lock:
+            return self._files.pop(file_id, None)
+
+    def references(self, content_hash: str) -> int:
+        """引用同一内容的文件数"""
+        with self._lock:
+            return sum(1 for info in self._files.values() if info["content_hash"] == content_hash)
+
+    def expired(self, before: datetime, kind: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """创建时间早于before的文件，按创建时间排序"""
+        with self._lock:
+            files = [
+                dict(info) for info in self._files.values()
+                if info["created_at"] < before and (kind is None or info["kind"] == kind)
+            ]
+        files.sort(key=lambda info: info["created_at"])
+        return files[:limit]
+
+    def get_derived(self, key: DerivedKey) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """查找(源文档哈希, 配置哈希, 排版引擎, 压缩级别)对应的(排版结果哈希, 排版统计)"""
+        return self._derived.get(key)
+
+    def set_derived(self, key: DerivedKey, content_hash: str, format_stats: Dict[str, Any]):
+        """记录排版结果"""
+        with self._lock:
+            self._derived[key] = (content_hash, format_stats)
+
+    def remove_derived(self, content_hash: str):
+        """删除指向某个排版结果的记录"""
+        with self._lock:
+            for key in [k for k, (value, _) in self._derived.items() if value == content_hash]:
+                del self._derived[key]
+
+    def content_stats(self) -> Dict[str, int]:
+        """被引用的不同内容数及其大小之和"""
+        with self._lock:
+            sizes = {info["content_hash"]: info["size"] for info in self._files.values()}
+        return {"blobs": len(sizes), "bytes": sum(sizes.values())}
+
+    def add_job(self, job: Dict[str, Any]):
+        """登记异步任务，job须包含job_id"""
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+
+    def update_job(self, job_id: str, **fields):
+        """更新任务的状态、结果等字段"""
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录（含结果），不存在时返回None"""
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def job_counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def purge_jobs(self, before: float) -> int:
+        """删除完成时间（未完成的按创建时间）早于before的任务，返回删除数"""
+        with self._lock:
+            job_ids = [job_id for job_id, job in self._jobs.items()
+                       if (job["finished_at"] or job["created_at"]) < before]
+            for job_id in job_ids:
+                del self._jobs[job_id]
+            return len(job_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取登记表统计信息"""
+        with self._lock:
+            kinds = {}
+            for info in self._files.values():
+                kinds[info["kind"]] = kinds.get(info["kind"], 0) + 1
+            return {
+                "backend": "memory",
+                "files": len(self._files),
+                "kinds": kinds,
+                "contents": len({info["content_hash"] for info in self._files.values()}),
+                "derived": len(self._derived)
+            }
+
+
+class SqliteFileRegistry:
+    """
+    基于SQLite的文件登记表
+
+    使用WAL模式，多个worker进程可同时读取，写入由SQLite的文件锁串行化。
+    每个线程使用各自的连接，locked()通过BEGIN IMMEDIATE在进程间互斥。
+    异步任务的状态与结果也保存在这里，任一worker都能查询其他worker提交的任务。
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS files (
+            file_id TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            original_name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_files_created_at ON files (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files (content_hash)",
+        """CREATE TABLE IF NOT EXISTS derived (
+            source_hash TEXT NOT NULL,
+            config_hash TEXT NOT NULL,
+            engine TEXT NOT NULL,
+            compress_level INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            format_stats TEXT NOT NULL,
+            PRIMARY KEY (source_hash, config_hash, engine, compress_level)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_derived_content_hash ON derived (content_hash)",
+        """CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            finished_at REAL,
+            result TEXT,
+            error TEXT
+        )"""
+    )
+
+    COLUMNS = ("file_id", "path", "original_name", "size", "content_hash", "kind", "created_at")
+    JOB_COLUMNS = ("job_id", "type", "status", "created_at", "finished_at", "result", "error")
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        """
+        Args:
+            db_path: 数据库文件路径
+            timeout: 等待其他进程释放写锁的秒数
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        # 旧版derived表的主键不含压缩级别；其中只是可重新生成的排版结果索引，直接重建
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(derived)")]
+        if columns and "compress_level" not in columns:
+            conn.execute("DROP TABLE derived")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        # 进程fork后不沿用父进程的连接
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def locked(self):
+        """
+        在写事务内执行一组登记与文件操作
+
+        事务持有数据库写锁，其他进程的locked()会等待，可用于保证
+        "检查引用数并删除文件"与"确认文件存在并登记引用"互不交错。
+        """
+        conn = self._connection()
+        if conn.in_transaction:
+            yield
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def add(self, file_info: Dict[str, Any]):
+        """登记文件，file_info须包含file_id"""
+        values = [file_info[column] for column in self.COLUMNS]
+        values[-1] = file_info["created_at"].timestamp()
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO files ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+            values
+        )
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """获取文件信息，不存在时返回None"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM files WHERE file_id = ?", (file_id,)
+        ).fetchone()
+        return self._to_info(row) if row is not None else None
+
+    def remove(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """删除登记并返回被删除的文件信息"""
+        with self.locked():
+            file_info = self.get(file_id)
+            if file_info is not None:
+                self._connection().execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+        return file_info
+
+    def references(self, content_hash: str) -> int:
+        """引用同一内容的文件数"""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM files WHERE content_hash = ?", (content_hash,)
+        ).fetchone()[0]
+
+    def expired(self, before: datetime, kind: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """创建时间早于before的文件，按创建时间排序"""
+        query = f"SELECT {', '.join(self.COLUMNS)} FROM files WHERE created_at < ?"
+        params = [before.timestamp()]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY created_at LIMIT ?"
+        params.append(limit)
+        return [self._to_info(row) for row in self._connection().execute(query, params)]
+
+    def get_derived(self, key: DerivedKey) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """查找(源文档哈希, 配置哈希, 排版引擎, 压缩级别)对应的(排版结果哈希, 排版统计)"""
+        row = self._connection().execute(
+            "SELECT content_hash, format_stats FROM derived "
+            "WHERE source_hash = ? AND config_hash = ? AND engine = ? AND compress_level = ?",
+            self._derived_values(key)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def set_derived(self, key: DerivedKey, content_hash: str, format_stats: Dict[str, Any]):
+        """记录排版结果"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO derived (source_hash, config_hash, engine, compress_level, content_hash, format_stats) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (*self._derived_values(key), content_hash, json.dumps(format_stats))
+        )
+
+    def _derived_values(self, key: DerivedKey) -> Tuple:
+        """将来源转换为derived表主键列的取值"""
+        source_hash, config_hash, engine, compress_level = key
+        return (source_hash, config_hash, engine,
+                DEFAULT_COMPRESS_LEVEL if compress_level is None else compress_level)
+
+    def remove_derived(self, content_hash: str):
+        """删除指向某个排版结果的记录"""
+        self._connection().execute("DELETE FROM derived WHERE content_hash = ?", (content_hash,))
+
+    def content_stats(self) -> Dict[str, int]:
+        """被引用的不同内容数及其大小之和"""
+        blobs, total_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM "
+            "(SELECT MAX(size) AS size FROM files GROUP BY content_hash)"
+        ).fetchone()
+        return {"blobs": blobs, "bytes": total_bytes}
+
+    def add_job(self, job: Dict[str, Any]):
+        """登记异步任务，job须包含job_id"""
+        values = [job.get(column) for column in self.JOB_COLUMNS]
+        values[self.JOB_COLUMNS.index("result")] = json.dumps(job.get("result"), ensure_ascii=False)
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(self.JOB_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(self.JOB_COLUMNS))})",
+            values
+        )
+
+    def update_job(self, job_id: str, **fields):
+        """更新任务的状态、结果等字段"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        columns = [column for column in fields if column in self.JOB_COLUMNS]
+        self._connection().execute(
+            f"UPDATE jobs SET {', '.join(f'{column} = ?' for column in columns)} WHERE job_id = ?",
+            [fields[column] for column in columns] + [job_id]
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录（含结果），不存在时返回None"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(self.JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.JOB_COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def job_counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        return dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def purge_jobs(self, before: float) -> int:
+        """删除完成时间（未完成的按创建时间）早于before的任务，返回删除数"""
+        return self._connection().execute(
+            "DELETE FROM jobs WHERE COALESCE(finished_at, created_at) < ?", (before,)
+        ).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """获取登记表统计信息"""
+        conn = self._connection()
+        kinds = dict(conn.execute("SELECT kind, COUNT(*) FROM files GROUP BY kind").fetchall())
+        return {
+            "backend": "sqlite",
+            "files": sum(kinds.values()),
+            "kinds": kinds,
+            "contents": conn.execute("SELECT COUNT(DISTINCT content_hash) FROM files").fetchone()[0],
+            "derived": conn.execute("SELECT COUNT(*) FROM derived").fetchone()[0]
+        }
+
+    def _to_info(self, row) -> Dict[str, Any]:
+        """将查询结果转换为文件信息字典"""
+        file_info = dict(zip(self.COLUMNS, row))
+        file_info["created_at"] = datetime.fromtimestamp(file_info["created_at"])
+        return file_info
+
+
+def create_file_registry(url: str):
+    """
+    根据地址创建文件登记表
+
+    Args:
+        url: "memory://" 或 "sqlite:///数据库路径"
+
+    Raises:
+        ValueError: 不支持的地址
+    """
+    if url == "memory://":
+        return MemoryFileRegistry()
+    if url.startswith("sqlite:///"):
+        return SqliteFileRegistry(url[len("sqlite:///"):])
+    raise ValueError(f"不支持的文件登记表地址: {url}")
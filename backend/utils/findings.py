@@ -0,0 +1,96 @@
+from typing import Dict, List, Any, Callable
+
+
+class FindingAggregator:
+    """
+    聚合型检查项
+
+    逐段落记录某项格式的实际取值，按取值统计段落数并为每种取值保留少量示例位置，
+    最终只生成一个检查项（如"312段 仿宋，4段 宋体"）。检查覆盖全部段落，
+    报告大小却与文档长度无关。
+    """
+
+    # 检查项中最多列出的取值数与每种取值保留的示例段落数
+    MAX_VALUES = 10
+    MAX_SAMPLES = 3
+    # 示例段落文本的最大长度
+    SAMPLE_TEXT_LENGTH = 20
+
+    def __init__(self, category: str, name: str, expected: Any,
+                 value: Callable[[Dict[str, Any]], Any], passes: Callable[[Any], bool],
+                 suggestion: str, label: Callable[[Any], str] = str):
+        """
+        Args:
+            category: 检查项类别
+            name: 检查项名称
+            expected: 期望值
+            value: 从段落索引条目取出实际值的函数
+            passes: 判断取值是否合格的函数
+            suggestion: 不合格时的修改建议
+            label: 取值的显示文本
+        """
+        self.category = category
+        self.name = name
+        self.expected = expected
+        self.value = value
+        self.passes = passes
+        self.suggestion = suggestion
+        self.label = label
+        self.count = 0
+        self._buckets = {}
+
+    def add(self, info: Dict[str, Any]):
+        """记录一个段落索引条目"""
+        value = self.value(info)
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            bucket = self._buckets[value] = {
+                "value": self.label(value),
+                "passed": self.passes(value),
+                "count": 0,
+                "samples": []
+            }
+
+        bucket["count"] += 1
+        self.count += 1
+        if len(bucket["samples"]) < self.MAX_SAMPLES:
+            bucket["samples"].append({
+                "paragraph": info["position"],
+                "text": info["text"][:self.SAMPLE_TEXT_LENGTH]
+            })
+
+    def item(self) -> Dict[str, Any]:
+        """生成检查项，histogram按段落数从多到少列出各取值"""
+        buckets = sorted(self._buckets.values(), key=lambda bucket: -bucket["count"])
+        failed = [bucket for bucket in buckets if not bucket["passed"]]
+        failed_count = sum(bucket["count"] for bucket in failed)
+
+        if len(buckets) == 1:
+            current = buckets[0]["value"]
+        else:
+            current = "，".join(f"{bucket['count']}段 {bucket['value']}" for bucket in buckets[:3])
+            if len(buckets) > 3:
+                current += "等"
+
+        suggestion = ""
+        if failed:
+            positions = [sample["paragraph"] for bucket in failed for sample in bucket["samples"]]
+            positions = "、".join(str(position) for position in sorted(positions)[:self.MAX_SAMPLES])
+            suggestion = f"{self.suggestion}（共{failed_count}段，如第{positions}段）"
+
+        return {
+            "category": self.category,
+            "name": self.name,
+            "passed": not failed,
+            "current": current,
+            "expected": self.label(self.expected),
+            "suggestion": suggestion,
+            "checked": self.count,
+            "failed_count": failed_count,
+            "histogram": buckets[:self.MAX_VALUES]
+        }
+
+
+def aggregated_items(aggregators: List[FindingAggregator]) -> List[Dict[str, Any]]:
+    """生成至少记录了一个段落的检查项"""
+    return [aggregator.item() for aggregator in aggregators if aggregator.count]
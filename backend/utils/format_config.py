@@ -1,4 +1,6 @@
+import copy
 import json
+import hashlib
 from typing import Dict, Any, Tuple
 
 class FormatConfig:
@@ -97,6 +99,21 @@ class FormatConfig:
             "body_font_name": "宋体",
             "body_font_size": 10.5,
             "number_format": "[{}]"
+        },
+        "patterns": {
+            "abstract_chinese": [r"^摘\s*要$"],
+            "abstract_english": [r"^Abstract$"],
+            "toc_title": [r"^目\s*录$"],
+            "reference_title": [r"^参考文献$"],
+            "caption": [r"^(图|表)\s*\d+"],
+            "heading1": [
+                r"^第[一二三四五六七八九十百]+章",
+                r"^第\d+章",
+                r"^致\s*谢$",
+                r"^附\s*录$"
+            ],
+            "heading2": [r"^\d+\.\d+\s+", r"^\d+\.\d+$"],
+            "heading3": [r"^\d+\.\d+\.\d+\s+", r"^\d+\.\d+\.\d+$"]
         }
     }
     
@@ -119,7 +136,7 @@ class FormatConfig:
     @staticmethod
     def get_default_config() -> Dict[str, Any]:
         """获取默认配置"""
-        return FormatConfig.DEFAULT_CONFIG.copy()
+        return copy.deepcopy(FormatConfig.DEFAULT_CONFIG)
     
     @staticmethod
     def merge_config(custom_config: Dict[str, Any]) -> Dict[str, Any]:
@@ -132,21 +149,32 @@ class FormatConfig:
         Returns:
             合并后的完整配置
         """
-        merged_config = FormatConfig.DEFAULT_CONFIG.copy()
+        # 深拷贝，合并时不能改动DEFAULT_CONFIG中共享的嵌套字典
+        merged_config = copy.deepcopy(FormatConfig.DEFAULT_CONFIG)
         
         if not custom_config:
             return merged_config
         
-        # 深度合并配置
-        def deep_merge(base: dict, update: dict) -> dict:
-            for key, value in update.items():
-                if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                    base[key] = deep_merge(base[key], value)
-                else:
-                    base[key] = value
-            return base
+        return FormatConfig.deep_merge(merged_config, custom_config)
+    
+    @staticmethod
+    def deep_merge(base: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将update深度合并进base
         
-        return deep_merge(merged_config, custom_config)
+        Args:
+            base: 被合并的配置，会被原地修改
+            update: 覆盖的配置项，其中的值以副本写入
+            
+        Returns:
+            base
+        """
+        for key, value in update.items():
+            if key in base and isinstance(base[key], dict) and isinstance(value, dict):
+                base[key] = FormatConfig.deep_merge(base[key], value)
+            else:
+                base[key] = copy.deepcopy(value)
+        return base
     
     @staticmethod
     def validate_config(config: Dict[str, Any]) -> Tuple[bool, str]:
@@ -188,6 +216,13 @@ class FormatConfig:
                 if not isinstance(indent, (int, float)) or indent < 0:
                     return False, "首行缩进必须大于等于0"
             
+            # 验证标题与角色识别模式
+            if "patterns" in config:
+                from utils.role_matcher import validate_patterns
+                is_valid, error_msg = validate_patterns(config["patterns"])
+                if not is_valid:
+                    return False, error_msg
+            
             return True, ""
             
         except Exception as e:
@@ -206,6 +241,20 @@ class FormatConfig:
         """
         return json.dumps(config, ensure_ascii=False, indent=2)
     
+    @staticmethod
+    def config_hash(config: Dict[str, Any]) -> str:
+        """
+        计算配置的规范化哈希
+        
+        Args:
+            config: 配置字典
+            
+        Returns:
+            键排序后的紧凑JSON的SHA-256
+        """
+        canonical = json.dumps(config, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
     @staticmethod
     def import_config(json_str: str) -> Dict[str, Any]:
         """
@@ -0,0 +1,227 @@
+import os
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future, CancelledError
+from typing import Dict, Any, Optional, Callable
+from utils.file_registry import MemoryFileRegistry
+from utils.metrics import collect_timings
+
+logger = logging.getLogger(__name__)
+
+
+def run_check_job(file_path: str, config: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+    """
+    在工作进程中执行格式检查
+
+    Args:
+        file_path: 文档路径
+        config: 合并后的格式配置
+        stream: 是否使用流式检查器
+
+    Returns:
+        包含report与timings（工作进程中的各阶段耗时与文档规模，由调用方交给
+        record_timings）的结果
+    """
+    from utils.docx_processor import DocxProcessor
+    from utils.stream_checker import StreamChecker
+
+    def check():
+        processor = StreamChecker(file_path) if stream else DocxProcessor(file_path)
+        return processor.check_format(config)
+
+    report, timings = collect_timings(check)
+    return {"report": report, "timings": timings}
+
+
+def run_format_job(file_path: str, config: Dict[str, Any], output_path: str,
+                   engine: str = "docx", verify: bool = False,
+                   compress_level: Optional[int] = None) -> Dict[str, Any]:
+    """
+    在工作进程中执行一键排版
+
+    Args:
+        file_path: 文档路径
+        config: 合并后的格式配置
+        output_path: 排版后文档的保存路径
+        engine: 排版引擎
+        verify: 是否在排版后复查
+        compress_level: zip压缩级别0-9，None时使用默认级别
+
+    Returns:
+        包含format_stats、report（仅复查时）与timings的结果
+    """
+    from utils.docx_processor import DocxProcessor
+
+    def format_document():
+        processor = DocxProcessor(file_path)
+        report = None
+        if verify:
+            report = processor.format_and_check(config, output_path, engine=engine, compress_level=compress_level)
+        else:
+            processor.format_document(config, output_path, engine=engine, compress_level=compress_level)
+        return processor.format_stats, report
+
+    (format_stats, report), timings = collect_timings(format_document)
+    return {"format_stats": format_stats, "report": report, "timings": timings}
+
+
+class JobQueue:
+    """
+    异步任务队列
+
+    检查与排版任务在进程池中执行，请求线程提交后立即返回任务ID，
+    CPU密集的文档处理可以利用全部CPU核心而不受GIL限制。
+
+    任务的状态与结果保存在文件登记表中，使用SQLite登记表时多个worker进程
+    共享任务记录，查询请求可以由任一worker处理；"running"状态只有提交任务的
+    worker能观察到，其他worker看到的是"queued"。
+    """
+
+    def __init__(self, registry=None, max_workers: Optional[int] = None, retention_seconds: float = 3600):
+        """
+        Args:
+            registry: 保存任务记录的文件登记表，默认为进程内登记表
+            max_workers: 工作进程数，默认为CPU核心数
+            retention_seconds: 已完成任务的保留时间
+        """
+        self.registry = registry if registry is not None else MemoryFileRegistry()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        # 本进程提交、尚未完成的任务
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """首次使用时创建进程池"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def submit(self, job_type: str, fn: Callable, *args,
+               on_done: Optional[Callable[[Any], Any]] = None, **kwargs) -> str:
+        """
+        提交任务
+
+        Args:
+            job_type: 任务类型
+            fn: 在工作进程中执行的模块级函数
+            on_done: 任务成功后在主进程中执行的回调，其返回值作为任务结果，须可序列化为JSON
+
+        Returns:
+            任务ID
+        """
+        return self._track(job_type, self.execute(fn, *args, **kwargs), on_done)
+
+    def execute(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        在进程池中执行函数，不登记任务记录
+
+        用于由调用方自行等待结果的子任务（如批量检查中的单个文档）。
+
+        Returns:
+            对应的Future
+        """
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def completed(self, job_type: str, result: Any) -> str:
+        """登记一个已有结果的任务（如命中缓存），返回任务ID"""
+        future = Future()
+        future.set_result(result)
+        return self._track(job_type, future, None)
+
+    def _track(self, job_type: str, future: Future, on_done: Optional[Callable]) -> str:
+        """登记任务并在完成时更新状态"""
+        self._purge()
+
+        job_id = str(uuid.uuid4())
+        self.registry.add_job({
+            "job_id": job_id,
+            "type": job_type,
+            "status": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None
+        })
+        with self._lock:
+            self._futures[job_id] = future
+
+        def finish(done: Future):
+            try:
+                result = done.result()
+                if on_done is not None:
+                    result = on_done(result)
+                fields = {"status": "finished", "result": result}
+            except CancelledError:
+                fields = {"status": "failed", "error": "任务已取消"}
+            except Exception as e:
+                logger.error(f"任务执行失败: {job_id} - {str(e)}")
+                fields = {"status": "failed", "error": str(e)}
+            try:
+                self.registry.update_job(job_id, finished_at=time.time(), **fields)
+            except Exception as e:
+                logger.error(f"任务状态保存失败: {job_id} - {str(e)}")
+            with self._lock:
+                self._futures.pop(job_id, None)
+
+        future.add_done_callback(finish)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态
+
+        Returns:
+            任务状态字典，任务不存在时返回None
+        """
+        job = self.registry.get_job(job_id)
+        if job is None:
+            return None
+
+        status = job["status"]
+        future = self._futures.get(job_id)
+        if status == "queued" and future is not None and future.running():
+            status = "running"
+
+        return {
+            "job_id": job_id,
+            "type": job["type"],
+            "status": status,
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"]
+        }
+
+    def result(self, job_id: str) -> Any:
+        """获取已完成任务的结果"""
+        job = self.registry.get_job(job_id)
+        return job["result"] if job is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """获取队列统计信息，running只统计本进程提交的任务"""
+        counts = {"queued": 0, "running": 0, "finished": 0, "failed": 0}
+        counts.update(self.registry.job_counts())
+        with self._lock:
+            running = sum(1 for future in self._futures.values() if future.running())
+        counts["running"] = min(running, counts["queued"])
+        counts["queued"] -= counts["running"]
+        return {"workers": self.max_workers, **counts}
+
+    def _purge(self):
+        """移除超过保留时间的任务"""
+        self.registry.purge_jobs(time.time() - self.retention_seconds)
+
+    def shutdown(self):
+        """关闭进程池，未开始的任务将被取消"""
+        with self._lock:
+            futures = list(self._futures.values())
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
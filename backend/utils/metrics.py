@@ -0,0 +1,304 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# 耗时直方图的默认桶上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape_label(value: str) -> str:
+    """转义标签值中的反斜杠、双引号与换行"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """Prometheus文本格式的数值"""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    """生成{name="value",...}形式的标签串"""
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """带标签的指标，各标签组合的取值分别记录"""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标{self.name}的标签应为: {', '.join(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """生成该指标的文本格式行"""
+        help_text = self.help_text.replace("\\", "\\\\").replace("\n", "\\n")
+        lines = [f"# HELP {self.name} {help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            samples = sorted(self._values.items())
+        for key, value in samples:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """分桶直方图，记录各桶计数、总和与总数"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                # 各桶的非累计计数（最后一个为+Inf桶）、总和、总数
+                sample = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def _render_sample(self, key: Tuple, value) -> List[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    指标登记表
+
+    按Prometheus文本格式（0.0.4）导出。指标保存在进程内存中，多个worker进程
+    各自导出本进程的指标，由Prometheus按实例分别抓取；进程池中执行的任务在
+    工作进程中收集计时记录，完成后由提交任务的进程通过record_timings计入。
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已存在: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """导出全部指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PHASE_SECONDS = REGISTRY.histogram(
+    "paper_format_phase_seconds", "文档处理各阶段耗时（秒）", ("phase",)
+)
+DOCUMENTS = REGISTRY.counter(
+    "paper_format_documents_total", "已处理的文档数", ("operation",)
+)
+DOCUMENT_PARAGRAPHS = REGISTRY.counter(
+    "paper_format_document_paragraphs_total", "已处理文档的段落总数", ("operation",)
+)
+DOCUMENT_RUNS = REGISTRY.counter(
+    "paper_format_document_runs_total", "已处理文档的run总数", ("operation",)
+)
+DOCUMENT_SECTIONS = REGISTRY.counter(
+    "paper_format_document_sections_total", "已处理文档的节总数", ("operation",)
+)
+DOCUMENT_BYTES = REGISTRY.counter(
+    "paper_format_document_bytes_total", "已处理文档的文件大小总和（字节）", ("operation",)
+)
+
+# 当前请求的计时记录，仅在请求要求返回timings时设置
+_current_timings = ContextVar("paper_format_timings", default=None)
+
+
+def start_timings() -> Tuple[Dict[str, Any], Any]:
+    """
+    开始为当前上下文（请求线程）收集各阶段耗时与文档规模
+
+    Returns:
+        (计时记录, 用于stop_timings的令牌)
+    """
+    timings = {"phases": {}, "documents": []}
+    return timings, _current_timings.set(timings)
+
+
+def stop_timings(token):
+    """停止收集"""
+    _current_timings.reset(token)
+
+
+def timings_block(timings: Dict[str, Any], total_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """将计时记录转换为响应中的timings字段（毫秒）"""
+    block = {
+        "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in timings["phases"].items()},
+        "documents": timings["documents"]
+    }
+    if total_seconds is not None:
+        block["total_ms"] = round(total_seconds * 1000, 3)
+    return block
+
+
+class PhaseTimer:
+    """
+    分阶段计时器
+
+    每个阶段的耗时计入进程的阶段直方图，同时累加到计时器自身与当前请求的
+    计时记录中；同名阶段多次执行（如排版后复查再次建立索引）时耗时累加。
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            PHASE_SECONDS.observe(elapsed, phase=name)
+            timings = _current_timings.get()
+            if timings is not None:
+                timings["phases"][name] = timings["phases"].get(name, 0.0) + elapsed
+
+    def timed(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """在阶段name中执行func并返回其结果"""
+        with self.phase(name):
+            return func(*args, **kwargs)
+
+
+def record_document(operation: str, size: Dict[str, Optional[int]]):
+    """
+    记录一次文档处理的规模
+
+    Args:
+        operation: check或format
+        size: paragraphs、runs、sections与bytes，未知的项为None
+    """
+    DOCUMENTS.inc(operation=operation)
+    for counter, name in ((DOCUMENT_PARAGRAPHS, "paragraphs"), (DOCUMENT_RUNS, "runs"),
+                          (DOCUMENT_SECTIONS, "sections"), (DOCUMENT_BYTES, "bytes")):
+        if size.get(name) is not None:
+            counter.inc(size[name], operation=operation)
+
+    timings = _current_timings.get()
+    if timings is not None:
+        timings["documents"].append({"operation": operation, **size})
+
+
+def collect_timings(func: Callable, *args, **kwargs) -> Tuple[Any, Dict[str, Any]]:
+    """
+    执行func并收集其间的各阶段耗时与文档规模，用于进程池中的任务
+
+    Returns:
+        (func的返回值, 计时记录)
+    """
+    timings, token = start_timings()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        stop_timings(token)
+    return result, timings
+
+
+def record_timings(timings: Dict[str, Any]):
+    """
+    计入在其他进程中收集的计时记录
+
+    各阶段耗时按任务内的累计值计入阶段直方图，文档规模计入文档计数器，
+    同时累加到当前请求的计时记录中。
+    """
+    current = _current_timings.get()
+    for name, seconds in timings["phases"].items():
+        PHASE_SECONDS.observe(seconds, phase=name)
+        if current is not None:
+            current["phases"][name] = current["phases"].get(name, 0.0) + seconds
+
+    for document in timings["documents"]:
+        size = dict(document)
+        record_document(size.pop("operation"), size)
@@ -0,0 +1,82 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class ReportCache:
+    """
+    格式检查报告缓存
+
+    check_format的结果只取决于文档内容和合并后的配置，以
+    (文档SHA-256, 规范化配置哈希)为键缓存报告，条目随所属文件一同过期。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存的报告
+
+        Args:
+            key: (文档内容哈希, 配置哈希)
+
+        Returns:
+            报告字典，未命中或已过期时返回None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple[str, str], report: Dict[str, Any], expires_at: float):
+        """
+        缓存报告
+
+        Args:
+            key: (文档内容哈希, 配置哈希)
+            report: 检查报告
+            expires_at: 过期时间戳，与对应文件的过期时间一致
+        """
+        now = time.time()
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                expires_at = max(expires_at, existing[1])
+            self._entries[key] = (report, expires_at)
+            self._entries.move_to_end(key)
+
+            for stale_key in [k for k, (_, expiry) in self._entries.items() if expiry <= now]:
+                del self._entries[stale_key]
+                self.expirations += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations
+            }
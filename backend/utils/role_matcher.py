@@ -0,0 +1,198 @@
+import re
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple, Optional, FrozenSet
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from utils.format_config import FormatConfig
+
+
+# 模式分组 -> (段落角色, 标题级别)，顺序即匹配优先级
+PATTERN_GROUPS = [
+    ("abstract_chinese", "abstract_chinese", 1),
+    ("abstract_english", "abstract_english", 1),
+    ("toc_title", "toc_title", 1),
+    ("reference_title", "reference_title", 1),
+    ("caption", "caption", 0),
+    ("heading1", "body", 1),
+    ("heading2", "body", 2),
+    ("heading3", "body", 3)
+]
+
+# 字符类区间超过该长度时不再展开为首字符集合
+_MAX_RANGE_SIZE = 256
+
+# 匹配器缓存的最大条目数，与编译配置缓存一致
+MAX_ROLE_MATCHERS = 256
+
+
+def _first_chars(parsed) -> Optional[Tuple[FrozenSet[str], bool]]:
+    """
+    推导已解析正则可能的首字符
+
+    Returns:
+        (首字符集合, 是否可能以数字开头)，无法推导时返回None
+    """
+    for op, av in parsed:
+        if op is sre_parse.AT:
+            continue
+
+        if op is sre_parse.LITERAL:
+            return frozenset([chr(av)]), False
+
+        if op is sre_parse.IN:
+            chars = set()
+            digit = False
+            for item_op, item_av in av:
+                if item_op is sre_parse.LITERAL:
+                    chars.add(chr(item_av))
+                elif item_op is sre_parse.RANGE and item_av[1] - item_av[0] < _MAX_RANGE_SIZE:
+                    chars.update(chr(c) for c in range(item_av[0], item_av[1] + 1))
+                elif item_op is sre_parse.CATEGORY and item_av is sre_parse.CATEGORY_DIGIT:
+                    digit = True
+                else:
+                    return None
+            return frozenset(chars), digit
+
+        if op is sre_parse.SUBPATTERN:
+            # 局部开启标志的分组（如(?i:...)）可能改变首字符的匹配方式，不做推导
+            if av[1]:
+                return None
+            return _first_chars(av[-1])
+
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            return _first_chars(av[2])
+
+        if op is sre_parse.BRANCH:
+            chars = set()
+            digit = False
+            for branch in av[1]:
+                result = _first_chars(branch)
+                if result is None:
+                    return None
+                chars.update(result[0])
+                digit = digit or result[1]
+            return frozenset(chars), digit
+
+        return None
+
+    return None
+
+
+class RoleMatcher:
+    """
+    段落角色与标题级别匹配器
+
+    将所有角色模式合并为一个带命名分组的预编译正则，并根据各模式可能的首字符
+    构建前置过滤，绝大多数正文段落无需执行正则即可判定。
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]]):
+        alternatives = []
+        self._groups = {}
+        first_chars = set()
+        self._digit_first = False
+        self._prefilter = True
+
+        for key, role, level in PATTERN_GROUPS:
+            for pattern in patterns.get(key, []):
+                group_name = f"_p{len(self._groups)}"
+                self._groups[group_name] = (role, level)
+                alternatives.append(f"(?P<{group_name}>{pattern})")
+
+                compiled = re.compile(pattern)
+                result = None if compiled.flags & re.IGNORECASE else _first_chars(sre_parse.parse(pattern))
+                if result is None:
+                    self._prefilter = False
+                else:
+                    first_chars.update(result[0])
+                    self._digit_first = self._digit_first or result[1]
+
+        self._regex = re.compile("|".join(alternatives)) if alternatives else None
+        self._first_chars = frozenset(first_chars)
+
+    def match(self, text: str) -> Tuple[str, int]:
+        """
+        匹配段落文本
+
+        Args:
+            text: 去除首尾空白后的段落文本
+
+        Returns:
+            (段落角色, 标题级别)，未命中时返回("body", 0)
+        """
+        if not text or self._regex is None:
+            return "body", 0
+
+        if self._prefilter:
+            first = text[0]
+            if first not in self._first_chars and not (self._digit_first and first.isdecimal()):
+                return "body", 0
+
+        match = self._regex.match(text)
+        if match is None:
+            return "body", 0
+        return self._groups[match.lastgroup]
+
+
+_matcher_cache = OrderedDict()
+_matcher_lock = threading.Lock()
+
+
+def get_role_matcher(patterns: Optional[Dict[str, List[str]]] = None) -> RoleMatcher:
+    """
+    获取模式配置对应的匹配器，每套模板只编译一次，最多缓存MAX_ROLE_MATCHERS套
+
+    Args:
+        patterns: 格式配置中的patterns段，为空时使用默认模式
+
+    Returns:
+        匹配器实例
+    """
+    if not patterns:
+        patterns = FormatConfig.DEFAULT_CONFIG["patterns"]
+
+    key = json.dumps(patterns, sort_keys=True, ensure_ascii=False)
+    with _matcher_lock:
+        matcher = _matcher_cache.get(key)
+        if matcher is not None:
+            _matcher_cache.move_to_end(key)
+            return matcher
+
+    matcher = RoleMatcher(patterns)
+
+    with _matcher_lock:
+        _matcher_cache[key] = matcher
+        while len(_matcher_cache) > MAX_ROLE_MATCHERS:
+            _matcher_cache.popitem(last=False)
+    return matcher
+
+
+def validate_patterns(patterns: Any) -> Tuple[bool, str]:
+    """
+    验证模式配置能否编译为匹配器
+
+    Args:
+        patterns: 格式配置中的patterns段
+
+    Returns:
+        (是否合法, 错误信息)
+    """
+    if not isinstance(patterns, dict):
+        return False, "patterns必须为对象"
+
+    for key, value in patterns.items():
+        if not isinstance(value, list) or not all(isinstance(p, str) for p in value):
+            return False, f"patterns.{key}必须为字符串列表"
+
+    try:
+        get_role_matcher(patterns)
+    except re.error as e:
+        return False, f"patterns正则表达式错误: {str(e)}"
+
+    return True, ""
@@ -0,0 +1,196 @@
+import zipfile
+import posixpath
+import logging
+from typing import Dict, List, Any, Optional
+from lxml import etree
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup
+from docx.styles import BabelFish
+from utils.docx_processor import DocxProcessor
+from utils.role_matcher import get_role_matcher
+from utils.findings import aggregated_items
+from utils.style_resolver import StyleResolver
+from utils.metrics import PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+REL_TYPE_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+REL_TYPE_STYLES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+class StreamChecker(DocxProcessor):
+    """
+    流式只读格式检查器
+
+    直接从docx压缩包中流式解析word/document.xml，逐个处理正文的顶层元素并在
+    处理后立即释放，不构建python-docx对象图。检查项与DocxProcessor.check_format
+    完全一致，正文段落在遍历时直接计入聚合检查项而不保留索引条目，
+    内存占用不随文档长度增长，适合大文档和高并发检查。
+    """
+
+    def __init__(self, file_path: str):
+        """
+        初始化流式检查器
+
+        Args:
+            file_path: 文档路径
+        """
+        self.file_path = file_path
+        self.doc = None
+        self.paragraph_index = []
+        self.paragraph_count = 0
+        self.run_count = 0
+        self._sections = []
+        self._matcher = get_role_matcher()
+        self.timings = PhaseTimer()
+
+        try:
+            with self.timings.phase("load"), zipfile.ZipFile(file_path) as package:
+                self._document_part = self._find_document_part(package)
+                styles = self._load_styles(package)
+                self._style_names, self._default_style_name = self._style_names_of(styles)
+                self._resolver = StyleResolver(styles)
+        except Exception as e:
+            logger.error(f"加载文档失败: {str(e)}")
+            raise ValueError(f"无法打开文档: {str(e)}")
+
+    def check_format(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """流式解析文档并生成检查报告"""
+        # 先确定识别模式，流式遍历时即可据此丢弃无关段落
+        self._matcher = get_role_matcher(config.get("patterns"))
+        self._body_findings = self._body_aggregators(config)
+        self.timings.timed("index", self._build_paragraph_index)
+        return super().check_format(config)
+
+    def _build_paragraph_index(self):
+        """流式遍历正文，只保留各项检查会读取的段落条目"""
+        self.paragraph_index = []
+        self.paragraph_count = 0
+        self.run_count = 0
+        self._sections = []
+
+        body_tag = qn("w:body")
+        p_tag = qn("w:p")
+        sectPr_tag = qn("w:sectPr")
+
+        try:
+            with zipfile.ZipFile(self.file_path) as package:
+                with package.open(self._document_part) as stream:
+                    context = etree.iterparse(stream, events=("end",), tag=(p_tag, sectPr_tag), huge_tree=True)
+                    context.set_element_class_lookup(element_class_lookup)
+
+                    for _, elem in context:
+                        parent = elem.getparent()
+                        if parent is None or parent.tag != body_tag:
+                            continue
+
+                        if elem.tag == p_tag:
+                            self._process_paragraph(elem)
+                        elif elem.tag == sectPr_tag:
+                            self._sections.append(self._sectPr_facts(elem))
+
+                        # 释放已处理的顶层元素及其之前的表格等兄弟元素
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del parent[0]
+        except Exception as e:
+            logger.error(f"流式解析文档失败: {str(e)}")
+            raise ValueError(f"无法解析文档: {str(e)}")
+
+    def _process_paragraph(self, p):
+        """处理一个正文段落"""
+        self.paragraph_count += 1
+        self.run_count += len(p.r_lst)
+
+        pPr = p.pPr
+        if pPr is not None and pPr.sectPr is not None:
+            self._sections.append(self._sectPr_facts(pPr.sectPr))
+
+        style_id = p.style
+        style_name = self._style_names.get(style_id, self._default_style_name) if style_id else self._default_style_name
+
+        info = self._index_entry(p, style_name, position=self.paragraph_count)
+        if self._keep_entry(info):
+            self.paragraph_index.append(info)
+
+    def _keep_entry(self, info: Dict[str, Any]) -> bool:
+        """判断索引条目是否需要保留，正文段落计入聚合检查项后即丢弃"""
+        if info["level"] > 0 or info["role"] != self.ROLE_BODY:
+            return True
+
+        if self._is_body_paragraph(info):
+            for aggregator in self._body_findings:
+                aggregator.add(info)
+        return False
+
+    def _check_body(self, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """正文检查项已在流式遍历时聚合"""
+        return aggregated_items(self._body_findings)
+
+    def _section_facts(self) -> List[Dict[str, Any]]:
+        """获取各节的页边距（cm）与页眉页脚信息"""
+        return self._sections
+
+    def _sectPr_facts(self, sectPr) -> Dict[str, Any]:
+        """从w:sectPr元素提取节信息"""
+        top_margin = sectPr.top_margin
+        bottom_margin = sectPr.bottom_margin
+        left_margin = sectPr.left_margin
+        right_margin = sectPr.right_margin
+        # python-docx对每个节总是返回页眉页脚对象，这里保持相同的判定
+        return {
+            "top_margin": top_margin.cm if top_margin is not None else None,
+            "bottom_margin": bottom_margin.cm if bottom_margin is not None else None,
+            "left_margin": left_margin.cm if left_margin is not None else None,
+            "right_margin": right_margin.cm if right_margin is not None else None,
+            "has_header": True,
+            "has_footer": True
+        }
+
+    @staticmethod
+    def _find_document_part(package: zipfile.ZipFile) -> str:
+        """根据包关系找到主文档部件"""
+        rels = etree.fromstring(package.read("_rels/.rels"))
+        for rel in rels.iter(f"{{{PACKAGE_RELS_NS}}}Relationship"):
+            if rel.get("Type") == REL_TYPE_OFFICE_DOCUMENT:
+                return rel.get("Target").lstrip("/")
+        raise ValueError("未找到主文档部件")
+
+    def _load_styles(self, package: zipfile.ZipFile):
+        """读取styles.xml的根元素，文档没有样式部件时返回None"""
+        styles_part = self._find_styles_part(package)
+        if styles_part is None:
+            return None
+        return etree.fromstring(package.read(styles_part))
+
+    @staticmethod
+    def _style_names_of(styles):
+        """段落样式ID到样式名的映射以及默认段落样式名"""
+        if styles is None:
+            return {}, None
+
+        names = {}
+        default_name = None
+        for style in styles.iterchildren(qn("w:style")):
+            if style.get(qn("w:type")) != "paragraph":
+                continue
+            name_elm = style.find(qn("w:name"))
+            name = BabelFish.internal2ui(name_elm.get(qn("w:val"))) if name_elm is not None else None
+            names[style.get(qn("w:styleId"))] = name
+            if style.get(qn("w:default")) in ("1", "true", "on"):
+                default_name = name
+        return names, default_name
+
+    def _find_styles_part(self, package: zipfile.ZipFile) -> Optional[str]:
+        """根据主文档的关系找到样式部件"""
+        directory, name = posixpath.split(self._document_part)
+        rels_path = posixpath.join(directory, "_rels", f"{name}.rels")
+        if rels_path not in package.namelist():
+            return None
+
+        rels = etree.fromstring(package.read(rels_path))
+        for rel in rels.iter(f"{{{PACKAGE_RELS_NS}}}Relationship"):
+            if rel.get("Type") == REL_TYPE_STYLES:
+                return posixpath.normpath(posixpath.join(directory, rel.get("Target")))
+        return None
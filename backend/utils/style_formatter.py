@@ -0,0 +1,191 @@
+import logging
+from typing import Dict, Any, Tuple
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt
+from utils.compiled_config import RoleFormat
+
+logger = logging.getLogger(__name__)
+
+# 主题字体属性会覆盖显式字体，改写样式字体时一并移除
+_THEME_FONT_ATTRS = (
+    qn("w:asciiTheme"), qn("w:hAnsiTheme"), qn("w:eastAsiaTheme"), qn("w:cstheme")
+)
+
+class StyleFormatter:
+    """
+    样式级排版引擎
+
+    按格式配置改写styles.xml中Normal、Heading 1-3和Caption样式的定义，
+    再根据段落索引为各段落指定对应样式，并删除与样式冲突的直接格式。
+    格式只需写入少数几个样式，输出文件也不再携带大量重复的w:rPr。
+
+    标题与题注样式基于Normal，正文的首行缩进和间距会沿basedOn链传下去，
+    因此这些样式总是显式写入自己的缩进与间距。摘要、目录和参考文献标题按
+    一级标题排版，但使用大纲级别为正文的TOC Heading样式，不进入目录和导航窗格。
+    """
+
+    # 段落角色对应的样式名与配置段
+    HEADING_STYLES = {1: "Heading 1", 2: "Heading 2", 3: "Heading 3"}
+    BODY_STYLE = "Normal"
+    CAPTION_STYLE = "Caption"
+    TITLE_STYLE = "TOC Heading"
+
+    # 大纲级别9表示正文级别，不出现在目录中
+    BODY_OUTLINE_LEVEL = 9
+
+    def __init__(self, processor):
+        """
+        Args:
+            processor: 已建立段落索引的DocxProcessor
+        """
+        self.processor = processor
+        self.styles = processor.doc.styles
+        self.stats = {"styles": 0, "paragraphs": 0, "runs": 0}
+
+    def apply(self, config: Dict[str, Any]) -> Dict[str, int]:
+        """
+        改写样式定义并为段落指定样式
+
+        Args:
+            config: 编译后的格式配置
+
+        Returns:
+            改写的样式数、指定样式的段落数以及清理直接格式的run数
+        """
+        title_roles = (
+            self.processor.ROLE_ABSTRACT_CHINESE, self.processor.ROLE_ABSTRACT_ENGLISH,
+            self.processor.ROLE_TOC_TITLE, self.processor.ROLE_REFERENCE_TITLE
+        )
+
+        body = self._define_style(self.BODY_STYLE, config.role("body"), first_line_indent=True)
+        # 内置Caption样式默认加粗，配置未指定时按不加粗处理
+        caption_role = config.role("figure_caption")
+        if caption_role.bold is None:
+            caption_role = caption_role._replace(bold=False)
+        caption = self._define_style(self.CAPTION_STYLE, caption_role)
+        headings = {
+            level: self._define_style(name, config.role(f"heading{level}"), outline_level=level - 1)
+            for level, name in self.HEADING_STYLES.items()
+        }
+        # 摘要等标题按一级标题检查，新建的TOC Heading不继承Heading 1的加粗
+        title_role = config.role("heading1")
+        if title_role.bold is None:
+            title_role = title_role._replace(bold=True)
+        title = self._define_style(self.TITLE_STYLE, title_role, outline_level=self.BODY_OUTLINE_LEVEL)
+
+        for info in self.processor.paragraph_index:
+            level = info["level"]
+            if info["role"] in title_roles:
+                self._assign(info["paragraph"]._p, title)
+            elif level > 0:
+                if level in headings:
+                    self._assign(info["paragraph"]._p, headings[level])
+            elif info["role"] == self.processor.ROLE_CAPTION:
+                self._assign(info["paragraph"]._p, caption)
+            elif len(info["text"]) > 0:
+                self._assign(info["paragraph"]._p, body)
+
+        return self.stats
+
+    def _define_style(self, name: str, role: RoleFormat,
+                      first_line_indent: bool = False, outline_level: int = None) -> Tuple:
+        """
+        按角色格式改写样式定义，样式不存在时新建
+
+        Returns:
+            (样式ID, 需从段落删除的pPr子元素标签, 需从run删除的rPr子元素标签)
+        """
+        try:
+            style = self.styles[name]
+        except KeyError:
+            style = self.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+            if name != self.BODY_STYLE:
+                style.base_style = self.styles[self.BODY_STYLE]
+                style.next_paragraph_style = self.styles[self.BODY_STYLE]
+
+        style.font.name = role.font_name
+        rFonts = style.element.rPr.rFonts
+        rFonts.set(qn("w:eastAsia"), role.font_name)
+        for attr in _THEME_FONT_ATTRS:
+            rFonts.attrib.pop(attr, None)
+
+        style.font.size = role.font_size
+        run_tags = [qn("w:rFonts"), qn("w:sz")]
+
+        if role.bold is not None:
+            style.font.bold = role.bold
+            run_tags.append(qn("w:b"))
+
+        paragraph_format = style.paragraph_format
+        paragraph_format.alignment = role.alignment
+        paragraph_tags = [qn("w:jc")]
+
+        # 非正文样式基于Normal，未配置的间距与缩进也要显式写入，否则会继承正文的设置
+        inherits_body = name != self.BODY_STYLE
+
+        if role.line_spacing is not None:
+            paragraph_format.line_spacing = role.line_spacing
+            paragraph_tags.append(qn("w:spacing"))
+        elif inherits_body and paragraph_format.line_spacing is None:
+            paragraph_format.line_spacing = 1.0
+
+        if role.space_before is not None:
+            paragraph_format.space_before = role.space_before
+            paragraph_tags.append(qn("w:spacing"))
+        elif inherits_body and paragraph_format.space_before is None:
+            paragraph_format.space_before = Pt(0)
+
+        if role.space_after is not None:
+            paragraph_format.space_after = role.space_after
+            paragraph_tags.append(qn("w:spacing"))
+        elif inherits_body and paragraph_format.space_after is None:
+            paragraph_format.space_after = Pt(0)
+
+        if first_line_indent:
+            paragraph_format.first_line_indent = role.first_line_indent
+            paragraph_tags.append(qn("w:ind"))
+        elif inherits_body:
+            # 写入w:firstLine="0"，覆盖Normal的首行缩进
+            paragraph_format.first_line_indent = 0
+
+        if outline_level is not None:
+            pPr = style.element.get_or_add_pPr()
+            outline = pPr.find(qn("w:outlineLvl"))
+            if outline is None:
+                outline = OxmlElement("w:outlineLvl")
+                pPr.insert_element_before(outline, "w:divId", "w:cnfStyle", "w:rPr", "w:sectPr", "w:pPrChange")
+            outline.set(qn("w:val"), str(outline_level))
+
+        self.stats["styles"] += 1
+
+        # 默认段落样式通过省略w:pStyle引用
+        style_id = None if style.element.default else style.style_id
+        return style_id, frozenset(paragraph_tags), frozenset(run_tags)
+
+    def _assign(self, p, style_def: Tuple):
+        """为段落指定样式并删除与之冲突的直接格式"""
+        style_id, paragraph_tags, run_tags = style_def
+
+        pPr = p.get_or_add_pPr()
+        pPr.style = style_id
+        for child in list(pPr):
+            if child.tag in paragraph_tags:
+                pPr.remove(child)
+        if len(pPr) == 0:
+            p.remove(pPr)
+
+        runs = p.r_lst
+        for r in runs:
+            rPr = r.rPr
+            if rPr is None:
+                continue
+            for child in list(rPr):
+                if child.tag in run_tags:
+                    rPr.remove(child)
+            if len(rPr) == 0:
+                r.remove(rPr)
+
+        self.stats["paragraphs"] += 1
+        self.stats["runs"] += len(runs)
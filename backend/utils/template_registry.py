@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from utils.format_config import FormatConfig
+from utils.compiled_config import CompiledConfig, compile_config, thaw
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateNotFoundError(LookupError):
+    """模板不存在"""
+
+
+class TemplateVersionError(ValueError):
+    """请求的模板版本与当前版本不一致"""
+
+    def __init__(self, message: str, current_version: str):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+class TemplateRegistry:
+    """
+    格式模板登记表
+
+    预设模板与保存在磁盘上的用户模板只在加载时编译一次。每个模板的版本号取
+    编译后配置哈希的前16位，模板详情与模板列表都预先序列化为JSON字节并附带ETag，
+    接口可直接返回或响应304。检查与排版请求可以只传模板ID与版本号。
+
+    多个worker进程各自持有登记表，通过定期比较模板目录中文件的修改时间与大小
+    发现其他进程保存或删除的模板。
+    """
+
+    DEFAULT_TEMPLATE = "国标通用"
+    SOURCE_PRESET = "preset"
+    SOURCE_USER = "user"
+
+    def __init__(self, directory: Optional[str] = None, check_interval: float = 2.0):
+        """
+        Args:
+            directory: 用户模板目录，为None时只提供预设模板
+            check_interval: 两次检查模板目录之间的最短秒数
+        """
+        self.directory = directory
+        self.check_interval = check_interval
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._templates = OrderedDict()
+        self._listing = (b"", "")
+        self._signature = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        """模板目录有变化时重新加载"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            signature = self._scan()
+            if force or signature != self._signature:
+                self._load()
+                self._signature = signature
+
+    def _scan(self) -> Tuple:
+        """模板目录中各文件的(文件名, 修改时间, 大小)"""
+        if not self.directory:
+            return ()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and entry.is_file():
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    def _load(self):
+        """编译全部模板并生成预序列化的模板列表"""
+        templates = OrderedDict()
+        for name, config in FormatConfig.get_preset_templates().items():
+            templates[name] = self._entry(name, f"{name}格式模板", config, self.SOURCE_PRESET)
+
+        for name, description, config, filename in self._read_user_templates():
+            if name in templates and templates[name]["source"] == self.SOURCE_PRESET:
+                logger.warning(f"用户模板与预设模板重名，已忽略: {filename}")
+                continue
+            try:
+                templates[name] = self._entry(name, description, config, self.SOURCE_USER, filename)
+            except ValueError as e:
+                logger.warning(f"用户模板无效，已忽略: {filename}: {str(e)}")
+
+        listing = json.dumps({
+            "templates": [entry["summary"] for entry in templates.values()],
+            "default": self.DEFAULT_TEMPLATE
+        }, ensure_ascii=False).encode("utf-8")
+
+        self._templates = templates
+        self._listing = (listing, hashlib.sha256(listing).hexdigest()[:16])
+        self.loads += 1
+        logger.info(f"加载格式模板: {len(templates)}个")
+
+    def _read_user_templates(self):
+        """读取模板目录中的用户模板"""
+        if not self.directory:
+            return
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                name = data.get("name") or os.path.splitext(filename)[0]
+                yield name, data.get("description", ""), data.get("config", {}), filename
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"读取用户模板失败: {filename}: {str(e)}")
+
+    def _entry(self, name: str, description: str, config: Dict[str, Any], source: str,
+               filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        编译模板并预先序列化
+
+        Args:
+            filename: 用户模板在模板目录中的文件名
+
+        Raises:
+            ValueError: 配置不合法
+        """
+        compiled = compile_config(config)
+        version = compiled.hash[:16]
+        summary = {
+            "id": name,
+            "name": name,
+            "description": description,
+            "source": source,
+            "version": version,
+            "config": thaw(compiled)
+        }
+        return {
+            "summary": summary,
+            "source": source,
+            "filename": filename,
+            "version": version,
+            "compiled": compiled,
+            "json": json.dumps(summary, ensure_ascii=False).encode("utf-8"),
+            "export_json": FormatConfig.export_config(summary["config"])
+        }
+
+    def listing(self) -> Tuple[bytes, str]:
+        """预序列化的模板列表及其ETag"""
+        self.refresh()
+        return self._listing
+
+    def get(self, template_id: str) -> Dict[str, Any]:
+        """
+        获取模板
+
+        Returns:
+            包含version、compiled、json（预序列化的模板详情）与export_json的字典
+
+        Raises:
+            TemplateNotFoundError: 模板不存在
+        """
+        self.refresh()
+        entry = self._templates.get(template_id)
+        if entry is None:
+            raise TemplateNotFoundError(f"模板不存在: {template_id}")
+        return entry
+
+    def resolve(self, template_id: str, version: Optional[str] = None,
+                overrides: Optional[Dict[str, Any]] = None) -> CompiledConfig:
+        """
+        获取模板的编译后配置
+
+        Args:
+            template_id: 模板ID
+            version: 期望的模板版本，为None时使用当前版本
+            overrides: 在模板之上覆盖的配置项
+
+        Raises:
+            TemplateNotFoundError: 模板不存在
+            TemplateVersionError: 模板已被修改，版本不一致
+            ValueError: 覆盖后的配置不合法
+        """
+        entry = self.get(template_id)
+        if version is not None and version != entry["version"]:
+            raise TemplateVersionError(f"模板版本已更新: {template_id}", entry["version"])
+
+        if not overrides:
+            return entry["compiled"]
+        return compile_config(FormatConfig.deep_merge(thaw(entry["compiled"]), overrides))
+
+    def save(self, name: str, config: Dict[str, Any], description: str = "") -> Dict[str, Any]:
+        """
+        保存用户模板，同名用户模板被覆盖
+
+        Returns:
+            模板条目
+
+        Raises:
+            ValueError: 未配置模板目录、与预设模板重名或配置不合法
+        """
+        if not self.directory:
+            raise ValueError("未配置用户模板目录")
+        if not name or not isinstance(name, str):
+            raise ValueError("模板名称不能为空")
+        if self._templates.get(name, {}).get("source") == self.SOURCE_PRESET:
+            raise ValueError(f"不能覆盖预设模板: {name}")
+
+        # 先编译以验证配置
+        self._entry(name, description, config, self.SOURCE_USER)
+
+        data = json.dumps({"name": name, "description": description, "config": config},
+                          ensure_ascii=False, indent=2)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # 覆盖手动放入目录、文件名不同的同名模板
+        previous = self._templates.get(name)
+        if previous is not None and previous["filename"] != os.path.basename(self._path(name)):
+            os.remove(os.path.join(self.directory, previous["filename"]))
+
+        self.refresh(force=True)
+        logger.info(f"保存用户模板: {name}")
+        return self._templates[name]
+
+    def delete(self, name: str):
+        """
+        删除用户模板
+
+        Raises:
+            TemplateNotFoundError: 模板不存在
+            ValueError: 预设模板不能删除
+        """
+        entry = self.get(name)
+        if entry["source"] == self.SOURCE_PRESET:
+            raise ValueError(f"不能删除预设模板: {name}")
+
+        # 手动放入目录的模板文件不一定按名称哈希命名，按加载时记录的文件名删除
+        path = os.path.join(self.directory, entry["filename"])
+        if os.path.exists(path):
+            os.remove(path)
+
+        self.refresh(force=True)
+        logger.info(f"删除用户模板: {name}")
+
+    def _path(self, name: str) -> str:
+        """用户模板的文件路径，文件名取名称的哈希以避免非法字符"""
+        return os.path.join(self.directory, f"{hashlib.sha256(name.encode('utf-8')).hexdigest()[:16]}.json")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取登记表统计信息"""
+        templates = list(self._templates.values())
+        return {
+            "templates": len(templates),
+            "user_templates": sum(1 for entry in templates if entry["source"] == self.SOURCE_USER),
+            "loads": self.loads,
+            "listing_etag": self._listing[1]
+        }
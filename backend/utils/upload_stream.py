@@ -0,0 +1,103 @@
+import os
+import hashlib
+import tempfile
+import logging
+from typing import Optional, Set
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# docx（zip）文件的本地文件头签名
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+
+class UploadStream:
+    """
+    上传文件流
+
+    Werkzeug解析multipart请求体时逐块写入本对象：数据直接写入目标目录下的
+    .part临时文件，同时计算SHA-256并记录文件头，超过大小上限时立即中止请求。
+    上传完成后通过commit()原子地移动到最终位置，未提交的临时文件在关闭时删除。
+    """
+
+    def __init__(self, dest_folder: str, max_size: int):
+        """
+        Args:
+            dest_folder: 临时文件所在目录，应与最终位置在同一文件系统
+            max_size: 允许的最大文件大小
+        """
+        fd, self.part_path = tempfile.mkstemp(suffix=".part", dir=dest_folder)
+        self._file = os.fdopen(fd, "w+b")
+        self.max_size = max_size
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._header = b""
+        self._committed = False
+
+    def write(self, data: bytes) -> int:
+        """写入一块数据，超过大小上限时删除临时文件并中止请求"""
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge()
+
+        if len(self._header) < len(ZIP_SIGNATURE):
+            self._header += data[:len(ZIP_SIGNATURE) - len(self._header)]
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    @property
+    def is_zip(self) -> bool:
+        """文件头是否为zip签名"""
+        return self._header == ZIP_SIGNATURE
+
+    def hexdigest(self) -> str:
+        """已写入内容的SHA-256"""
+        return self._sha256.hexdigest()
+
+    def commit(self, path: str):
+        """关闭临时文件并移动到最终位置"""
+        self._file.close()
+        os.replace(self.part_path, path)
+        self._committed = True
+
+    def discard(self):
+        """关闭并删除临时文件"""
+        if not self._file.closed:
+            self._file.close()
+        if not self._committed and os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def close(self):
+        """请求结束时由Werkzeug调用，未提交的上传随之删除"""
+        self.discard()
+
+    def __del__(self):
+        # 解析中途出错时Werkzeug不会持有本对象，这里兜底删除临时文件
+        try:
+            self.discard()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        # read/readline/seek等其余文件方法直接委托给临时文件
+        return getattr(self._file, name)
+
+
+class StreamingUploadRequest(Request):
+    """
+    为指定接口启用UploadStream的请求类
+
+    其余接口保持Werkzeug默认的上传缓冲方式。
+    """
+
+    upload_folder = "temp_uploads"
+    max_upload_size = 20 * 1024 * 1024
+    streaming_endpoints: Set[str] = set()
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None):
+        if self.endpoint in self.streaming_endpoints:
+            return UploadStream(self.upload_folder, self.max_upload_size)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
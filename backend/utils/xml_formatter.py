@@ -0,0 +1,133 @@
+import copy
+import logging
+from typing import Dict, List, Any, Tuple
+from docx.oxml.ns import qn
+
+logger = logging.getLogger(__name__)
+
+# 以合并属性方式写入的元素，与python-docx对应setter的行为一致，其余元素整体替换
+_MERGE_TAGS = {qn("w:rFonts"), qn("w:spacing"), qn("w:ind")}
+
+# w:rPr与w:pPr子元素的模式顺序（ECMA-376），用于按顺序插入新元素
+_RPR_SEQUENCE = (
+    "rStyle", "rFonts", "b", "bCs", "i", "iCs", "caps", "smallCaps", "strike", "dstrike",
+    "outline", "shadow", "emboss", "imprint", "noProof", "snapToGrid", "vanish", "webHidden",
+    "color", "spacing", "w", "kern", "position", "sz", "szCs", "highlight", "u", "effect",
+    "bdr", "shd", "fitText", "vertAlign", "rtl", "cs", "em", "lang", "eastAsianLayout",
+    "specVanish", "oMath"
+)
+_PPR_SEQUENCE = (
+    "pStyle", "keepNext", "keepLines", "pageBreakBefore", "framePr", "widowControl", "numPr",
+    "suppressLineNumbers", "pBdr", "shd", "tabs", "suppressAutoHyphens", "kinsoku", "wordWrap",
+    "overflowPunct", "topLinePunct", "autoSpaceDE", "autoSpaceDN", "bidi", "adjustRightInd",
+    "snapToGrid", "spacing", "ind", "contextualSpacing", "mirrorIndents", "suppressOverlap", "jc",
+    "textDirection", "textAlignment", "textboxTightWrap", "outlineLvl", "divId", "cnfStyle",
+    "rPr", "sectPr", "pPrChange"
+)
+
+
+def _successor_map(sequence: Tuple[str, ...]) -> Dict[str, frozenset]:
+    """计算每个子元素之后允许出现的元素集合"""
+    tags = [qn(f"w:{name}") for name in sequence]
+    return {tag: frozenset(tags[i + 1:]) for i, tag in enumerate(tags)}
+
+
+_RPR_SUCCESSORS = _successor_map(_RPR_SEQUENCE)
+_PPR_SUCCESSORS = _successor_map(_PPR_SEQUENCE)
+
+_TAG_IND = qn("w:ind")
+_TAG_SPACING = qn("w:spacing")
+_ATTR_HANGING = qn("w:hanging")
+_ATTR_LINE_RULE = qn("w:lineRule")
+
+
+class XmlFormatter:
+    """
+    基于XML的批量排版引擎
+
+    每种角色的目标w:pPr/w:rPr片段随编译后的配置只生成一次（见CompiledConfig.fragment，
+    保证与逐run排版结果一致），然后直接写入匹配段落的w:p/w:r元素，不再为每个run
+    创建python-docx代理对象和长度对象。
+    """
+
+    def __init__(self, processor):
+        """
+        Args:
+            processor: 已建立段落索引的DocxProcessor
+        """
+        self.processor = processor
+        self.stats = {"paragraphs": 0, "runs": 0}
+
+    def apply(self, config: Dict[str, Any]) -> Dict[str, int]:
+        """
+        应用标题与正文格式
+
+        Args:
+            config: 编译后的格式配置
+
+        Returns:
+            写入的段落数与run数
+        """
+        body_fragment = config.fragment("body")
+        indent_fragment = config.indent_fragment("body")
+
+        for info in self.processor.paragraph_index:
+            p = info["paragraph"]._p
+            level = info["level"]
+
+            if level > 0:
+                self._stamp_paragraph(p, config.fragment(f"heading{level}"))
+            elif len(info["text"]) > 0:
+                self._stamp_paragraph(p, body_fragment)
+                self._stamp(p.get_or_add_pPr(), indent_fragment)
+
+        return self.stats
+
+    @staticmethod
+    def _prepare(parent, successor_map: Dict[str, frozenset]) -> List:
+        """将片段展开为(标签, 后继元素集合, 元素)列表"""
+        if parent is None:
+            return []
+        return [(child.tag, successor_map[child.tag], child) for child in parent]
+
+    def _stamp_paragraph(self, p, fragment: Tuple[List, List]):
+        """将片段写入段落及其所有run，段落没有run时与逐run排版一样跳过"""
+        runs = p.r_lst
+        if not runs:
+            return
+
+        pPr_fragment, rPr_fragment = fragment
+        self._stamp(p.get_or_add_pPr(), pPr_fragment)
+        for r in runs:
+            self._stamp(r.get_or_add_rPr(), rPr_fragment)
+
+        self.stats["paragraphs"] += 1
+        self.stats["runs"] += len(runs)
+
+    @staticmethod
+    def _stamp(target, fragment: List):
+        """将片段中的元素写入目标属性元素"""
+        for tag, successors, child in fragment:
+            existing = target.find(tag)
+            if existing is None:
+                XmlFormatter._insert(target, successors, child)
+            elif tag in _MERGE_TAGS:
+                if tag == _TAG_IND:
+                    existing.attrib.pop(_ATTR_HANGING, None)
+                for name, value in child.attrib.items():
+                    # 固定行距不覆盖已有的"最小值"行距规则，与python-docx一致
+                    if tag == _TAG_SPACING and name == _ATTR_LINE_RULE and value == "exact" \
+                            and existing.get(_ATTR_LINE_RULE) == "atLeast":
+                        continue
+                    existing.set(name, value)
+            else:
+                target.replace(existing, copy.deepcopy(child))
+
+    @staticmethod
+    def _insert(target, successors: frozenset, child):
+        """按模式顺序将元素副本插入目标属性元素"""
+        for sibling in target:
+            if sibling.tag in successors:
+                sibling.addprevious(copy.deepcopy(child))
+                return
+        target.append(copy.deepcopy(child))
@@ -5,6 +5,7 @@ const AppState = {
   checkReport: null,
   formattedFileId: null,
   currentConfig: null,
+  currentTemplate: null,
   templates: []
 };
 
@@ -217,8 +218,8 @@ function initTemplateSelector() {
   });
 }
 
-// 加载模板列表
-async function loadTemplates() {
+// 加载模板列表，selectedName为刷新后保持选中的模板（不存在时选中默认模板）
+async function loadTemplates(selectedName = null) {
   try {
     const response = await fetch(`${API_BASE}/templates`);
     if (!response.ok) throw new Error('加载模板失败');
@@ -226,12 +227,13 @@ async function loadTemplates() {
     const data = await response.json();
     AppState.templates = data.templates;
     
+    const selected = data.templates.some(t => t.name === selectedName) ? selectedName : data.default;
     const templateSelect = document.getElementById('templateSelect');
     templateSelect.innerHTML = data.templates.map(t => 
-      `<option value="${t.name}" ${t.name === data.default ? 'selected' : ''}>${t.name}</option>`
+      `<option value="${t.name}" ${t.name === selected ? 'selected' : ''}>${t.name}</option>`
     ).join('');
     
-    loadTemplateConfig(data.default);
+    loadTemplateConfig(selected);
   } catch (error) {
     console.error('加载模板失败:', error);
   }
@@ -241,7 +243,8 @@ async function loadTemplates() {
 function loadTemplateConfig(templateName) {
   const template = AppState.templates.find(t => t.name === templateName);
   if (template) {
-    AppState.currentConfig = template.config;
+    AppState.currentConfig = JSON.parse(JSON.stringify(template.config));
+    AppState.currentTemplate = { id: template.id || template.name, name: template.name, version: template.version };
   }
 }
 
@@ -285,16 +288,7 @@ async function checkFormat() {
   showLoading(checkBtn, true);
   
   try {
-    const response = await fetch(`${API_BASE}/check`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        file_id: AppState.currentFileId,
-        format_config: getCustomConfig()
-      })
-    });
+    const response = await postWithConfig('check');
     
     if (!response.ok) {
       const error = await response.json();
@@ -427,16 +421,7 @@ async function formatDocument() {
   showLoading(formatBtn, true);
   
   try {
-    const response = await fetch(`${API_BASE}/format`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        file_id: AppState.currentFileId,
-        format_config: getCustomConfig()
-      })
-    });
+    const response = await postWithConfig('format-check');
     
     if (!response.ok) {
       const error = await response.json();
@@ -445,6 +430,7 @@ async function formatDocument() {
     
     const data = await response.json();
     AppState.formattedFileId = data.formatted_file_id;
+    AppState.checkReport = data.report;
     
     displayFormatSuccess(data);
     showNotification('排版完成', 'success');
@@ -468,7 +454,7 @@ function displayFormatSuccess(data) {
       </div>
       
       <h3 class="text-2xl font-bold text-gray-800 mb-2">排版完成！</h3>
-      <p class="text-gray-600 mb-6">您的论文已按照规范格式排版完成</p>
+      <p class="text-gray-600 mb-6">您的论文已按照规范格式排版完成${data.report ? `，排版后格式合格率 ${data.report.pass_rate}%` : ''}</p>
       
       <div class="bg-white bg-opacity-80 rounded-xl p-6 mb-6 border border-green-200">
         <div class="flex items-center justify-between mb-4">
@@ -529,6 +515,18 @@ function downloadFormattedFile() {
 // 获取自定义配置
 function getCustomConfig() {
   const config = AppState.currentConfig || {};
+  const overrides = getConfigOverrides();
+  
+  if (overrides.page_settings) {
+    config.page_settings = { ...(config.page_settings || {}), ...overrides.page_settings };
+  }
+  
+  return config;
+}
+
+// 获取高级设置中覆盖的配置项
+function getConfigOverrides() {
+  const config = {};
   
   const topMargin = document.getElementById('topMargin')?.value;
   const bottomMargin = document.getElementById('bottomMargin')?.value;
@@ -546,6 +544,40 @@ function getCustomConfig() {
   return config;
 }
 
+// 请求中的格式配置：使用模板时只传模板ID、版本与覆盖项
+function getConfigPayload() {
+  if (AppState.currentTemplate) {
+    return {
+      template_id: AppState.currentTemplate.id,
+      template_version: AppState.currentTemplate.version,
+      format_config: getConfigOverrides()
+    };
+  }
+  return { format_config: getCustomConfig() };
+}
+
+// 提交带格式配置的请求；所选模板已在服务端更新（409）时刷新模板列表，按最新版本重试一次
+async function postWithConfig(path) {
+  const send = () => fetch(`${API_BASE}/${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify({
+      file_id: AppState.currentFileId,
+      ...getConfigPayload()
+    })
+  });
+  
+  let response = await send();
+  if (response.status === 409 && AppState.currentTemplate) {
+    await loadTemplates(AppState.currentTemplate.name);
+    showNotification('模板已更新，已按最新版本重新提交', 'info');
+    response = await send();
+  }
+  return response;
+}
+
 // 导出配置
 async function exportConfig() {
   try {
@@ -556,7 +588,9 @@ async function exportConfig() {
       headers: {
         'Content-Type': 'application/json'
       },
-      body: JSON.stringify({ config })
+      body: JSON.stringify(AppState.currentTemplate && !Object.keys(getConfigOverrides()).length
+        ? { template_id: AppState.currentTemplate.id }
+        : { config })
     });
     
     if (!response.ok) throw new Error('导出失败');
@@ -605,6 +639,7 @@ function importConfig() {
       
       const data = await response.json();
       AppState.currentConfig = data.config;
+      AppState.currentTemplate = null;
       
       showNotification('配置已导入', 'success');
     } catch (error) {